@@ -0,0 +1,185 @@
+"""
+Admission control for the detection service.
+
+At most max_concurrent frames are in detection at once: a request holds one
+slot per frame it carries (up to the whole capacity), so sending frames in
+batches doesn't get around the limit. Requests beyond that wait in a bounded
+queue that holds at most one request per session: when a session sends a
+newer frame while an older one is still waiting, the older one is dropped
+and the newer one takes over its place in the queue. Sessions are admitted
+in the order they started waiting, so one fast client can't crowd out the
+others.
+
+Requests are rejected straight away instead of piling up:
+
+- 429 when the queue is full, or when a newer frame from the same session
+  replaced this one;
+- 503 when a frame waited longer than max_wait seconds and is now stale.
+
+Every rejection carries a retry delay, and recommended_interval() tells
+clients how often to send frames so that the active sessions share the
+measured inference capacity.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and retry delay"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        """Retry-After value in whole seconds, as HTTP requires"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class _Ticket:
+    __slots__ = ('key', 'weight', 'state', 'event', 'admitted_at')
+
+    def __init__(self, key, weight=1):
+        self.key = key
+        self.weight = weight
+        self.state = 'waiting'
+        self.event = threading.Event()
+        self.admitted_at = None
+
+    def admit(self):
+        self.state = 'admitted'
+        self.admitted_at = time.monotonic()
+        self.event.set()
+
+
+class AdmissionController:
+    """Bounded, per-session-fair admission queue in front of inference"""
+
+    def __init__(self, max_concurrent=4, max_queued=32, max_wait=1.5,
+                 min_interval=0.5, max_interval=10.0, session_window=30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.session_window = session_window
+        self._lock = threading.Lock()
+        self._active = 0               # slots held by admitted requests
+        self._waiting = OrderedDict()  # session key -> waiting _Ticket, in arrival order
+        self._sessions = {}            # session ID -> last time a frame arrived
+        self._pruned_at = time.monotonic()
+        self._service_time = None      # EWMA of seconds a request holds a slot
+        self.admitted = 0
+        self.rejected = 0
+        self.superseded = 0
+        self.expired = 0
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+    @property
+    def active(self):
+        return self._active
+
+    def _touch(self, session_id, now):
+        if session_id is not None:
+            self._sessions[session_id] = now
+        if now - self._pruned_at >= 1.0:
+            self._pruned_at = now
+            cutoff = now - self.session_window
+            for stale in [s for s, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[stale]
+
+    def _recommended_interval(self):
+        if self._service_time is None:
+            return self.min_interval
+        # Each slot finishes one request per service time; share the slots
+        # among the active sessions with a little headroom
+        sessions = max(1, len(self._sessions))
+        interval = 1.25 * self._service_time * sessions / self.max_concurrent
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def recommended_interval(self):
+        """Seconds between frames each client should aim for at the current load"""
+        with self._lock:
+            return self._recommended_interval()
+
+    def _admit_waiting(self):
+        # Strictly in arrival order: a batch at the head of the queue waits for
+        # enough free slots rather than being overtaken by single frames
+        while self._waiting:
+            ticket = next(iter(self._waiting.values()))
+            if self._active + ticket.weight > self.max_concurrent:
+                return
+            self._waiting.popitem(last=False)
+            self._active += ticket.weight
+            ticket.admit()
+
+    def admit(self, session_id=None, frames=1):
+        """Wait for one slot per frame; returns a ticket for release() or raises AdmissionRejected"""
+        now = time.monotonic()
+        key = session_id if session_id is not None else object()
+        weight = min(max(1, int(frames)), self.max_concurrent)
+        with self._lock:
+            self._touch(session_id, now)
+            ticket = _Ticket(key, weight)
+            if self._active + weight <= self.max_concurrent and not self._waiting:
+                self._active += weight
+                self.admitted += 1
+                ticket.admit()
+                return ticket
+
+            previous = self._waiting.get(key)
+            if previous is None and len(self._waiting) >= self.max_queued:
+                self.rejected += 1
+                raise AdmissionRejected(429, 'queue_full', self._recommended_interval())
+            if previous is not None:
+                # Newest frame wins and keeps the session's place in the queue
+                previous.state = 'superseded'
+                previous.event.set()
+                self.superseded += 1
+            self._waiting[key] = ticket
+
+        ticket.event.wait(self.max_wait)
+        with self._lock:
+            if ticket.state == 'admitted':
+                self.admitted += 1
+                return ticket
+            if ticket.state == 'superseded':
+                raise AdmissionRejected(429, 'superseded', self._recommended_interval())
+            ticket.state = 'expired'
+            if self._waiting.get(key) is ticket:
+                del self._waiting[key]
+                # Whoever was queued behind it may fit now
+                self._admit_waiting()
+            self.expired += 1
+            raise AdmissionRejected(503, 'stale', self._recommended_interval())
+
+    def release(self, ticket):
+        """Free a ticket's slots, handing them to the waiting sessions in order"""
+        with self._lock:
+            held = time.monotonic() - ticket.admitted_at
+            if self._service_time is None:
+                self._service_time = held
+            else:
+                self._service_time += 0.2 * (held - self._service_time)
+
+            self._active -= ticket.weight
+            self._admit_waiting()
+
+    @contextmanager
+    def slot(self, session_id=None, frames=1):
+        """Hold admission slots for the duration of a with-block"""
+        ticket = self.admit(session_id, frames)
+        try:
+            yield
+        finally:
+            self.release(ticket)
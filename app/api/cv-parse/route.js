@@ -0,0 +1,57 @@
+import { NextResponse } from 'next/server';
+
+// Python embedding service (embedding_service.py) parses and caches .docx CVs
+const EMBEDDING_SERVICE_URL = process.env.EMBEDDING_SERVICE_URL || 'http://localhost:5001';
+const DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document';
+
+async function parseDocx(buffer, fileName) {
+  const formData = new FormData();
+  formData.append('cv', new Blob([buffer], { type: DOCX_TYPE }), fileName);
+  const response = await fetch(`${EMBEDDING_SERVICE_URL}/api/cv/parse`, {
+    method: 'POST',
+    body: formData
+  });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || `CV parser error (${response.status})`);
+  }
+  return data;
+}
+
+async function parsePdf(buffer) {
+  // Import the library entry point directly; the package index runs a self-test
+  const { default: pdfParse } = await import('pdf-parse/lib/pdf-parse.js');
+  const result = await pdfParse(Buffer.from(buffer));
+  return { text: result.text };
+}
+
+export async function POST(req) {
+  try {
+    const formData = await req.formData();
+    const file = formData.get('cv');
+
+    if (!file) {
+      return NextResponse.json(
+        { error: 'No CV file provided' },
+        { status: 400 }
+      );
+    }
+
+    const buffer = await file.arrayBuffer();
+    const isPdf = file.type === 'application/pdf' || file.name?.toLowerCase().endsWith('.pdf');
+    // .docx text is cached by document hash, so re-uploading the same CV is a lookup
+    const data = isPdf ? await parsePdf(buffer) : await parseDocx(buffer, file.name);
+
+    return NextResponse.json({
+      text: data.text,
+      sha256: data.sha256,
+      cached: data.cached || false
+    });
+  } catch (error) {
+    console.error('CV parse error:', error);
+    return NextResponse.json(
+      { error: 'Failed to extract text from CV' },
+      { status: 500 }
+    );
+  }
+}
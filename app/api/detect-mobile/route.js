@@ -15,10 +15,32 @@ export async function POST(request) {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...(body.session_id ? { 'X-Session-Id': String(body.session_id) } : {})
       },
-      body: JSON.stringify({ image: body.image })
+      body: JSON.stringify({ image: body.image, session_id: body.session_id })
     });
     
+    // Pass the backend's pacing hints through to the client
+    const pacingHeaders = {};
+    for (const name of ['Retry-After', 'X-Recommended-Interval-Ms']) {
+      const value = pythonResponse.headers.get(name);
+      if (value) pacingHeaders[name] = value;
+    }
+    
+    if (pythonResponse.status === 429 || pythonResponse.status === 503) {
+      // Backend is shedding load: tell the client to slow down, not to give up
+      const errorData = await pythonResponse.json().catch(() => ({}));
+      return Response.json({
+        error: errorData.error || 'Detection service busy',
+        mobile_detected: false,
+        confidence: 0,
+        throttled: true,
+        reason: errorData.reason,
+        retry_after_ms: errorData.retry_after_ms,
+        recommended_interval_ms: errorData.recommended_interval_ms
+      }, { status: pythonResponse.status, headers: pacingHeaders });
+    }
+    
     if (!pythonResponse.ok) {
       const errorData = await pythonResponse.json();
       console.error('Python backend error:', errorData);
@@ -32,7 +54,7 @@ export async function POST(request) {
     }
     
     const result = await pythonResponse.json();
-    return Response.json(result);
+    return Response.json(result, { headers: pacingHeaders });
     
   } catch (error) {
     console.error('API route error:', error);
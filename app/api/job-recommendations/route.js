@@ -2,6 +2,21 @@ import { NextResponse } from 'next/server';
 import { db } from '@/utils/db';
 import { UserProfile, JobDetails, JobRecommendation, callInterview, MockInterview } from '@/utils/schema';
 import { eq, and, or, like, inArray } from 'drizzle-orm';
+import { callInterviewJob, mockInterviewJob, recommendFromJobIndex } from '@/utils/jobIndex';
+
+// Attach _type and ids to each recommendation (copy from job object to top level)
+const withJobFields = (rec) => ({
+  ...rec,
+  _type: rec.job?._type,
+  job_id: rec.job?.job_id,
+  mockId: rec.job?.mockId,
+  jobDescription: rec.job?.jobDescription,
+  jobPosition: rec.job?.jobPosition,
+  createdAt: rec.job?.createdAt,
+  recruiterName: rec.job?.recruiterName,
+  createdBy: rec.job?.createdBy,
+  location: rec.job?.city || rec.job?.location,
+});
 
 export async function GET(req) {
   try {
@@ -28,32 +43,33 @@ export async function GET(req) {
 
     const userProfile = userProfiles[0];
 
+    // Fast path: top-k search over the precomputed job embedding index, so
+    // only the matched jobs are loaded instead of scoring the whole catalog
+    const indexedRecommendations = await recommendFromJobIndex(userProfile, limit);
+    if (indexedRecommendations) {
+      return NextResponse.json({
+        recommendations: indexedRecommendations.map(withJobFields),
+        userProfile: {
+          name: userProfile.name,
+          skills: userProfile.skills,
+          experience: userProfile.experience,
+          currentPosition: userProfile.currentPosition
+        },
+        modelStatus: {
+          loaded: true,
+          status: 'ready',
+          message: 'Fine-tuned model with precomputed job index'
+        }
+      });
+    }
+
     // Get all available jobs from callInterview and MockInterview (not JobDetails)
     const allCallInterviews = await db.select().from(callInterview);
     const allMockInterviews = await db.select().from(MockInterview).where(eq(MockInterview.isHidden, false));
-    const callJobsWithType = allCallInterviews.map(j => ({ ...j, _type: 'call', type: 'Call Interview', jobDescription: j.jobDescription }));
-    const mockJobsWithType = allMockInterviews.map(j => ({ ...j, _type: 'mock', type: 'Video Interview', jobDescription: j.jobDesc }));
-
-    // Normalize jobs to expected structure
-    const normalizeJob = (job) => ({
-      ...job,
-      id: job.job_id || job.mockId, // unique id for matching
-      jobTitle: job.jobPosition || job.jobTitle, // ensure jobTitle is present
-      company: job.recruiterName || job.createdBy || job.company || job.city,
-      city: job.location || job.city,
-      skills: job.skills || '',
-      jobCategories: job.category ? [job.category] : [],
-      minExperience: job.minExperience || job.experience || 0,
-      jobDescription: job.jobDescription || job.jobDesc || '',
-      _type: job._type,
-      job_id: job.job_id,
-      mockId: job.mockId,
-      type: job.type,
-    });
 
     const allJobs = [
-      ...callJobsWithType.map(normalizeJob),
-      ...mockJobsWithType.map(normalizeJob)
+      ...allCallInterviews.map(callInterviewJob),
+      ...allMockInterviews.map(mockInterviewJob)
     ];
 
     if (allJobs.length === 0) {
@@ -111,21 +127,7 @@ export async function GET(req) {
     // We'll just return the recommendations without saving to JobRecommendation table
     console.log('Skipping database save for recommendations (using call/mock interviews)');
 
-    // Attach _type and ids to each recommendation (copy from job object to top level)
-    const recommendationsWithJobFields = recommendations.map(rec => {
-      return {
-        ...rec,
-        _type: rec.job?._type,
-        job_id: rec.job?.job_id,
-        mockId: rec.job?.mockId,
-        jobDescription: rec.job?.jobDescription,
-        jobPosition: rec.job?.jobPosition,
-        createdAt: rec.job?.createdAt,
-        recruiterName: rec.job?.recruiterName,
-        createdBy: rec.job?.createdBy,
-        location: rec.job?.city || rec.job?.location,
-      };
-    });
+    const recommendationsWithJobFields = recommendations.map(withJobFields);
 
     return NextResponse.json({
       recommendations: recommendationsWithJobFields,
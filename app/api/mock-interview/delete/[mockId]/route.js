@@ -2,6 +2,7 @@ import { db } from '@/utils/db';
 import { MockInterview, UserAnswer } from '@/utils/schema';
 import { eq } from 'drizzle-orm';
 import { NextResponse } from 'next/server';
+import { removeMockInterviewFromIndex } from '@/utils/jobIndex';
 
 export async function DELETE(request, { params }) {
   try {
@@ -21,6 +22,8 @@ export async function DELETE(request, { params }) {
       return NextResponse.json({ error: 'Mock interview not found' }, { status: 404 });
     }
 
+    removeMockInterviewFromIndex(mockId);
+
     return NextResponse.json({ 
       message: 'Mock interview and all related data deleted successfully',
       deletedMockId: mockId
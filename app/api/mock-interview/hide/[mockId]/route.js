@@ -2,6 +2,7 @@ import { db } from '@/utils/db';
 import { MockInterview } from '@/utils/schema';
 import { eq } from 'drizzle-orm';
 import { NextResponse } from 'next/server';
+import { indexMockInterview, removeMockInterviewFromIndex } from '@/utils/jobIndex';
 
 export async function PATCH(request, { params }) {
   try {
@@ -20,12 +21,20 @@ export async function PATCH(request, { params }) {
     const result = await db
       .update(MockInterview)
       .set({ isHidden })
-      .where(eq(MockInterview.mockId, mockId));
+      .where(eq(MockInterview.mockId, mockId))
+      .returning();
 
-    if (result.rowCount === 0) {
+    if (result.length === 0) {
       return NextResponse.json({ error: 'Mock interview not found' }, { status: 404 });
     }
 
+    // Hidden jobs leave the recommendation index; shown ones are re-embedded
+    if (isHidden) {
+      removeMockInterviewFromIndex(mockId);
+    } else {
+      indexMockInterview(result[0]);
+    }
+
     return NextResponse.json({ 
       message: `Mock interview ${isHidden ? 'hidden' : 'shown'} successfully`,
       mockId,
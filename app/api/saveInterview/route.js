@@ -2,6 +2,7 @@ import { NextResponse } from 'next/server';
 import { db } from '@/utils/db';
 import { v4 as uuidv4 } from 'uuid';
 import { callInterview } from '@/utils/schema';
+import { indexCallInterview } from '@/utils/jobIndex';
 
 export async function POST(req) {
   try {
@@ -10,7 +11,7 @@ export async function POST(req) {
 
     const job_id = uuidv4();
 
-    await db.insert(callInterview).values({
+    const [saved] = await db.insert(callInterview).values({
       ...formData,
       questionList,
       recruiterName: user.fullName,
@@ -18,7 +19,10 @@ export async function POST(req) {
       job_id,
       createdAt: new Date(),
       jobDetailsId: formData.jobDetailsId,
-    });
+    }).returning();
+
+    // Embed the new job for recommendations without holding up the response
+    indexCallInterview(saved);
 
   return NextResponse.json({ success: true, job_id });
   } catch (error) {
@@ -3,6 +3,50 @@ import { db } from '@/utils/db';
 import { SessionCheatingDetection } from '@/utils/schema';
 import { eq, and } from 'drizzle-orm';
 
+// Python detection service keeps per-session detection state (session_aggregation.py)
+const DETECTION_SERVICE_URL = process.env.DETECTION_SERVICE_URL || 'http://localhost:5000';
+// Session read/end calls are admin-only on the service; unset works against localhost
+const DETECTION_ADMIN_TOKEN = process.env.DETECTION_ADMIN_TOKEN;
+// The service waits up to DETECTION_SESSION_END_WAIT (3 s) for its other workers
+const DETECTION_TIMELINE_TIMEOUT_MS = 8000;
+
+// Close the session on the detection service and fetch its merged timeline;
+// the session still ends if the service is unavailable
+async function fetchDetectionTimeline(sessionId) {
+  try {
+    const response = await fetch(
+      `${DETECTION_SERVICE_URL}/api/sessions/${encodeURIComponent(sessionId)}/end`,
+      {
+        method: 'POST',
+        headers: DETECTION_ADMIN_TOKEN ? { Authorization: `Bearer ${DETECTION_ADMIN_TOKEN}` } : {},
+        signal: AbortSignal.timeout(DETECTION_TIMELINE_TIMEOUT_MS),
+      }
+    );
+    if (!response.ok) return null;
+    const data = await response.json();
+    return data.timeline || null;
+  } catch (error) {
+    console.error('Detection timeline unavailable:', error.message);
+    return null;
+  }
+}
+
+const isPhoneOnlyAlert = (alert) =>
+  Array.isArray(alert.violations) && alert.violations.length > 0 &&
+  alert.violations.every(violation => violation.type === 'phoneDetection');
+
+function countViolations(alerts, detectionTimeline) {
+  const violations = {};
+  alerts.filter(alert => !isPhoneOnlyAlert(alert)).forEach(alert => {
+    const violationType = alert.type || 'unknown';
+    violations[violationType] = (violations[violationType] || 0) + 1;
+  });
+  Object.entries(detectionTimeline.violations || {}).forEach(([kind, count]) => {
+    violations[kind] = (violations[kind] || 0) + count;
+  });
+  return violations;
+}
+
 export async function POST(request) {
   try {
     const { sessionId, mockId, finalDetectionData } = await request.json();
@@ -34,6 +78,7 @@ export async function POST(request) {
 
     const session = currentSession[0];
     const sessionEndTime = new Date();
+    const detectionTimeline = await fetchDetectionTimeline(sessionId);
     
     // Calculate final session duration
     const sessionDuration = session.sessionStartTime ? 
@@ -52,6 +97,12 @@ export async function POST(request) {
       (typeof session.sessionCheatingViolations === 'string' ? 
         JSON.parse(session.sessionCheatingViolations) : session.sessionCheatingViolations) : {};
 
+    // The client counts violations per alert type ('warning'), including
+    // alerts raised only by YOLO phone detections. When the detection service
+    // has a timeline, its cooldown-gated counts ('phone', ...) replace those
+    // alerts; the client's other alerts keep counting under their own type
+    const finalViolations = detectionTimeline ? countViolations(existingAlerts, detectionTimeline) : existingViolations;
+
     // Calculate final session analytics
     const calculateSessionAnalytics = () => {
       const allRiskScores = existingDetectionHistory
@@ -63,9 +114,9 @@ export async function POST(request) {
 
       const peakRisk = allRiskScores.length > 0 ? Math.max(...allRiskScores) : 0;
 
-      const totalViolations = Object.values(existingViolations).reduce((sum, count) => sum + count, 0);
+      const totalViolations = Object.values(finalViolations).reduce((sum, count) => sum + count, 0);
 
-      const mostCommonViolation = Object.entries(existingViolations)
+      const mostCommonViolation = Object.entries(finalViolations)
         .sort(([,a], [,b]) => b - a)[0]?.[0] || 'none';
 
       // Calculate detection accuracy based on session data
@@ -114,6 +165,7 @@ export async function POST(request) {
       totalDetections: sessionAnalytics.totalDetections,
       sessionAnalytics,
       finalDetectionData,
+      detectionTimeline,
       completedAt: sessionEndTime.toISOString()
     };
 
@@ -127,6 +179,7 @@ export async function POST(request) {
         sessionCheatingRiskScore: sessionAnalytics.averageRisk,
         sessionCheatingAlertsCount: sessionAnalytics.totalAlerts,
         sessionCheatingSeverityLevel: finalSessionSeverityLevel,
+        sessionCheatingViolations: JSON.stringify(finalViolations),
         updatedAt: sessionEndTime
       })
       .where(eq(SessionCheatingDetection.id, session.id));
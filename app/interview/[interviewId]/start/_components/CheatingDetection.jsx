@@ -48,6 +48,7 @@ const CheatingDetection = forwardRef(({
   const tabSwitchTimeRef = useRef(Date.now());
   const typingStartTimeRef = useRef(null);
   const headMovementHistoryRef = useRef([]);
+  const devicePacingRef = useRef({ nextAt: 0, lastResult: null }); // Backend-requested capture pacing
 
   // YOLO-only detection settings
   const settings = {
@@ -316,6 +317,12 @@ const CheatingDetection = forwardRef(({
 
   // YOLO-only device detection
   const detectDevices = useCallback(async (videoElement) => {
+    // Reuse the last result until the backend's recommended interval has passed
+    const pacing = devicePacingRef.current;
+    if (pacing.lastResult && Date.now() < pacing.nextAt) {
+      return pacing.lastResult;
+    }
+
     try {
       const canvas = canvasRef.current;
       const ctx = canvas.getContext('2d');
@@ -328,15 +335,27 @@ const CheatingDetection = forwardRef(({
       const imageData = canvas.toDataURL('image/jpeg', 0.8);
       
       // Call YOLO backend API
+      const sentAt = Date.now();
       const response = await fetch('/api/detect-mobile', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ image: imageData })
+        body: JSON.stringify({ image: imageData, session_id: sessionId })
       });
 
       if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        if (errorData.throttled) {
+          // Backend is overloaded: back off and keep showing the last result
+          const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+          pacing.nextAt = Date.now() + retryAfter * 1000;
+          console.warn(`YOLO backend busy (${errorData.reason}), retrying in ${retryAfter}s`);
+          if (pacing.lastResult) {
+            return pacing.lastResult;
+          }
+        }
+
         console.error('YOLO backend unavailable - device detection disabled');
         return {
           phoneDetected: false,
@@ -406,7 +425,11 @@ const CheatingDetection = forwardRef(({
         }));
       }
 
-      return {
+      // Slow down to the backend's recommended capture interval under load
+      const recommendedInterval = Number(response.headers.get('X-Recommended-Interval-Ms')) || 0;
+      pacing.nextAt = recommendedInterval > settings.detectionInterval ? sentAt + recommendedInterval : 0;
+
+      pacing.lastResult = {
         phoneDetected,
         deviceType,
         confidence,
@@ -418,6 +441,7 @@ const CheatingDetection = forwardRef(({
         },
         landmarks: deviceLandmarks
       };
+      return pacing.lastResult;
     } catch (error) {
       console.error('YOLO device detection error:', error);
       return {
@@ -440,7 +464,7 @@ const CheatingDetection = forwardRef(({
         }
       };
     }
-  }, []);
+  }, [sessionId, settings.detectionInterval]);
 
   // Enhanced head movement detection using face landmarks
   const detectHeadMovement = useCallback(async (videoElement) => {
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the YOLO Mobile Detection API.
+
+Two modes:
+
+    micro   Times each stage of the detection pipeline (JSON parse, base64
+            decode, imdecode, binary decode, preprocessing, inference,
+            post-processing, serialization and a full in-process request) on
+            a fixed set of synthetic frames and, optionally, recorded JPEGs.
+
+    load    Drives /api/detect-mobile (or /api/detect-mobile/frame) with N
+            concurrent interview sessions, each sending frames at a fixed
+            rate, and reports latency percentiles, throughput and errors.
+            Without --url it starts the API in-process on a free port.
+
+Both modes run offline with a deterministic stand-in model by default, so
+serving-code regressions can be caught without the real weights. Pass
+--model models/best.pt to benchmark the real detector instead.
+
+Results can be saved with --save and compared against an earlier run with
+--compare; the exit code is 1 if any p95 got slower than --max-regression.
+
+Examples:
+    python benchmark_detection.py micro --iterations 200
+    python benchmark_detection.py load --sessions 50 --fps 0.5 --duration 30
+    python benchmark_detection.py micro --save baseline.json
+    python benchmark_detection.py micro --compare baseline.json
+"""
+
+import argparse
+import base64
+import glob
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+# Frame sizes the browser typically produces (videoWidth x videoHeight)
+SYNTHETIC_SIZES = [(640, 480), (1280, 720)]
+
+# Session ID prefix of load-test sessions; the API's default
+# DETECTION_SESSION_IGNORE_PREFIX, so they stay out of the session sink
+LOAD_SESSION_PREFIX = 'loadtest-'
+
+# Classes the stand-in model emits: a mix of mobile, excluded and other classes
+STAND_IN_CLASSES = [67, 0, 73, 62, 77, 41, 1, 74]
+
+
+class StandInBoxes:
+    def __init__(self, data):
+        self.data = data
+
+
+class StandInResult:
+    def __init__(self, data, shape):
+        self.boxes = StandInBoxes(data)
+        self.orig_shape = shape[:2]
+
+
+class StandInModel:
+    """Deterministic replacement for YOLO with a fixed per-pixel CPU cost.
+
+    It resizes each frame to the inference size and filters it, so its cost
+    scales with resolution and batch size like the real model, then returns
+    the same set of boxes (scaled to the frame) every time.
+    """
+
+    device = 'cpu'
+
+    def __init__(self, boxes=20, seed=0):
+        rng = np.random.default_rng(seed)
+        x1 = rng.uniform(0, 0.8, boxes)
+        y1 = rng.uniform(0, 0.8, boxes)
+        data = np.stack([
+            x1, y1,
+            np.minimum(x1 + rng.uniform(0.02, 0.5, boxes), 1.0),
+            np.minimum(y1 + rng.uniform(0.02, 0.5, boxes), 1.0),
+            rng.uniform(0.3, 1.0, boxes),
+            np.resize(STAND_IN_CLASSES, boxes),
+        ], axis=1)
+        self._boxes = data.astype(np.float32)
+
+    def __call__(self, frames, verbose=False, imgsz=640, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        results = []
+        for frame in frames:
+            height, width = frame.shape[:2]
+            scale = imgsz / max(height, width)
+            resized = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))))
+            tensor = resized.astype(np.float32) / 255.0
+            for _ in range(3):
+                tensor = cv2.GaussianBlur(tensor, (5, 5), 0)
+
+            data = self._boxes.copy()
+            data[:, [0, 2]] *= width
+            data[:, [1, 3]] *= height
+            results.append(StandInResult(data, frame.shape))
+        return results
+
+
+def rss_mb(pid=None):
+    """Resident set size in MB for a process (Linux /proc), or peak RSS of this one"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+        except ImportError:
+            pass
+    return None
+
+
+def synthetic_frame(width, height, seed=0):
+    """A webcam-like frame: smooth background, a face-sized blob and a phone-sized box"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    frame = np.repeat(gradient[None, :, None], height, axis=0).repeat(3, axis=2)
+    frame += rng.normal(0, 8, frame.shape).astype(np.float32)
+    frame = frame.clip(0, 255).astype(np.uint8)
+    cv2.ellipse(frame, (width // 2, height // 3), (width // 8, height // 5), 0, 0, 360, (150, 170, 200), -1)
+    cv2.rectangle(frame, (width // 5, height // 2), (width // 5 + width // 12, height // 2 + height // 5),
+                  (30, 30, 30), -1)
+    return frame
+
+
+def load_frames(frames_dir=None):
+    """Return [(label, jpeg_bytes)] for the synthetic set plus any recorded frames"""
+    frames = []
+    for i, (width, height) in enumerate(SYNTHETIC_SIZES):
+        ok, encoded = cv2.imencode('.jpg', synthetic_frame(width, height, seed=i),
+                                   [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append((f"synthetic_{width}x{height}", encoded.tobytes()))
+    if frames_dir:
+        for path in sorted(glob.glob(os.path.join(frames_dir, '*'))):
+            if path.lower().endswith(('.jpg', '.jpeg', '.png')):
+                with open(path, 'rb') as f:
+                    frames.append((os.path.basename(path), f.read()))
+    return frames
+
+
+def summarize(durations, wall_time=None):
+    """Latency percentiles in milliseconds plus throughput"""
+    values = np.asarray(durations, dtype=np.float64) * 1000
+    if len(values) == 0:
+        return {'count': 0}
+    total = wall_time if wall_time is not None else values.sum() / 1000
+    return {
+        'count': int(len(values)),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'mean_ms': float(values.mean()),
+        'throughput_per_s': float(len(values) / total) if total > 0 else 0.0,
+    }
+
+
+def time_calls(fn, iterations, warmup=5):
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def setup_api(model_path=None, batching=False):
+    """Import the API with either the real model or the stand-in loaded"""
+    os.environ.setdefault('DETECTION_LOG_LEVEL', 'WARNING')
+    # Frames repeat across iterations, so the result cache would only measure
+    # cache hits; set DETECTION_CACHE=1 explicitly to benchmark with it on
+    os.environ.setdefault('DETECTION_CACHE', '0')
+    # Benchmark frames aren't interviews; keep them out of the session sink
+    os.environ.setdefault('DETECTION_SESSION_SINK', '')
+    import mobile_detection_api as api
+
+    if model_path:
+        import model_backends
+        api.model, api.model_source = model_backends.load_detector(
+            model_path, api.MODEL_BACKEND, imgsz=api.EXPORT_IMAGE_SIZE, cache_dir=api.MODEL_CACHE_DIR,
+            precision=api.MODEL_PRECISION, calibration_dir=api.CALIBRATION_DIR
+        )
+    else:
+        api.model = StandInModel()
+        api.model_source = {'backend': 'stand-in', 'weights_path': None, 'artifact_path': None}
+    api.warm_up_model()
+    if batching:
+        api.start_batcher()
+    return api
+
+
+def run_micro(args):
+    api = setup_api(args.model)
+    client = api.app.test_client()
+    results = {}
+
+    for label, jpeg in load_frames(args.frames_dir):
+        data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()
+        body = json.dumps({'image': data_url})
+        frame = api.decode_base64_image(data_url)
+        inputs, transform = api.prepare_frame(frame, api.INFERENCE_IMAGE_SIZE, None, api.LETTERBOX_MODE)
+        result = api.run_inference([inputs])[0]
+        frame_dets = api.frame_detections(result, transform, frame.shape)
+        response = api.build_detection_response(frame_dets, frame.shape)
+
+        def binary_decode():
+            buf, size = api.read_frame_bytes(io.BytesIO(jpeg), len(jpeg))
+            api.decode_frame_bytes(buf, size)
+
+        stages = {
+            'json_parse': lambda: json.loads(body),
+            'base64_decode': lambda: base64.b64decode(data_url.split(',')[1]),
+            'imdecode': lambda: cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR),
+            'binary_decode': binary_decode,
+            'prepare_frame': lambda: api.prepare_frame(frame, api.INFERENCE_IMAGE_SIZE, None, api.LETTERBOX_MODE),
+            'inference': lambda: api.run_inference([inputs]),
+            f'inference_batch{args.batch}': lambda: api.run_inference([inputs] * args.batch),
+            'postprocess': lambda: (api.extract_mobile_detections(
+                api.frame_detections(result, transform, frame.shape), frame.shape)),
+            'serialize': lambda: json.dumps(response),
+            'request_json': lambda: client.post('/api/detect-mobile', data=body,
+                                                content_type='application/json'),
+            'request_binary': lambda: client.post('/api/detect-mobile/frame', data=jpeg,
+                                                  content_type='image/jpeg'),
+        }
+        for stage, fn in stages.items():
+            results[f"{stage}/{label}"] = summarize(time_calls(fn, args.iterations))
+
+    results['_process'] = {'rss_mb': rss_mb(), 'backend': api.model_source.get('backend')}
+    return results
+
+
+class SessionWorker(threading.Thread):
+    """One simulated interview: sends a frame every 1/fps seconds over a keep-alive connection"""
+
+    def __init__(self, url, path, payload, headers, fps, deadline, start_at):
+        super().__init__(daemon=True)
+        self.url = url
+        self.path = path
+        self.payload = payload
+        self.headers = headers
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.deadline = deadline
+        self.start_at = start_at
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=30)
+
+    def run(self):
+        conn = self._connect()
+        next_send = self.start_at
+        while next_send < self.deadline:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            try:
+                conn.request('POST', self.path, body=self.payload, headers=self.headers)
+                response = conn.getresponse()
+                response.read()
+                self.latencies.append(time.perf_counter() - start)
+                self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+                conn = self._connect()
+            # Fixed schedule: if a request overruns, the next frame goes out immediately
+            next_send += self.interval
+        conn.close()
+
+
+def start_local_server(args):
+    """Serve the API in-process on a free port; returns (base_url, server)"""
+    import logging
+    from werkzeug.serving import make_server
+
+    api = setup_api(args.model, batching=not args.no_batching)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.port}", server
+
+
+def run_load(args):
+    server = None
+    base_url = args.url
+    if not base_url:
+        base_url, server = start_local_server(args)
+
+    url = urlparse(base_url)
+    _, jpeg = load_frames(args.frames_dir)[args.frame_index]
+    if args.endpoint == 'frame':
+        path = url.path.rstrip('/') + '/api/detect-mobile/frame'
+        payload = jpeg
+        headers = {'Content-Type': 'image/jpeg'}
+    else:
+        path = url.path.rstrip('/') + '/api/detect-mobile'
+        payload = json.dumps({'image': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()})
+        headers = {'Content-Type': 'application/json'}
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    # Spread session start times over one frame interval, like real interviews
+    spread = 1.0 / args.fps if args.fps > 0 else 0.0
+    workers = [
+        SessionWorker(url, path, payload, dict(headers, **{'X-Session-Id': f"{LOAD_SESSION_PREFIX}{i}"}),
+                      args.fps, deadline, start + spread * i / max(1, args.sessions))
+        for i in range(args.sessions)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall_time = time.monotonic() - start
+
+    latencies = [lat for w in workers for lat in w.latencies]
+    statuses = {}
+    for worker in workers:
+        for status, count in worker.statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    summary = summarize(latencies, wall_time)
+    summary.update({
+        'sessions': args.sessions,
+        'target_fps_per_session': args.fps,
+        'offered_per_s': args.sessions * args.fps,
+        'statuses': statuses,
+        'connection_errors': sum(w.errors for w in workers),
+        'rss_mb': rss_mb(args.server_pid) if (args.server_pid or server) else None,
+    })
+    if server is not None:
+        server.shutdown()
+    return {f"load/{args.endpoint}": summary}
+
+
+def print_results(results):
+    print(f"{'benchmark':<44} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>9}")
+    print('-' * 90)
+    for name, stats in results.items():
+        if name.startswith('_') or 'p50_ms' not in stats:
+            continue
+        print(f"{name:<44} {stats['count']:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['throughput_per_s']:>9.1f}")
+        extra = {k: stats[k] for k in ('statuses', 'connection_errors', 'rss_mb') if k in stats}
+        if extra:
+            print(f"    {extra}")
+    if '_process' in results:
+        print(f"\nprocess: {results['_process']}")
+
+
+def compare_results(results, baseline_path, max_regression):
+    """Print p95 changes against a saved run; return the names that regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nComparison with {baseline_path} (p95):")
+    for name, stats in results.items():
+        old = baseline.get(name, {})
+        if 'p95_ms' not in stats or 'p95_ms' not in old or old['p95_ms'] <= 0:
+            continue
+        change = stats['p95_ms'] / old['p95_ms'] - 1
+        flag = ''
+        if change > max_regression:
+            regressions.append(name)
+            flag = '  <-- REGRESSION'
+        print(f"  {name:<44} {old['p95_ms']:>9.3f} -> {stats['p95_ms']:>9.3f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--model', help="Weights to benchmark instead of the stand-in model")
+    common.add_argument('--frames-dir', help="Directory of recorded .jpg/.png frames to add")
+    common.add_argument('--save', help="Write results as JSON to this file")
+    common.add_argument('--compare', help="Compare against results saved with --save")
+    common.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed relative p95 slowdown before failing (default 0.2)")
+
+    parser = argparse.ArgumentParser(description="Benchmark the YOLO mobile detection API")
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    micro = sub.add_parser('micro', parents=[common], help="Per-stage micro-benchmarks")
+    micro.add_argument('--iterations', type=int, default=100)
+    micro.add_argument('--batch', type=int, default=8, help="Frames per batched inference call")
+
+    load = sub.add_parser('load', parents=[common], help="End-to-end HTTP load generator")
+    load.add_argument('--url', help="Base URL of a running API (default: start one in-process)")
+    load.add_argument('--sessions', type=int, default=20, help="Concurrent interview sessions")
+    load.add_argument('--fps', type=float, default=0.5, help="Frames per second per session")
+    load.add_argument('--duration', type=float, default=20, help="Test length in seconds")
+    load.add_argument('--endpoint', choices=['json', 'frame'], default='json')
+    load.add_argument('--frame-index', type=int, default=0, help="Which frame of the set to send")
+    load.add_argument('--server-pid', type=int, help="PID of the server, to report its RSS")
+    load.add_argument('--no-batching', action='store_true', help="In-process server without micro-batching")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_micro(args) if args.mode == 'micro' else run_load(args)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare and compare_results(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Accuracy-vs-speed comparison of detector variants (backend + precision).
+
+Runs every variant over the same labeled frame set through the API's own
+preprocessing and filtering, and reports:
+
+    map50 / map50_95    COCO-style mAP of all boxes the model returns
+    phone_recall        labeled phones matched (IoU >= 0.5) by a reported detection
+    frame_recall        frames with a labeled phone that /api/detect-mobile flags
+    false_alarm_rate    frames without a phone that it flags anyway
+    latency             per-frame preprocessing + inference time
+    rss_mb              process memory after loading the variant
+
+The first variant is the baseline; the others are reported as deltas to it.
+Each variant runs in a fresh process so memory figures don't mix.
+
+Labels use the YOLO text format: one "class cx cy w h" line per box, with
+coordinates normalized to 0-1, in a .txt file with the same stem as the image,
+either next to it or in a sibling labels/ directory (images/x.jpg ->
+labels/x.txt). Images without a label file count as having no objects.
+
+Usage:
+    python compare_models.py --weights models/best.pt --data frames/ \\
+        --variants pytorch:fp32 onnx:fp32 onnx:int8 openvino:fp16
+    python compare_models.py --weights models/best.pt --data frames/ \\
+        --variants onnx:fp32 onnx:int8 --calibration calibration/ --max-recall-drop 0.01
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from benchmark_detection import rss_mb, summarize
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+RECALL_POINTS = np.linspace(0, 1, 101)
+
+
+def label_path(image_path):
+    stem = os.path.splitext(image_path)[0]
+    beside = stem + '.txt'
+    if os.path.exists(beside):
+        return beside
+    directory, name = os.path.split(stem)
+    parent, leaf = os.path.split(directory)
+    if leaf == 'images':
+        return os.path.join(parent, 'labels', name + '.txt')
+    return beside
+
+
+def read_labels(path, frame_shape):
+    """Ground-truth boxes of one image as an (N, 5) array of x1, y1, x2, y2, cls in pixels"""
+    height, width = frame_shape[:2]
+    if not os.path.exists(path):
+        return np.zeros((0, 5), dtype=np.float32)
+    rows = np.loadtxt(path, dtype=np.float32, ndmin=2)
+    if rows.size == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    cls, cx, cy, w, h = rows[:, 0], rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2, cls], axis=1)
+
+
+def find_images(data_dir):
+    return sorted(p for p in glob.glob(os.path.join(data_dir, '**', '*'), recursive=True)
+                  if p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def box_iou(a, b):
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy arrays"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_predictions(pred_boxes, pred_scores, gt_boxes):
+    """True-positive flags (P, T) of predictions against one class's ground truth,
+    greedily by descending score, at each IoU threshold"""
+    tp = np.zeros((len(pred_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    ious = box_iou(pred_boxes, gt_boxes)
+    order = np.argsort(-pred_scores, kind='stable')
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        taken = np.zeros(len(gt_boxes), dtype=bool)
+        for i in order:
+            candidates = np.where(~taken & (ious[i] >= threshold), ious[i], -1)
+            best = int(np.argmax(candidates))
+            if candidates[best] >= 0:
+                taken[best] = True
+                tp[i, t] = True
+    return tp
+
+
+def average_precision(tp, scores, n_gt):
+    """COCO 101-point interpolated AP for each IoU threshold"""
+    if n_gt == 0:
+        return None
+    if len(scores) == 0:
+        return np.zeros(tp.shape[1])
+    order = np.argsort(-scores, kind='stable')
+    tp_cum = np.cumsum(tp[order], axis=0)
+    fp_cum = np.cumsum(~tp[order], axis=0)
+    recall = tp_cum / n_gt
+    precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        # Precision envelope: best precision at this recall or any higher one
+        envelope = np.maximum.accumulate(precision[::-1, t])[::-1]
+        indices = np.searchsorted(recall[:, t], RECALL_POINTS, side='left')
+        ap[t] = np.mean(np.where(indices < len(envelope), envelope[np.minimum(indices, len(envelope) - 1)], 0))
+    return ap
+
+
+class Evaluator:
+    """Accumulates detections and labels over a frame set"""
+
+    def __init__(self, mobile_classes):
+        self.mobile_classes = np.asarray(sorted(mobile_classes))
+        self.per_class = {}  # cls -> [scores list, tp list, n_gt]
+        self.phones = 0
+        self.phones_found = 0
+        self.phone_frames = 0
+        self.phone_frames_flagged = 0
+        self.empty_frames = 0
+        self.empty_frames_flagged = 0
+
+    def add(self, detections, mobile_detections, labels):
+        """detections: (N, 6) frame_detections(); mobile_detections: the API's filtered list"""
+        for cls in np.union1d(detections[:, 5], labels[:, 4]).astype(np.int64):
+            preds = detections[detections[:, 5] == cls]
+            gts = labels[labels[:, 4] == cls]
+            entry = self.per_class.setdefault(int(cls), [[], [], 0])
+            entry[0].append(preds[:, 4])
+            entry[1].append(match_predictions(preds[:, :4], preds[:, 4], gts[:, :4]))
+            entry[2] += len(gts)
+
+        phones = labels[np.isin(labels[:, 4], self.mobile_classes)]
+        reported = np.array([d['bbox'] for d in mobile_detections], dtype=np.float32).reshape(-1, 4)
+        self.phones += len(phones)
+        if len(phones) and len(reported):
+            self.phones_found += int((box_iou(phones[:, :4], reported).max(axis=1) >= 0.5).sum())
+        flagged = bool(mobile_detections)
+        if len(phones):
+            self.phone_frames += 1
+            self.phone_frames_flagged += flagged
+        else:
+            self.empty_frames += 1
+            self.empty_frames_flagged += flagged
+
+    def summary(self):
+        aps = []
+        for scores, tps, n_gt in self.per_class.values():
+            ap = average_precision(np.concatenate(tps), np.concatenate(scores), n_gt)
+            if ap is not None:
+                aps.append(ap)
+        aps = np.array(aps) if aps else np.zeros((0, len(IOU_THRESHOLDS)))
+
+        def ratio(a, b):
+            return round(a / b, 4) if b else None
+
+        return {
+            'map50': round(float(aps[:, 0].mean()), 4) if len(aps) else None,
+            'map50_95': round(float(aps.mean()), 4) if len(aps) else None,
+            'phone_recall': ratio(self.phones_found, self.phones),
+            'frame_recall': ratio(self.phone_frames_flagged, self.phone_frames),
+            'false_alarm_rate': ratio(self.empty_frames_flagged, self.empty_frames),
+            'labeled_phones': self.phones,
+        }
+
+
+def artifact_size_mb(path):
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    else:
+        size = os.path.getsize(path)
+    return round(size / (1024 * 1024), 2)
+
+
+def evaluate_variant(weights, backend, precision, images, calibration_dir=None, warmup=3):
+    """Load one variant in this process and evaluate it over the labeled images"""
+    os.environ.setdefault('DETECTION_LOG_LEVEL', 'WARNING')
+    os.environ['DETECTION_CACHE'] = '0'
+    os.environ['DETECTION_ROI'] = '0'
+    import mobile_detection_api as api
+    import model_backends
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    api.model, api.model_source = model_backends.load_detector(
+        weights, backend, imgsz=api.EXPORT_IMAGE_SIZE, cache_dir=api.MODEL_CACHE_DIR,
+        precision=precision, calibration_dir=calibration_dir
+    )
+    loaded = (api.model_source.get('backend'), api.model_source.get('precision'))
+    if loaded != (backend, precision):
+        # load_detector falls back rather than failing; that would compare the wrong model
+        raise RuntimeError(f"{backend}:{precision} unavailable, would run {loaded[0]}:{loaded[1]}")
+    api.warm_up_model()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    evaluator = Evaluator(api.MOBILE_CLASSES)
+    durations = []
+    for index, path in enumerate(images):
+        frame = cv2.imread(path)
+        if frame is None:
+            logger.warning(f"Skipping unreadable image {path}")
+            continue
+        if index < warmup:
+            api.infer_frames([frame])
+        began = time.perf_counter()
+        detections = api.infer_frames([frame])[0]
+        durations.append(time.perf_counter() - began)
+        _, mobile_detections, _ = api.extract_mobile_detections(detections, frame.shape)
+        evaluator.add(detections, mobile_detections, read_labels(label_path(path), frame.shape))
+
+    latency = summarize(durations)
+    return {
+        'variant': f"{backend}:{precision}",
+        'backend': api.model_source.get('backend'),
+        'precision': api.model_source.get('precision'),
+        'artifact_path': api.model_source.get('artifact_path'),
+        'artifact_mb': artifact_size_mb(api.model_source.get('artifact_path')),
+        'frames': len(durations),
+        **evaluator.summary(),
+        'latency_p50_ms': round(latency.get('p50_ms', 0), 2),
+        'latency_p95_ms': round(latency.get('p95_ms', 0), 2),
+        'frames_per_s': round(latency.get('throughput_per_s', 0), 2),
+        'load_seconds': round(load_seconds, 2),
+        'rss_mb': round(rss_loaded, 1) if rss_loaded else None,
+        'model_rss_mb': round(rss_loaded - rss_before, 1) if rss_loaded and rss_before else None,
+    }
+
+
+def add_deltas(results):
+    """Deltas of each variant against the first (baseline) one"""
+    baseline = results[0]
+    for result in results[1:]:
+        if 'error' in result or 'error' in baseline:
+            continue
+        deltas = {}
+        for key in ('map50', 'map50_95', 'phone_recall', 'frame_recall', 'false_alarm_rate'):
+            if result.get(key) is not None and baseline.get(key) is not None:
+                deltas[key] = round(result[key] - baseline[key], 4)
+        if baseline.get('latency_p50_ms') and result.get('latency_p50_ms'):
+            deltas['speedup'] = round(baseline['latency_p50_ms'] / result['latency_p50_ms'], 2)
+        if baseline.get('model_rss_mb') is not None and result.get('model_rss_mb') is not None:
+            deltas['model_rss_mb'] = round(result['model_rss_mb'] - baseline['model_rss_mb'], 1)
+        result['vs_baseline'] = deltas
+    return results
+
+
+def run_variant(args):
+    weights, backend, precision, images, calibration_dir = args
+    try:
+        return evaluate_variant(weights, backend, precision, images, calibration_dir)
+    except Exception as e:
+        return {'variant': f"{backend}:{precision}", 'error': str(e)}
+
+
+def compare(weights, variants, images, calibration_dir=None):
+    """Evaluate each (backend, precision) variant in its own process, in order"""
+    results = []
+    # spawn: a fresh interpreter per variant, so memory figures and thread pools don't mix
+    context = multiprocessing.get_context('spawn')
+    for backend, precision in variants:
+        logger.info(f"Evaluating {backend}:{precision} on {len(images)} frames...")
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            results.append(pool.submit(run_variant, (weights, backend, precision, images, calibration_dir)).result())
+    return add_deltas(results)
+
+
+def print_table(results):
+    columns = [('variant', 16), ('precision', 9), ('map50', 7), ('map50_95', 8), ('phone_recall', 12),
+               ('frame_recall', 12), ('false_alarm_rate', 16), ('latency_p50_ms', 14), ('model_rss_mb', 12)]
+    print('  '.join(name.ljust(width) for name, width in columns))
+    for result in results:
+        if 'error' in result:
+            print(f"{result['variant'].ljust(16)}  error: {result['error']}")
+            continue
+        print('  '.join(str(result.get(name, '')).ljust(width) for name, width in columns))
+        if 'vs_baseline' in result:
+            print(' ' * 18 + ', '.join(f"{k} {v:+}" if k != 'speedup' else f"speedup x{v}"
+                                       for k, v in result['vs_baseline'].items()))
+
+
+def parse_variant(value):
+    backend, _, precision = value.partition(':')
+    return backend.lower(), (precision or 'fp32').lower()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare detector variants on a labeled frame set")
+    parser.add_argument('--weights', default='models/best.pt', help="PyTorch weights (default models/best.pt)")
+    parser.add_argument('--data', required=True, help="Directory of labeled frames (YOLO txt labels)")
+    parser.add_argument('--variants', nargs='+', type=parse_variant,
+                        default=[('pytorch', 'fp32'), ('onnx', 'fp32'), ('onnx', 'int8')],
+                        help="backend:precision pairs, baseline first (default pytorch:fp32 onnx:fp32 onnx:int8)")
+    parser.add_argument('--calibration', help="Images for static INT8 calibration (default: dynamic INT8)")
+    parser.add_argument('--limit', type=int, help="Only use the first N frames")
+    parser.add_argument('--max-recall-drop', type=float, default=None,
+                        help="Exit 1 if any variant's phone recall is lower than the baseline's by more than this")
+    parser.add_argument('--output', help="Also write the results as JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    args = parse_args(argv)
+    images = find_images(args.data)[:args.limit]
+    if not images:
+        logger.error(f"No images found in {args.data}")
+        return 1
+
+    results = compare(args.weights, args.variants, images, args.calibration)
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = [r['variant'] for r in results if 'error' in r]
+    if args.max_recall_drop is not None:
+        failed += [r['variant'] for r in results[1:]
+                   if r.get('vs_baseline', {}).get('phone_recall', 0) < -args.max_recall_drop]
+    if failed:
+        logger.error(f"❌ Failed or regressed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
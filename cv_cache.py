@@ -0,0 +1,158 @@
+"""
+Persistent cache of parsed CV text and job-matcher embeddings.
+
+Entries are keyed by the SHA-256 of the uploaded document, so a candidate who
+uploads the same CV again (or opens recommendations and feedback for it)
+gets a lookup instead of a reparse plus an encode. The cache is a single
+SQLite file:
+
+- text is valid only for the parser_version it was extracted with;
+- the embedding is valid only for the model_version that produced it;
+- stale parts are treated as missing and overwritten on the next store.
+
+Total stored bytes are bounded: once over max_bytes, the least recently used
+entries are deleted until the cache is back under 90% of the limit.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CVEntry = namedtuple('CVEntry', ['text', 'embedding'])
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cv_cache (
+    sha256 TEXT PRIMARY KEY,
+    parser_version TEXT NOT NULL,
+    text TEXT NOT NULL,
+    model_version TEXT,
+    embedding BLOB,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+)
+'''
+
+
+def document_key(data):
+    """SHA-256 hex digest of an uploaded document"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class CVCache:
+    """SQLite-backed, size-bounded LRU cache of CV text and embeddings"""
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, parser_version='', model_version=''):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.parser_version = parser_version
+        self.model_version = model_version
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(_SCHEMA)
+        self._db.execute('CREATE INDEX IF NOT EXISTS cv_cache_lru ON cv_cache (last_access)')
+        self._db.commit()
+        self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM cv_cache').fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM cv_cache').fetchone()[0]
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def get(self, sha256):
+        """Cached CVEntry for a document hash, or None if its text is missing or stale.
+
+        The embedding is None when it was never stored or came from another model.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT parser_version, text, model_version, embedding FROM cv_cache WHERE sha256 = ?',
+                (sha256,)
+            ).fetchone()
+            if row is None or row[0] != self.parser_version:
+                self.misses += 1
+                return None
+            self._db.execute('UPDATE cv_cache SET last_access = ? WHERE sha256 = ?', (time.time(), sha256))
+            self._db.commit()
+            self.hits += 1
+
+        embedding = None
+        if row[3] is not None and row[2] == self.model_version:
+            embedding = np.frombuffer(row[3], dtype=np.float32)
+        return CVEntry(row[1], embedding)
+
+    def put(self, sha256, text, embedding=None):
+        """Store extracted text, and optionally its embedding, for a document hash"""
+        blob = None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes()
+        size = len(text.encode('utf-8')) + (len(blob) if blob is not None else 0)
+        with self._lock:
+            old = self._db.execute('SELECT size FROM cv_cache WHERE sha256 = ?', (sha256,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO cv_cache '
+                '(sha256, parser_version, text, model_version, embedding, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (sha256, self.parser_version, text, self.model_version if blob is not None else None,
+                 blob, size, time.time())
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+            self._db.commit()
+
+    def put_embedding(self, sha256, embedding):
+        """Attach an embedding to an entry whose text is already cached"""
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            row = self._db.execute('SELECT size, embedding FROM cv_cache WHERE sha256 = ?',
+                                   (sha256,)).fetchone()
+            if row is None:
+                return False
+            size = row[0] - (len(row[1]) if row[1] is not None else 0) + len(blob)
+            self._db.execute(
+                'UPDATE cv_cache SET model_version = ?, embedding = ?, size = ?, last_access = ? '
+                'WHERE sha256 = ?',
+                (self.model_version, blob, size, time.time(), sha256)
+            )
+            self._size += size - row[0]
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+            self._db.commit()
+            return True
+
+    def _evict(self, target):
+        doomed = []
+        for sha256, size in self._db.execute('SELECT sha256, size FROM cv_cache ORDER BY last_access'):
+            if self._size <= target:
+                break
+            doomed.append((sha256,))
+            self._size -= size
+        self._db.executemany('DELETE FROM cv_cache WHERE sha256 = ?', doomed)
+        self.evictions += len(doomed)
+        logger.info(f"CV cache evicted {len(doomed)} entries ({self._size} bytes left)")
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM cv_cache')
+            self._db.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
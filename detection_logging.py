@@ -0,0 +1,172 @@
+"""
+Logging setup for the detection service.
+
+Request threads only put log records on an in-memory queue; a background
+QueueListener thread formats them and writes them out, so slow stream I/O
+never sits on the detection hot path. Records are formatted in the listener,
+not in the request thread. Extra fields passed with ``extra={...}`` are
+rendered as ``key=value`` pairs (or as JSON with DETECTION_LOG_FORMAT=json),
+so per-request summaries can be logged as structured data.
+
+Per-box messages are logged at DEBUG through a LogSampler, which keeps only a
+fraction of them and caps how many are written per second.
+
+Environment:
+    DETECTION_LOG_LEVEL             root log level (default INFO)
+    DETECTION_LOG_FORMAT            text or json (default text)
+    DETECTION_LOG_ASYNC             1 to log through the queue (default 1)
+    DETECTION_BOX_LOG_SAMPLE_RATE   fraction of per-box messages kept (default 1.0)
+    DETECTION_BOX_LOG_MAX_PER_SEC   cap on per-box messages per second (default 50)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+_output_handler = None
+
+
+def record_fields(record):
+    """Structured fields attached to a record with extra={...}"""
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter that appends extra fields as key=value pairs, or emits JSON lines"""
+
+    def __init__(self, fmt=None, json_output=False):
+        super().__init__(fmt or '%(asctime)s %(levelname)s %(name)s: %(message)s')
+        self.json_output = json_output
+
+    def format(self, record):
+        fields = record_fields(record)
+        if self.json_output:
+            payload = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                payload['exc_info'] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+
+        line = super().format(record)
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats the message before queueing it, which is
+    exactly the work we want off the request thread. The queue never leaves
+    this process, so the record can be passed through as is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class LogSampler:
+    """Decide whether to emit a high-volume message: random sampling plus a rate cap"""
+
+    def __init__(self, sample_rate=1.0, max_per_second=50):
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def should_log(self):
+        if self.sample_rate <= 0:
+            return False
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.max_per_second <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            if self._window_count >= self.max_per_second:
+                return False
+            self._window_count += 1
+            return True
+
+
+def box_log_sampler():
+    """Sampler for per-box detection messages, configured from the environment"""
+    return LogSampler(
+        sample_rate=float(os.environ.get('DETECTION_BOX_LOG_SAMPLE_RATE', '1.0')),
+        max_per_second=int(os.environ.get('DETECTION_BOX_LOG_MAX_PER_SEC', '50')),
+    )
+
+
+def _start_listener():
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, _output_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # Threads don't survive fork: give each worker its own queue and listener
+    if _queue_handler is not None:
+        _start_listener()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(level=None, json_output=None, async_logging=None):
+    """Install the service's log handlers on the root logger (idempotent)"""
+    global _queue_handler, _output_handler
+
+    level = level or os.environ.get('DETECTION_LOG_LEVEL', 'INFO').upper()
+    if json_output is None:
+        json_output = os.environ.get('DETECTION_LOG_FORMAT', 'text').lower() == 'json'
+    if async_logging is None:
+        async_logging = os.environ.get('DETECTION_LOG_ASYNC', '1') == '1'
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    _output_handler = logging.StreamHandler()
+    _output_handler.setFormatter(StructuredFormatter(json_output=json_output))
+
+    if not async_logging:
+        _queue_handler = None
+        root.addHandler(_output_handler)
+        return
+
+    _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    root.addHandler(_queue_handler)
+    _start_listener()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+atexit.register(stop_logging)
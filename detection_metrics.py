@@ -0,0 +1,181 @@
+"""
+Prometheus metrics for the detection service.
+
+Exposes per-stage latency histograms for detect-mobile (JSON parse, base64
+decode, image decode, inference, pipeline round trip, post-processing,
+serialization), request counters by outcome, in-flight requests, admission
+queue depth and rejections, batcher queue depth, pipeline usage, result
+cache hits and misses, the model backend/device in use, hot model swaps,
+shadow-candidate agreement and tracked sessions.
+
+Under serve_detection.py every gunicorn worker writes its samples to
+PROMETHEUS_MULTIPROC_DIR and /metrics aggregates all workers. Without that
+variable (development server) the process-local registry is used.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Stage latencies are mostly well under a frame interval; buckets in seconds
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGES = ('json_parse', 'base64_decode', 'imdecode', 'inference', 'postprocess', 'serialize')
+
+STAGE_SECONDS = Histogram(
+    'detection_stage_seconds',
+    'Time spent in each stage of a detection request',
+    ['stage'],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    'detection_request_seconds',
+    'End-to-end detection request latency',
+    ['endpoint'],
+    buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter(
+    'detection_requests_total',
+    'Detection requests by endpoint and outcome (bad_request, rejected, error, detected, not_detected)',
+    ['endpoint', 'outcome'],
+)
+IN_FLIGHT = Gauge(
+    'detection_requests_in_flight',
+    'Detection requests currently being handled',
+    multiprocess_mode='livesum',
+)
+QUEUE_DEPTH = Gauge(
+    'detection_batch_queue_depth',
+    'Frames waiting in the micro-batcher queue',
+    multiprocess_mode='livesum',
+)
+BATCH_SIZE = Histogram(
+    'detection_batch_size',
+    'Frames per YOLO model call',
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+FRAMES_REUSED = Counter(
+    'detection_frames_reused_total',
+    'Frames answered from per-session tracking without running YOLO',
+)
+ADMISSION_REJECTIONS = Counter(
+    'detection_admission_rejections_total',
+    'Requests shed by admission control, by reason (queue_full, superseded, stale)',
+    ['reason'],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'detection_admission_queue_depth',
+    'Requests waiting for an admission slot',
+    multiprocess_mode='livesum',
+)
+RECOMMENDED_INTERVAL = Gauge(
+    'detection_recommended_interval_seconds',
+    'Capture interval currently recommended to clients',
+    multiprocess_mode='max',
+)
+CACHE_LOOKUPS = Counter(
+    'detection_cache_lookups_total',
+    'Per-frame result cache lookups, by result (hit, perceptual_hit, miss)',
+    ['result'],
+)
+CACHE_ENTRIES = Gauge(
+    'detection_cache_entries',
+    'Frames currently held in the result cache',
+    multiprocess_mode='livesum',
+)
+STREAM_CONNECTIONS = Gauge(
+    'detection_stream_connections',
+    'Open streaming (WebSocket) detection connections',
+    multiprocess_mode='livesum',
+)
+STREAM_FRAMES = Counter(
+    'detection_stream_frames_total',
+    'Frames received on streaming connections, by outcome (processed, dropped)',
+    ['outcome'],
+)
+MODEL_SWAPS = Counter(
+    'detection_model_swaps_total',
+    'Hot model swaps, by reason (load, file_changed, promote, rollback)',
+    ['reason'],
+)
+SHADOW_FRAMES = Counter(
+    'detection_shadow_frames_total',
+    'Frames also run on the shadow candidate, by whether it agreed on phone presence',
+    ['outcome'],
+)
+PIPELINE_FRAMES = Counter(
+    'detection_pipeline_frames_total',
+    'Frames offered to the decode/inference pipeline, by outcome (processed, fallback)',
+    ['outcome'],
+)
+SESSIONS_TRACKED = Gauge(
+    'detection_sessions_tracked',
+    'Interview sessions with rolling detection state in memory',
+    multiprocess_mode='livesum',
+)
+MODEL_INFO = Gauge(
+    'detection_model_info',
+    'Model backend, device and precision currently loaded (1), or loaded before a swap (0)',
+    ['backend', 'device', 'precision'],
+    multiprocess_mode='livemax',
+)
+_model_info_labels = None
+
+
+@contextmanager
+def time_stage(stage):
+    """Observe the duration of a with-block under detection_stage_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_request(endpoint, status_code, mobile_detected=None, duration=None):
+    """Count a finished detection request under its outcome"""
+    if status_code in (429, 503):
+        outcome = 'rejected'
+    elif status_code >= 500:
+        outcome = 'error'
+    elif status_code >= 400:
+        outcome = 'bad_request'
+    elif mobile_detected:
+        outcome = 'detected'
+    else:
+        outcome = 'not_detected'
+    REQUESTS.labels(endpoint, outcome).inc()
+    if duration is not None:
+        REQUEST_SECONDS.labels(endpoint).observe(duration)
+
+
+def set_model_info(backend, device, precision=None):
+    global _model_info_labels
+    labels = (backend or 'unknown', device or 'unknown', precision or 'unknown')
+    # clear() doesn't touch the multiprocess mmap files, so the old label set
+    # would keep reporting 1; zero it explicitly instead
+    if _model_info_labels is not None and _model_info_labels != labels:
+        MODEL_INFO.labels(*_model_info_labels).set(0)
+    MODEL_INFO.labels(*labels).set(1)
+    _model_info_labels = labels
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,46 @@
+"""
+Helpers for the streaming (WebSocket) detection channel.
+
+A live interview sends frames faster than inference sometimes keeps up with.
+Older frames are worthless once a newer one has arrived, so each connection
+holds at most one pending frame: the receiver overwrites it, and the
+inference worker always takes the newest one.
+"""
+
+import threading
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox where a newer item replaces an unprocessed older one"""
+
+    def __init__(self):
+        self._item = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Store item, dropping any pending one; returns True if one was dropped"""
+        with self._cond:
+            replaced = self._item is not None
+            if replaced:
+                self.dropped += 1
+            self._item = item
+            self.received += 1
+            self._cond.notify()
+            return replaced
+
+    def take(self, timeout=None):
+        """Wait for and remove the newest item; returns None once closed and empty"""
+        with self._cond:
+            while self._item is None and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
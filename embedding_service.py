@@ -0,0 +1,378 @@
+"""
+Embedding service for the fine-tuned job matcher.
+
+Loads fine-tuned-job-matcher/ once and serves sentence embeddings over HTTP,
+so job recommendations on the Next.js server can use real semantic scores
+instead of the fallback recommender, and browsers no longer have to download
+and run the model themselves.
+
+    POST /api/embed          {"texts": ["...", ...]} -> {"embeddings": [[...], ...], ...}
+    GET  /api/embed/health   model status
+
+It also keeps a persistent index of job embeddings (see job_index.py), so
+recommendations search precomputed vectors instead of re-embedding every job
+on every request:
+
+    POST /api/jobs/index     {"jobs": [{"id": "...", "text": "..."}, ...]}  embed and add/replace
+    POST /api/jobs/remove    {"ids": ["...", ...]}
+    POST /api/jobs/sync      {"ids": [...all current job IDs...]} -> drops stale jobs, lists missing ones
+    POST /api/jobs/search    {"text": "..."}, {"embedding": [...]} or {"cv_sha256": "..."}, "k": 10
+                             -> top-k {id, score}
+    GET  /api/jobs/stats
+
+Uploaded CVs are parsed once: text extracted by read_docx.py and the CV's
+embedding are cached on disk by the SHA-256 of the document (see cv_cache.py):
+
+    POST /api/cv/parse       multipart "cv" file (.docx) [?embed=1] -> {"text", "sha256", "cached", ...}
+
+Environment:
+    EMBED_MODEL_DIR          model directory (default fine-tuned-job-matcher/)
+    EMBED_PORT               port for the development server (default 5001)
+    EMBED_TORCH_THREADS      torch intra-op threads (default: all cores)
+    EMBED_MAX_BATCH_SIZE     texts per forward pass (default 32)
+    EMBED_MAX_BATCH_TOKENS   padded tokens per forward pass (default 8192)
+    EMBED_MAX_TEXTS          texts accepted per request (default 256)
+    EMBED_INDEX_DIR          job index directory (default data/job-index/)
+    EMBED_CV_CACHE           CV cache file (default data/cv-cache.sqlite3; empty disables)
+    EMBED_CV_CACHE_MB        CV cache size limit in MB (default 256)
+"""
+
+import logging
+import os
+import time
+
+from flask import Flask, Request, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from cv_cache import CVCache, document_key
+from job_index import JobEmbeddingIndex
+from job_matcher_embedder import DEFAULT_MODEL_DIR, JobMatcherEmbedder, configure_threads
+from read_docx import PARSER_VERSION, DocxError, extract_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+
+class ServiceRequest(Request):
+    """Caps the body of CV uploads while it is read, chunked uploads included"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'parse_cv':
+            return MAX_CV_BYTES + MULTIPART_OVERHEAD_BYTES
+        return super().max_content_length
+
+
+app = Flask(__name__)
+app.request_class = ServiceRequest
+
+MODEL_DIR = os.environ.get('EMBED_MODEL_DIR', DEFAULT_MODEL_DIR)
+TORCH_THREADS = int(os.environ.get('EMBED_TORCH_THREADS', '0')) or None
+MAX_BATCH_SIZE = int(os.environ.get('EMBED_MAX_BATCH_SIZE', '32'))
+MAX_BATCH_TOKENS = int(os.environ.get('EMBED_MAX_BATCH_TOKENS', '8192'))
+MAX_TEXTS_PER_REQUEST = int(os.environ.get('EMBED_MAX_TEXTS', '256'))
+INDEX_DIR = os.environ.get('EMBED_INDEX_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'job-index'))
+MAX_SEARCH_RESULTS = 100
+CV_CACHE_PATH = os.environ.get('EMBED_CV_CACHE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'cv-cache.sqlite3'))
+CV_CACHE_MAX_BYTES = int(float(os.environ.get('EMBED_CV_CACHE_MB', '256')) * 1024 * 1024)
+MAX_CV_BYTES = 10 * 1024 * 1024
+# Room for multipart boundaries and headers around an upload of MAX_CV_BYTES
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Global embedder, job index and CV cache, loaded once at startup
+embedder = None
+job_index = None
+cv_cache = None
+
+
+def load_embedder():
+    """Load the job matcher model and run one warm-up batch"""
+    global embedder, job_index, cv_cache
+    try:
+        threads = configure_threads(TORCH_THREADS)
+        embedder = JobMatcherEmbedder(MODEL_DIR, max_batch_size=MAX_BATCH_SIZE,
+                                      max_batch_tokens=MAX_BATCH_TOKENS)
+        embedder.encode(['warm-up'])
+        logger.info(f"✅ Job matcher model loaded from {MODEL_DIR} "
+                    f"(dim {embedder.dimension}, torch threads {threads})")
+        # Keyed on the weights version, not the model name: retrained weights
+        # under the same name must not serve job vectors from the old encoder
+        job_index = JobEmbeddingIndex(INDEX_DIR, embedder.dimension, model=embedder.version)
+        if CV_CACHE_PATH:
+            cv_cache = CVCache(CV_CACHE_PATH, CV_CACHE_MAX_BYTES,
+                               parser_version=PARSER_VERSION, model_version=embedder.version)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to load job matcher model from {MODEL_DIR}: {e}")
+        embedder = None
+        job_index = None
+        return False
+
+
+def model_name():
+    return os.path.basename(os.path.normpath(MODEL_DIR))
+
+
+def string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def cv_embedding(sha256, entry):
+    """Embedding of a cached CV, encoding and caching it on first use"""
+    if entry.embedding is not None:
+        return entry.embedding
+    embedding = embedder.encode([entry.text])[0]
+    cv_cache.put_embedding(sha256, embedding)
+    return embedding
+
+
+@app.route('/api/embed', methods=['POST'])
+def embed():
+    """Embed a batch of texts with the fine-tuned job matcher"""
+    try:
+        if embedder is None:
+            return jsonify({'error': 'Model not loaded', 'embeddings': []}), 503
+
+        data = request.get_json(silent=True)
+        texts = data.get('texts') if isinstance(data, dict) else None
+        if isinstance(data, dict) and texts is None and isinstance(data.get('text'), str):
+            texts = [data['text']]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return jsonify({'error': 'Expected {"texts": [string, ...]}', 'embeddings': []}), 400
+        if len(texts) > MAX_TEXTS_PER_REQUEST:
+            return jsonify({
+                'error': f'Too many texts (max {MAX_TEXTS_PER_REQUEST})',
+                'embeddings': []
+            }), 400
+
+        start = time.perf_counter()
+        embeddings = embedder.encode(texts)
+        logger.info(f"Embedded {len(texts)} texts in {time.perf_counter() - start:.3f}s")
+
+        return jsonify({
+            'embeddings': embeddings.tolist(),
+            'dimension': embedder.dimension,
+            'count': len(texts),
+            'normalized': embedder.normalize,
+            'model': model_name()
+        })
+
+    except Exception as e:
+        logger.error(f"Embedding error: {e}")
+        return jsonify({'error': str(e), 'embeddings': []}), 500
+
+
+@app.route('/api/embed/health', methods=['GET'])
+def embed_health():
+    """Health check for the embedding service"""
+    if embedder is None:
+        return jsonify({'status': 'unavailable', 'model_loaded': False}), 503
+    return jsonify({
+        'status': 'healthy',
+        'model_loaded': True,
+        'model': model_name(),
+        'dimension': embedder.dimension,
+        'max_seq_length': embedder.max_seq_length,
+        'indexed_jobs': len(job_index) if job_index is not None else 0,
+        'cv_cache': {
+            'entries': len(cv_cache),
+            'size_bytes': cv_cache.size_bytes,
+            'hits': cv_cache.hits,
+            'misses': cv_cache.misses,
+            'evictions': cv_cache.evictions
+        } if cv_cache is not None else None
+    })
+
+
+@app.route('/api/jobs/index', methods=['POST'])
+def index_jobs():
+    """Embed jobs and add them to the index, replacing any previous vectors"""
+    try:
+        if job_index is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+
+        data = request.get_json(silent=True)
+        jobs = data.get('jobs') if isinstance(data, dict) else None
+        if not isinstance(jobs, list) or not all(
+                isinstance(job, dict) and isinstance(job.get('id'), str) and isinstance(job.get('text'), str)
+                for job in jobs):
+            return jsonify({'error': 'Expected {"jobs": [{"id": string, "text": string}, ...]}'}), 400
+
+        start = time.perf_counter()
+        ids = [job['id'] for job in jobs]
+        for offset in range(0, len(jobs), MAX_TEXTS_PER_REQUEST):
+            chunk = jobs[offset:offset + MAX_TEXTS_PER_REQUEST]
+            job_index.add(ids[offset:offset + MAX_TEXTS_PER_REQUEST],
+                          embedder.encode([job['text'] for job in chunk]))
+        logger.info(f"Indexed {len(jobs)} jobs in {time.perf_counter() - start:.3f}s")
+
+        return jsonify({'indexed': len(jobs), 'total': len(job_index)})
+
+    except Exception as e:
+        logger.error(f"Job indexing error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/remove', methods=['POST'])
+def remove_jobs():
+    """Remove jobs that were hidden or deleted from the index"""
+    try:
+        if job_index is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+
+        data = request.get_json(silent=True)
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not string_list(ids):
+            return jsonify({'error': 'Expected {"ids": [string, ...]}'}), 400
+
+        removed = job_index.remove(ids)
+        return jsonify({'removed': removed, 'total': len(job_index)})
+
+    except Exception as e:
+        logger.error(f"Job removal error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/sync', methods=['POST'])
+def sync_jobs():
+    """Drop indexed jobs that no longer exist and report the ones not indexed yet"""
+    try:
+        if job_index is None:
+            return jsonify({'error': 'Model not loaded'}), 503
+
+        data = request.get_json(silent=True)
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not string_list(ids):
+            return jsonify({'error': 'Expected {"ids": [string, ...]}'}), 400
+
+        missing, removed = job_index.sync(ids)
+        if missing or removed:
+            logger.info(f"Job index sync: {len(missing)} missing, {removed} removed")
+        return jsonify({'missing': missing, 'removed': removed, 'total': len(job_index)})
+
+    except Exception as e:
+        logger.error(f"Job sync error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/search', methods=['POST'])
+def search_jobs():
+    """Top-k indexed jobs by cosine similarity to a profile/CV text or embedding"""
+    try:
+        if job_index is None:
+            return jsonify({'error': 'Model not loaded', 'results': []}), 503
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected {"text": string} or {"embedding": [number, ...]}',
+                            'results': []}), 400
+        try:
+            k = min(MAX_SEARCH_RESULTS, int(data.get('k', 10)))
+            min_score = float(data['min_score']) if data.get('min_score') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k and min_score must be numbers', 'results': []}), 400
+
+        start = time.perf_counter()
+        if isinstance(data.get('cv_sha256'), str):
+            entry = cv_cache.get(data['cv_sha256']) if cv_cache is not None else None
+            if entry is None:
+                return jsonify({'error': 'CV not in cache; upload it to /api/cv/parse', 'results': []}), 404
+            query = cv_embedding(data['cv_sha256'], entry)
+        elif isinstance(data.get('text'), str):
+            query = embedder.encode([data['text']])[0]
+        elif isinstance(data.get('embedding'), list):
+            query = data['embedding']
+        else:
+            return jsonify({'error': 'Expected {"text": string} or {"embedding": [number, ...]}',
+                            'results': []}), 400
+        embedded = time.perf_counter()
+
+        try:
+            results = job_index.search(query, k, min_score)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'results': []}), 400
+        end = time.perf_counter()
+
+        return jsonify({
+            'results': [{'id': job_id, 'score': round(score, 6)} for job_id, score in results],
+            'total': len(job_index),
+            'embed_ms': round((embedded - start) * 1000, 2),
+            'search_ms': round((end - embedded) * 1000, 2)
+        })
+
+    except Exception as e:
+        logger.error(f"Job search error: {e}")
+        return jsonify({'error': str(e), 'results': []}), 500
+
+
+@app.route('/api/cv/parse', methods=['POST'])
+def parse_cv():
+    """Extract a .docx CV's text (and optionally embed it), cached by document hash"""
+    try:
+        upload = request.files.get('cv') or request.files.get('file')
+        data = upload.read(MAX_CV_BYTES + 1) if upload is not None else request.get_data()
+        if not data:
+            return jsonify({'error': 'No CV file provided'}), 400
+        if len(data) > MAX_CV_BYTES:
+            return jsonify({'error': f'CV is larger than {MAX_CV_BYTES // (1024 * 1024)} MB'}), 413
+        want_embedding = request.args.get('embed', '0').lower() in ('1', 'true', 'yes')
+
+        start = time.perf_counter()
+        sha256 = document_key(data)
+        entry = cv_cache.get(sha256) if cv_cache is not None else None
+        cached = entry is not None
+        if entry is None:
+            try:
+                text = extract_text(data)
+            except DocxError as e:
+                return jsonify({'error': f'Unsupported or unreadable document: {e}', 'sha256': sha256}), 415
+            embedding = embedder.encode([text])[0] if want_embedding and embedder is not None else None
+            if cv_cache is not None:
+                cv_cache.put(sha256, text, embedding)
+        else:
+            text, embedding = entry.text, entry.embedding
+            if want_embedding and embedding is None and embedder is not None:
+                embedding = cv_embedding(sha256, entry)
+
+        response = {
+            'text': text,
+            'sha256': sha256,
+            'cached': cached,
+            'parser_version': PARSER_VERSION,
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        if want_embedding and embedding is not None:
+            response['embedding'] = embedding.tolist()
+        return jsonify(response)
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'CV is larger than {MAX_CV_BYTES // (1024 * 1024)} MB'}), 413
+    except Exception as e:
+        logger.error(f"CV parse error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_index_stats():
+    """Size and location of the job index"""
+    if job_index is None:
+        return jsonify({'status': 'unavailable'}), 503
+    return jsonify({
+        'jobs': len(job_index),
+        'capacity': job_index.capacity,
+        'dimension': job_index.dimension,
+        'model': job_index.model,
+        'index_dir': job_index.index_dir
+    })
+
+
+if __name__ == '__main__':
+    if load_embedder():
+        logger.info("Starting job matcher embedding service...")
+        app.run(host='0.0.0.0', port=int(os.environ.get('EMBED_PORT', '5001')), threaded=True)
+    else:
+        logger.error("Failed to load model. Service not started.")
+        exit(1)
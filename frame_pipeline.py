@@ -0,0 +1,359 @@
+"""
+Multiprocess decode/inference pipeline with a shared-memory frame ring.
+
+Request threads hand encoded images to a pool of decode processes. A decode
+process writes the decoded frame into a free slot of a ring buffer in shared
+memory (multiprocessing.shared_memory) and passes only the slot index and
+frame shape on to the inference processes. Those collect slots into
+micro-batches, run the model on numpy views of the ring and send the small
+per-frame detection arrays back on a result queue, where a thread in the
+serving process resolves the waiting request's future. Image arrays are
+never pickled, and decoding, inference and the HTTP layer run in separate
+processes so they overlap instead of taking turns on one GIL.
+
+Slots are allocated and freed only by the serving process: a slot is taken
+when a request is submitted and returned when its result (or error) comes
+back, so a frame is never overwritten while a process still reads it. When
+a pipeline process dies, every process is restarted with a fresh ring and
+the requests in flight fail over to the caller's in-process path.
+"""
+
+import atexit
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = None
+
+
+class PipelineUnavailable(Exception):
+    """Raised when a frame cannot go through the pipeline right now (not running, full, timed out)"""
+
+
+class FrameRing:
+    """Fixed-size frame slots in one shared memory block"""
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        """A uint8 array of the given shape backed by the slot's memory"""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except (BufferError, FileNotFoundError) as e:
+            logger.debug(f"Frame ring {self.name} not released cleanly: {e}")
+
+
+def _decode_worker(ring_name, slots, slot_bytes, decode_queue, infer_queue, result_queue):
+    """Decode process: encoded bytes in, decoded frame written into its ring slot"""
+    import cv2
+
+    cv2.setNumThreads(1)
+    ring = FrameRing(slots, slot_bytes, ring_name)
+    try:
+        while True:
+            item = decode_queue.get()
+            if item is _STOP:
+                return
+            request_id, slot, data = item
+            try:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            except cv2.error:
+                frame = None
+            if frame is None:
+                result_queue.put((request_id, 'invalid', None))
+            elif frame.nbytes > slot_bytes:
+                result_queue.put((request_id, 'too_large', frame.shape))
+            else:
+                ring.view(slot, frame.shape)[...] = frame
+                infer_queue.put((request_id, slot, frame.shape))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+def _collect_batch(infer_queue, first, max_batch_size, max_wait):
+    batch = [first]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            item = infer_queue.get(timeout=remaining) if remaining > 0 else infer_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is _STOP:
+            # Let the run loop see the sentinel after this batch
+            infer_queue.put(_STOP)
+            break
+        batch.append(item)
+    return batch
+
+
+def _inference_worker(setup, ring_name, slots, slot_bytes, infer_queue, result_queue,
+                      max_batch_size, max_wait, torch_threads):
+    """Inference process: batches of ring slots in, per-frame detection arrays out.
+
+    setup() runs once in the process and returns infer(frames), which must
+    return one small array per frame.
+    """
+    ring = FrameRing(slots, slot_bytes, ring_name)
+    try:
+        if torch_threads:
+            try:
+                import torch
+                torch.set_num_threads(torch_threads)
+            except ImportError:
+                pass
+        try:
+            infer = setup()
+        except Exception as e:
+            result_queue.put((None, 'failed', f"{type(e).__name__}: {e}"))
+            return
+        result_queue.put((None, 'ready', os.getpid()))
+
+        while True:
+            first = infer_queue.get()
+            if first is _STOP:
+                return
+            batch = _collect_batch(infer_queue, first, max_batch_size, max_wait)
+            frames = [ring.view(slot, shape) for _, slot, shape in batch]
+            try:
+                detections = infer(frames)
+            except Exception as e:
+                logger.error(f"❌ Pipeline inference failed: {e}")
+                for request_id, _, _ in batch:
+                    result_queue.put((request_id, 'error', str(e)))
+            else:
+                for (request_id, _, shape), frame_dets in zip(batch, detections):
+                    result_queue.put((request_id, 'ok', (frame_dets, shape)))
+            del frames
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class FramePipeline:
+    """Decode and inference processes around a shared-memory frame ring.
+
+    setup is a picklable, module-level function run in each inference
+    process; it loads the model and returns infer(frames).
+    """
+
+    def __init__(self, setup, decode_workers=2, inference_workers=1, slots=16, max_pixels=1280 * 720,
+                 max_batch_size=8, max_wait_ms=5.0, timeout=10.0, torch_threads=None):
+        self.setup = setup
+        self.decode_workers = max(1, int(decode_workers))
+        self.inference_workers = max(1, int(inference_workers))
+        self.slots = max(self.inference_workers * max_batch_size, int(slots))
+        self.slot_bytes = int(max_pixels) * 3
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = timeout
+        # The cores left after decoding are split between the inference processes
+        self.torch_threads = torch_threads or max(
+            1, ((os.cpu_count() or 1) - self.decode_workers) // self.inference_workers
+        )
+        self._ctx = mp.get_context('spawn')
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._processes = []
+        self._ring = None
+        self._thread = None
+        self._stopping = False
+        self.ready = False
+        self.restarts = 0
+        self.frames_processed = 0
+
+    def start(self):
+        """Start the processes and the result thread; returns before the model is loaded.
+
+        ready becomes True once every inference process has loaded and warmed
+        its model.
+        """
+        if self._thread is not None:
+            return
+        self._launch()
+        self._thread = threading.Thread(target=self._run, name='frame-pipeline', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Frame pipeline starting: {self.decode_workers} decode + {self.inference_workers} "
+                    f"inference processes, {self.slots} slots of {self.slot_bytes // 1024} KiB, "
+                    f"{self.torch_threads} torch threads per inference process")
+
+    def _launch(self):
+        self._ring = FrameRing(self.slots, self.slot_bytes)
+        self._free = queue.SimpleQueue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self._decode_queue = self._ctx.Queue()
+        self._infer_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._waiting_ready = self.inference_workers
+
+        ring_args = (self._ring.name, self.slots, self.slot_bytes)
+        self._processes = [
+            self._ctx.Process(target=_decode_worker, name=f'frame-decode-{i}', daemon=True,
+                              args=ring_args + (self._decode_queue, self._infer_queue, self._result_queue))
+            for i in range(self.decode_workers)
+        ] + [
+            self._ctx.Process(target=_inference_worker, name=f'frame-inference-{i}', daemon=True,
+                              args=(self.setup,) + ring_args + (
+                                  self._infer_queue, self._result_queue, self.max_batch_size,
+                                  self.max_wait, self.torch_threads))
+            for i in range(self.inference_workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def _shutdown(self, graceful):
+        with self._lock:
+            self.ready = False
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(PipelineUnavailable('pipeline restarted'))
+
+        if graceful:
+            for _ in range(self.decode_workers):
+                self._decode_queue.put(_STOP)
+            for _ in range(self.inference_workers):
+                self._infer_queue.put(_STOP)
+            for process in self._processes:
+                process.join(5)
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+                process.join(5)
+        for q in (self._decode_queue, self._infer_queue, self._result_queue):
+            q.cancel_join_thread()
+            q.close()
+        self._ring.close()
+
+    def stop(self):
+        """Stop the pipeline processes and release the ring"""
+        if self._thread is None or self._stopping:
+            return
+        self._stopping = True
+        self._shutdown(graceful=True)
+        self._thread.join(5)
+        self._thread = None
+
+    def detect(self, data, timeout=None):
+        """(frame detections, frame shape) for encoded image bytes.
+
+        Returns None when the image doesn't decode or doesn't fit a slot, so
+        the caller can decode it itself (and report the error). Raises
+        PipelineUnavailable when the pipeline isn't running, every slot is in
+        use, or the result doesn't arrive in time.
+        """
+        with self._lock:
+            if not self.ready:
+                raise PipelineUnavailable('pipeline not ready')
+            try:
+                slot = self._free.get_nowait()
+            except queue.Empty:
+                raise PipelineUnavailable('all frame slots in use') from None
+            request_id = next(self._ids)
+            future = Future()
+            self._pending[request_id] = (future, slot)
+            decode_queue = self._decode_queue
+        try:
+            decode_queue.put((request_id, slot, data))
+            return future.result(timeout or self.timeout)
+        except FutureTimeout:
+            # The slot is returned when the late result arrives
+            raise PipelineUnavailable('pipeline timed out') from None
+        except (ValueError, OSError) as e:
+            raise PipelineUnavailable(f'pipeline queue closed: {e}') from None
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                request_id, status, payload = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                self._check_processes()
+                continue
+            except (EOFError, OSError, ValueError):
+                if self._stopping:
+                    return
+                self._check_processes()
+                continue
+
+            if request_id is None:
+                self._control(status, payload)
+                continue
+
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is not None:
+                    self._free.put(entry[1])
+            if entry is None:
+                continue
+            future = entry[0]
+            if status == 'ok':
+                self.frames_processed += 1
+                future.set_result(payload)
+            elif status in ('invalid', 'too_large'):
+                future.set_result(None)
+            else:
+                future.set_exception(PipelineUnavailable(f'pipeline error: {payload}'))
+
+    def _control(self, status, payload):
+        if status == 'ready':
+            self._waiting_ready -= 1
+            if self._waiting_ready == 0:
+                self.ready = True
+                logger.info("✅ Frame pipeline ready")
+        elif status == 'failed':
+            logger.error(f"❌ Pipeline inference process failed to start: {payload}")
+            self._stopping = True
+            self._shutdown(graceful=False)
+
+    def _check_processes(self):
+        dead = [p for p in self._processes if not p.is_alive()]
+        if not dead or self._stopping:
+            return
+        logger.error(f"❌ Pipeline process {dead[0].name} exited with code {dead[0].exitcode}; restarting")
+        self._shutdown(graceful=False)
+        self.restarts += 1
+        self._launch()
+
+    def describe(self):
+        with self._lock:
+            in_flight = len(self._pending)
+        return {
+            'ready': self.ready,
+            'decode_workers': self.decode_workers,
+            'inference_workers': self.inference_workers,
+            'slots': self.slots,
+            'in_flight': in_flight,
+            'frames_processed': self.frames_processed,
+            'restarts': self.restarts,
+        }
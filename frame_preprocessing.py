@@ -0,0 +1,131 @@
+"""
+Frame preparation before YOLO inference.
+
+Frames are optionally cropped to a region of interest, downscaled so their
+longest side fits the inference size, and optionally padded to a square. The
+returned transform maps boxes found on the prepared image back to the
+original frame, so bboxes and area ratios in responses are always relative to
+the frame the client sent.
+"""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Padding colour used by ultralytics' own letterbox
+LETTERBOX_COLOR = (114, 114, 114)
+
+# Smallest ROI worth cropping to; anything smaller falls back to the full frame
+MIN_ROI_SIZE = 32
+
+
+def prepare_frame(frame, max_size=None, roi=None, letterbox='rect'):
+    """Crop, resize and pad a frame for inference.
+
+    Returns (prepared_frame, transform) where transform is (scale, x0, y0):
+    a box on the prepared frame maps back as ``box / scale + (x0, y0)``.
+    letterbox is 'rect' (keep aspect, let YOLO pad to the stride) or
+    'square' (pad bottom/right to max_size x max_size for fixed input shapes).
+    """
+    height, width = frame.shape[:2]
+    x0 = y0 = 0
+
+    if roi is not None:
+        rx1, ry1, rx2, ry2 = (int(v) for v in roi)
+        rx1, ry1 = max(0, rx1), max(0, ry1)
+        rx2, ry2 = min(width, rx2), min(height, ry2)
+        if rx2 - rx1 >= MIN_ROI_SIZE and ry2 - ry1 >= MIN_ROI_SIZE:
+            frame = frame[ry1:ry2, rx1:rx2]
+            x0, y0 = rx1, ry1
+
+    scale = 1.0
+    crop_height, crop_width = frame.shape[:2]
+    if max_size and max(crop_height, crop_width) > max_size:
+        scale = max_size / max(crop_height, crop_width)
+        size = (max(1, round(crop_width * scale)), max(1, round(crop_height * scale)))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    if letterbox == 'square' and max_size:
+        pad_bottom = max(0, max_size - frame.shape[0])
+        pad_right = max(0, max_size - frame.shape[1])
+        if pad_bottom or pad_right:
+            frame = cv2.copyMakeBorder(frame, 0, pad_bottom, 0, pad_right,
+                                       cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    elif x0 or y0:
+        # Slices of the original are not contiguous; YOLO wants a contiguous array
+        frame = np.ascontiguousarray(frame)
+
+    return frame, (scale, x0, y0)
+
+
+def boxes_to_frame(xyxy, transform, frame_shape):
+    """Map an (N, 4) array of boxes from the prepared frame back to the original"""
+    scale, x0, y0 = transform
+    height, width = frame_shape[:2]
+    boxes = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4) / scale
+    boxes[:, [0, 2]] += x0
+    boxes[:, [1, 3]] += y0
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+    return boxes
+
+
+class RoiTracker:
+    """Per-session region of interest around the candidate.
+
+    After a full-frame pass the union of confident boxes (person, hands,
+    devices), grown by ``margin``, becomes the session's ROI. Following frames
+    are cropped to it, with a full-frame pass every ``full_frame_interval``
+    frames or as soon as a cropped pass comes back empty.
+    """
+
+    def __init__(self, full_frame_interval=10, margin=0.25, min_confidence=0.4, max_sessions=1000):
+        self.full_frame_interval = max(1, int(full_frame_interval))
+        self.margin = margin
+        self.min_confidence = min_confidence
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def select(self, session_id):
+        """Return the ROI to crop to for this session's next frame, or None for a full frame"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            state['frames'] += 1
+            if state['roi'] is None or state['frames'] % self.full_frame_interval == 0:
+                return None
+            return state['roi']
+
+    def update(self, session_id, boxes, confidences, frame_shape, full_frame):
+        """Record the boxes (in original frame coordinates) found for this session"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        boxes = boxes[confidences >= self.min_confidence]
+
+        roi = None
+        if len(boxes):
+            height, width = frame_shape[:2]
+            x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+            x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+            pad_x, pad_y = (x2 - x1) * self.margin, (y2 - y1) * self.margin
+            roi = (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                   min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y)))
+
+        with self._lock:
+            state = self._sessions.setdefault(session_id, {'roi': None, 'frames': 0})
+            self._sessions.move_to_end(session_id)
+            # Only full-frame passes move the ROI, so it can't shrink onto a
+            # single object; an empty cropped pass clears it to force a full frame
+            if full_frame or roi is None:
+                state['roi'] = roi
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -0,0 +1,107 @@
+"""
+Per-session temporal tracking for the mobile detector.
+
+Consecutive webcam frames from one interview are usually almost identical.
+For each session we keep a small grayscale thumbnail of the last frame that
+went through YOLO, plus the response it produced. When a new frame's
+thumbnail barely differs from it, the previous detections are reused, shifted
+by the global motion between the two thumbnails, instead of running the
+model again. A full detection is forced every ``max_reuse`` frames so a
+session can never drift far from the real model output.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def frame_thumbnail(frame, size=(64, 48)):
+    """Small grayscale float32 thumbnail used to compare frames"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def shift_response(response, dx, dy, frame_shape):
+    """Copy a detect-mobile response with every box moved by (dx, dy) pixels"""
+    shifted = copy.deepcopy(response)
+    height, width = frame_shape[:2]
+    for detection in shifted.get('detections', []):
+        x1, y1, x2, y2 = detection['bbox']
+        x1, x2 = (int(min(max(v + dx, 0), width)) for v in (x1, x2))
+        y1, y2 = (int(min(max(v + dy, 0), height)) for v in (y1, y2))
+        detection['bbox'] = [x1, y1, x2, y2]
+        detection['center'] = [(x1 + x2) // 2, (y1 + y2) // 2]
+        # Clipping at the frame edge shrinks the box
+        detection['area'] = (x2 - x1) * (y2 - y1)
+        detection['area_ratio'] = detection['area'] / (width * height)
+    return shifted
+
+
+class SessionFrameTracker:
+    """Reuse the last detection result for a session while its frames stay unchanged"""
+
+    def __init__(self, max_reuse=5, pixel_threshold=12.0, changed_fraction=0.005,
+                 thumb_size=(64, 48), max_sessions=1000):
+        self.max_reuse = max(0, int(max_reuse))
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.thumb_size = thumb_size
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.detected = 0
+
+    def reuse(self, session_id, frame):
+        """Return (response, thumbnail); response is None when YOLO has to run"""
+        thumb = frame_thumbnail(frame, self.thumb_size)
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+
+        if state is None or state['reuse_count'] >= self.max_reuse or state['frame_shape'] != frame.shape:
+            return None, thumb
+
+        # Fraction of thumbnail pixels that changed noticeably
+        changed = np.count_nonzero(np.abs(thumb - state['thumb']) > self.pixel_threshold)
+        if changed > self.changed_fraction * thumb.size:
+            return None, thumb
+
+        # Estimate global motion (camera shake, candidate shifting) on the thumbnails
+        (dx, dy), _ = cv2.phaseCorrelate(state['thumb'], thumb)
+        scale_x = frame.shape[1] / self.thumb_size[0]
+        scale_y = frame.shape[0] / self.thumb_size[1]
+        response = shift_response(state['response'], dx * scale_x, dy * scale_y, frame.shape)
+        response['timestamp'] = int(time.time() * 1000)
+
+        with self._lock:
+            state['reuse_count'] += 1
+            self.reused += 1
+        return response, thumb
+
+    def store(self, session_id, thumb, response, frame_shape):
+        """Remember the result of a full detection for this session"""
+        with self._lock:
+            self._sessions[session_id] = {
+                'thumb': thumb,
+                'response': response,
+                'frame_shape': frame_shape,
+                'reuse_count': 0,
+            }
+            self._sessions.move_to_end(session_id)
+            self.detected += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
@@ -0,0 +1,107 @@
+"""
+Micro-batching for YOLO inference.
+
+Frames submitted from many request threads are collected on a queue and run
+through the model as one batch once either the batch is full or the oldest
+frame has waited ``max_wait_ms``. Each caller blocks on its own future and
+gets back only the result for its frame.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class InferenceBatcher:
+    """Coalesce single-frame inference calls into batched model calls"""
+
+    def __init__(self, infer_fn, max_batch_size=8, max_wait_ms=5.0):
+        # infer_fn takes a list of frames and returns one result per frame
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self.batches_run = 0
+        self.frames_processed = 0
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        """Start the background batching thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Inference batcher started: max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f}")
+
+    def stop(self, timeout=5.0):
+        """Stop the batching thread after it drains the queue"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit_async(self, frame):
+        """Queue a frame and return a Future for its result"""
+        future = Future()
+        self._queue.put((frame, future))
+        return future
+
+    def submit(self, frame, timeout=None):
+        """Queue a frame and wait for its result"""
+        return self.submit_async(frame).result(timeout)
+
+    def submit_many(self, frames, timeout=None):
+        """Queue several frames and wait for all of their results, in order"""
+        futures = [self.submit_async(frame) for frame in frames]
+        return [future.result(timeout) for future in futures]
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Put the sentinel back so the run loop exits after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = self._collect_batch(item)
+            frames = [frame for frame, _ in batch]
+            try:
+                results = list(self.infer_fn(frames))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Expected {len(batch)} results, got {len(results)}")
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} frames: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches_run += 1
+            self.frames_processed += len(batch)
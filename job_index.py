@@ -0,0 +1,194 @@
+"""
+Persistent vector index of job embeddings for the job matcher.
+
+Every posted job is embedded once, when it is posted, instead of on every
+recommendation request. The index lives in one directory:
+
+- vectors.f32   float32 matrix, one unit-length row per job, memory-mapped so
+                a restart does not re-read or re-embed anything;
+- index.json    dimension, encoder weights version and the job ID of each row.
+
+An index built by other weights (or another dimension) is discarded on load;
+the jobs are then re-embedded by the next sync.
+
+Rows are kept dense: adding a job that is already indexed overwrites its row,
+and removing a job moves the last row into its place. The file grows by
+doubling its row capacity, so most additions write into space that already
+exists. A top-k search is a single matrix-vector product over the live rows.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = 'vectors.f32'
+META_FILE = 'index.json'
+MIN_CAPACITY = 1024
+
+
+class JobEmbeddingIndex:
+    """Memory-mapped float32 embedding matrix with an ID map and incremental updates"""
+
+    def __init__(self, index_dir, dimension, model=None):
+        self.index_dir = index_dir
+        self.dimension = dimension
+        self.model = model
+        self._vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        self._meta_path = os.path.join(index_dir, META_FILE)
+        self._lock = threading.RLock()
+        self._ids = []
+        self._rows = {}  # job ID -> row
+        self._matrix = None
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, job_id):
+        return job_id in self._rows
+
+    @property
+    def capacity(self):
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    @property
+    def ids(self):
+        with self._lock:
+            return list(self._ids)
+
+    def _load(self):
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = None
+
+        if meta is not None and (meta.get('dimension') != self.dimension or
+                                 (self.model and meta.get('model') != self.model)):
+            logger.warning(f"Job index in {self.index_dir} was built with "
+                           f"{meta.get('model')} (dim {meta.get('dimension')}); rebuilding for "
+                           f"{self.model} (dim {self.dimension})")
+            meta = None
+
+        ids = meta['ids'] if meta else []
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dimension) \
+            if meta and os.path.exists(self._vectors_path) else 0
+        if rows < len(ids):
+            logger.warning(f"Job index in {self.index_dir} is truncated; rebuilding")
+            ids, rows = [], 0
+
+        self._ids = list(ids)
+        self._rows = {job_id: row for row, job_id in enumerate(self._ids)}
+        self._open(max(rows, MIN_CAPACITY))
+        if meta is None:
+            self._save_meta()
+        logger.info(f"Job index loaded from {self.index_dir}: {len(self._ids)} jobs")
+
+    def _open(self, capacity):
+        """(Re)map the vectors file with room for capacity rows"""
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._vectors_path, 'ab') as f:
+            size = capacity * self.dimension * 4
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.dimension))
+
+    def _save_meta(self):
+        # Write-then-rename so a crash never leaves a half-written ID map
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'dimension': self.dimension, 'model': self.model, 'ids': self._ids}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def add(self, ids, vectors):
+        """Insert or replace the embeddings of the given job IDs"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if len(ids) != len(vectors):
+            raise ValueError(f"Got {len(ids)} IDs for {len(vectors)} vectors")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            new = sum(1 for job_id in dict.fromkeys(ids) if job_id not in self._rows)
+            needed = len(self._ids) + new
+            if needed > self.capacity:
+                capacity = self.capacity
+                while capacity < needed:
+                    capacity *= 2
+                self._open(capacity)
+
+            for job_id, vector in zip(ids, vectors):
+                row = self._rows.get(job_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(job_id)
+                    self._rows[job_id] = row
+                self._matrix[row] = vector
+            self._matrix.flush()
+            self._save_meta()
+        return new
+
+    def remove(self, ids):
+        """Drop job IDs from the index; returns how many were present"""
+        removed = 0
+        with self._lock:
+            for job_id in ids:
+                row = self._rows.pop(job_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    # Keep the matrix dense: the last row fills the gap
+                    moved = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+                removed += 1
+            if removed:
+                self._matrix.flush()
+                self._save_meta()
+        return removed
+
+    def sync(self, ids):
+        """Reconcile with the authoritative set of job IDs.
+
+        Removes indexed jobs that are not in ids and returns (missing, removed):
+        the IDs that still have to be embedded and added, and how many stale
+        ones were dropped.
+        """
+        wanted = set(ids)
+        with self._lock:
+            removed = self.remove([job_id for job_id in self._ids if job_id not in wanted])
+            missing = [job_id for job_id in dict.fromkeys(ids) if job_id not in self._rows]
+        return missing, removed
+
+    def search(self, query, k=10, min_score=None):
+        """Top-k jobs by cosine similarity to a query embedding, as [(id, score), ...]"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError(f"Query has dimension {query.shape[0]}, index has {self.dimension}")
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or k <= 0:
+                return []
+            scores = self._matrix[:count] @ query
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+            top = top[np.argsort(-scores[top], kind='stable')]
+            results = [(self._ids[row], float(scores[row])) for row in top]
+
+        if min_score is not None:
+            results = [(job_id, score) for job_id, score in results if score >= min_score]
+        return results
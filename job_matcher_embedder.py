@@ -0,0 +1,152 @@
+"""
+Server-side encoder for the fine-tuned job matcher model.
+
+fine-tuned-job-matcher/ is a sentence-transformers model: a BERT encoder
+followed by mean pooling and L2 normalization, with texts truncated to
+max_seq_length tokens. This module reproduces that pipeline with plain
+transformers so batching can be tuned for CPU serving:
+
+- every text is tokenized once without padding;
+- texts are sorted by token length and grouped into buckets of similar
+  length, capped by batch size and by a token budget (batch x longest text);
+- each bucket is padded only to its own longest text (dynamic padding), so a
+  short job title never pays for a 256-token CV in the same request.
+
+Embeddings come back in input order as an (N, dim) float32 array of unit
+vectors, so a dot product is the cosine similarity.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fine-tuned-job-matcher')
+
+
+def configure_threads(num_threads=None):
+    """Size torch's CPU thread pools for serving; call before the first inference.
+
+    Intra-op threads do the matrix work of one batch. Inter-op parallelism
+    only adds contention for a single encoder, so it is pinned to one thread.
+    """
+    num_threads = num_threads or os.cpu_count() or 1
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already fixed once any parallel work has run in this process
+        pass
+    return num_threads
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+class JobMatcherEmbedder:
+    """Mean-pooled, normalized sentence embeddings with length-bucketed batching"""
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, max_batch_size=32, max_batch_tokens=8192):
+        self.model_dir = model_dir
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        st_config = _read_json(os.path.join(model_dir, 'sentence_bert_config.json'), {})
+        pooling = _read_json(os.path.join(model_dir, '1_Pooling', 'config.json'), {})
+        modules = _read_json(os.path.join(model_dir, 'modules.json'), [])
+
+        self.max_seq_length = st_config.get('max_seq_length', 256)
+        self.pooling = 'cls' if pooling.get('pooling_mode_cls_token') else 'mean'
+        self.normalize = any(m.get('type', '').endswith('.Normalize') for m in modules)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = AutoModel.from_pretrained(model_dir)
+        self.model.eval()
+        self.dimension = self.model.config.hidden_size
+        self.version = self._weights_version()
+        # One forward pass at a time; a second concurrent batch would only
+        # fight the first for the same CPU threads
+        self._lock = threading.Lock()
+
+    def _weights_version(self):
+        """Identifies the loaded weights, so cached embeddings from older ones are ignored"""
+        name = os.path.basename(os.path.normpath(self.model_dir))
+        for weights in ('model.safetensors', 'pytorch_model.bin'):
+            path = os.path.join(self.model_dir, weights)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                return f"{name}:{stat.st_size}:{int(stat.st_mtime)}"
+        return name
+
+    def tokenize(self, texts):
+        """Token IDs per text, truncated to max_seq_length, without padding"""
+        return self.tokenizer(
+            list(texts),
+            truncation=True,
+            max_length=self.max_seq_length,
+            padding=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )['input_ids']
+
+    def buckets(self, lengths):
+        """Group text indices into batches of similar token length"""
+        order = np.argsort(lengths, kind='stable')
+        batches, batch = [], []
+        for index in order:
+            # Sorted ascending, so this text is the longest in the batch so far
+            longest = lengths[index]
+            if batch and (len(batch) >= self.max_batch_size or
+                          (len(batch) + 1) * longest > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(int(index))
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _forward(self, input_ids):
+        # Pad only to the longest text in this bucket
+        longest = max(len(ids) for ids in input_ids)
+        ids = np.full((len(input_ids), longest), self.tokenizer.pad_token_id or 0, dtype=np.int64)
+        mask = np.zeros((len(input_ids), longest), dtype=np.int64)
+        for row, seq in enumerate(input_ids):
+            ids[row, :len(seq)] = seq
+            mask[row, :len(seq)] = 1
+        ids, mask = torch.from_numpy(ids), torch.from_numpy(mask)
+        hidden = self.model(input_ids=ids, attention_mask=mask).last_hidden_state
+
+        if self.pooling == 'cls':
+            pooled = hidden[:, 0]
+        else:
+            weights = mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * weights).sum(dim=1) / weights.sum(dim=1).clamp(min=1e-9)
+        if self.normalize:
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled
+
+    def encode(self, texts):
+        """Embed a list of texts; returns an (N, dimension) float32 array in input order"""
+        texts = [text if isinstance(text, str) else str(text) for text in texts]
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return embeddings
+
+        input_ids = self.tokenize(texts)
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+        with self._lock, torch.inference_mode():
+            for batch in self.buckets(lengths):
+                pooled = self._forward([input_ids[i] for i in batch])
+                embeddings[batch] = pooled.float().numpy()
+        return embeddings
@@ -1,26 +1,321 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
+from flask_sock import Sock, ConnectionClosed
 import cv2
 import base64
+import json
+import math
 import numpy as np
-from ultralytics import YOLO
 import os
 import logging
-import torch
+import threading
+import time
+import contextlib
+import hmac
+import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+from inference_batcher import InferenceBatcher
+import model_backends
+from model_registry import ModelRegistry, RegistryError
+from frame_preprocessing import prepare_frame, boxes_to_frame, RoiTracker
+from frame_tracking import SessionFrameTracker
+import detection_logging
+import detection_metrics
+from detection_stream import LatestFrameSlot
+from result_cache import ResultCache, content_key
+from admission_control import AdmissionController, AdmissionRejected
+from session_aggregation import SessionAggregator, make_sink
+from frame_pipeline import FramePipeline, PipelineUnavailable
+import video_analysis
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queued, see detection_logging.py)
+detection_logging.setup_logging()
 logger = logging.getLogger(__name__)
 
+# Per-box messages are DEBUG-level and sampled; per-request summaries are INFO
+box_log_sampler = detection_logging.box_log_sampler()
+
 app = Flask(__name__)
 CORS(app)
 
+# WebSocket support for the streaming detection channel
+app.config['SOCK_SERVER_OPTIONS'] = {
+    'ping_interval': 25,
+    'max_message_size': int(os.environ.get('DETECTION_MAX_FRAME_BYTES', str(5 * 1024 * 1024))) * 2
+}
+sock = Sock(app)
+
 # Global model variable
 model = None
 
+# What load_model() actually loaded (weights, backend, artifact), for /api/model-info
+model_source = {}
+
+# Inference backend: auto, openvino, onnx, torchscript or pytorch (see model_backends.py)
+MODEL_BACKEND = os.environ.get('DETECTION_BACKEND', 'auto')
+MODEL_CACHE_DIR = os.environ.get('DETECTION_MODEL_CACHE', model_backends.DEFAULT_CACHE_DIR)
+
+# Numeric precision: fp32, fp16 (OpenVINO) or int8 (ONNX Runtime); INT8 is
+# statically calibrated on the images in DETECTION_CALIBRATION_DIR if set
+MODEL_PRECISION = os.environ.get('DETECTION_PRECISION', 'fp32')
+CALIBRATION_DIR = os.environ.get('DETECTION_CALIBRATION_DIR')
+
+# Hot reload (see model_registry.py): every worker follows the shared state
+# file, and admin calls may only load weights from inside DETECTION_MODEL_DIR
+MODEL_DIR = os.environ.get('DETECTION_MODEL_DIR', 'models')
+MODEL_STATE_PATH = os.environ.get('DETECTION_MODEL_STATE', os.path.join(MODEL_CACHE_DIR, 'registry.json'))
+MODEL_WATCH = os.environ.get('DETECTION_MODEL_WATCH', '1') == '1'
+MODEL_POLL_SECONDS = float(os.environ.get('DETECTION_MODEL_POLL_SECONDS', '5'))
+KEEP_PREVIOUS_MODEL = os.environ.get('DETECTION_KEEP_PREVIOUS_MODEL', '1') == '1'
+
+# Model admin and session read/end routes need this as a Bearer token; unset,
+# they only answer localhost
+ADMIN_TOKEN = os.environ.get('DETECTION_ADMIN_TOKEN')
+
+# Inference resolution: frames are downscaled so their longest side fits, then
+# letterboxed ('rect' pads to the stride, 'square' pads to a fixed square)
+INFERENCE_IMAGE_SIZE = int(os.environ.get('DETECTION_IMGSZ', '640'))
+LETTERBOX_MODE = os.environ.get('DETECTION_LETTERBOX', 'rect')
+EXPORT_IMAGE_SIZE = int(os.environ.get('DETECTION_EXPORT_IMGSZ', str(INFERENCE_IMAGE_SIZE)))
+
+# Optional per-session cropping to the region around the candidate
+ROI_ENABLED = os.environ.get('DETECTION_ROI', '0') == '1'
+ROI_FULL_FRAME_INTERVAL = int(os.environ.get('DETECTION_ROI_FULL_FRAME_INTERVAL', '10'))
+roi_tracker = RoiTracker(full_frame_interval=ROI_FULL_FRAME_INTERVAL) if ROI_ENABLED else None
+
+# Optional per-session reuse of the last result while frames stay unchanged;
+# a full detection still runs at least every DETECTION_TRACKING_MAX_REUSE + 1 frames
+TRACKING_ENABLED = os.environ.get('DETECTION_TRACKING', '0') == '1'
+TRACKING_MAX_REUSE = int(os.environ.get('DETECTION_TRACKING_MAX_REUSE', '4'))
+TRACKING_CHANGED_FRACTION = float(os.environ.get('DETECTION_TRACKING_CHANGED_FRACTION', '0.005'))
+frame_tracker = SessionFrameTracker(
+    max_reuse=TRACKING_MAX_REUSE,
+    changed_fraction=TRACKING_CHANGED_FRACTION
+) if TRACKING_ENABLED else None
+
+# Content-addressed cache of full-frame results, shared by detect-mobile and
+# debug-detection; exact repeats of an encoded frame skip decode and inference
+CACHE_ENABLED = os.environ.get('DETECTION_CACHE', '1') == '1'
+CACHE_MAX_ENTRIES = int(os.environ.get('DETECTION_CACHE_SIZE', '1024'))
+CACHE_TTL_SECONDS = float(os.environ.get('DETECTION_CACHE_TTL', '60'))
+CACHE_PERCEPTUAL = os.environ.get('DETECTION_CACHE_PERCEPTUAL', '0') == '1'
+result_cache = ResultCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    perceptual=CACHE_PERCEPTUAL
+) if CACHE_ENABLED else None
+
+# Admission control: at most DETECTION_MAX_CONCURRENT frames are in detection at
+# once (a batch request counts each image); the rest wait (one request per
+# session, newest wins) or are shed fast with 429/503 and a Retry-After header.
+# It caps how full a micro-batch can get, so keep it at least
+# DETECTION_MAX_BATCH_SIZE; a batch request of that many frames then takes
+# every slot of the worker until it finishes.
+ADMISSION_ENABLED = os.environ.get('DETECTION_ADMISSION', '1') == '1'
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('DETECTION_MAX_CONCURRENT', '8'))
+MAX_QUEUED_REQUESTS = int(os.environ.get('DETECTION_MAX_QUEUED', '32'))
+MAX_QUEUE_WAIT_MS = float(os.environ.get('DETECTION_MAX_QUEUE_WAIT_MS', '1500'))
+MIN_CAPTURE_INTERVAL_MS = float(os.environ.get('DETECTION_MIN_CAPTURE_INTERVAL_MS', '500'))
+admission = AdmissionController(
+    max_concurrent=MAX_CONCURRENT_REQUESTS,
+    max_queued=MAX_QUEUED_REQUESTS,
+    max_wait=MAX_QUEUE_WAIT_MS / 1000,
+    min_interval=MIN_CAPTURE_INTERVAL_MS / 1000
+) if ADMISSION_ENABLED else None
+
+# Per-session aggregation (see session_aggregation.py): rolling state per
+# interview, flushed in batches to DETECTION_SESSION_SINK ('sqlite:<path>' or
+# 'jsonl:<path>'; empty disables it)
+SESSION_SINK = os.environ.get('DETECTION_SESSION_SINK', 'sqlite:data/detection-sessions.sqlite3')
+SESSION_FLUSH_SECONDS = float(os.environ.get('DETECTION_SESSION_FLUSH_SECONDS', '10'))
+SESSION_COOLDOWN_SECONDS = float(os.environ.get('DETECTION_SESSION_COOLDOWN', '5'))
+SESSION_WINDOW_GAP_SECONDS = float(os.environ.get('DETECTION_SESSION_WINDOW_GAP', '10'))
+SESSION_IDLE_SECONDS = float(os.environ.get('DETECTION_SESSION_IDLE_TIMEOUT', '300'))
+# How long /api/sessions/<id>/end waits for other workers to flush the session
+SESSION_END_WAIT_SECONDS = float(os.environ.get('DETECTION_SESSION_END_WAIT', '3'))
+# Sessions with this prefix (benchmark_detection.py load) are served but not aggregated
+SESSION_IGNORE_PREFIX = os.environ.get('DETECTION_SESSION_IGNORE_PREFIX', 'loadtest-')
+session_aggregator = SessionAggregator(
+    make_sink(SESSION_SINK),
+    flush_interval=SESSION_FLUSH_SECONDS,
+    cooldown=SESSION_COOLDOWN_SECONDS,
+    window_gap=SESSION_WINDOW_GAP_SECONDS,
+    idle_timeout=SESSION_IDLE_SECONDS
+) if SESSION_SINK else None
+
+# Events accepted per /api/sessions/<id>/events call
+MAX_EVENTS_PER_REQUEST = 100
+
+# Set once a warm-up inference has run; /api/health reports 503 until then
+model_warm = False
+
+# Background model loading (see start_warm_up): torch, ultralytics and the
+# weights load after the HTTP layer is already answering liveness probes
+startup = {'state': 'starting', 'error': None, 'seconds': None}
+PROCESS_STARTED = time.monotonic()
+
+# Seconds a client is told to wait while the model is still loading
+WARMING_RETRY_AFTER = 2
+
+# Square frame size used for the warm-up inference
+WARMUP_IMAGE_SIZE = int(os.environ.get('DETECTION_WARMUP_SIZE', '640'))
+
+# Micro-batching settings (override with environment variables). A batch only
+# fills when DETECTION_MAX_CONCURRENT admits at least DETECTION_MAX_BATCH_SIZE
+# frames at once, so raise both together.
+BATCHING_ENABLED = os.environ.get('DETECTION_BATCHING', '1') == '1'
+MAX_BATCH_SIZE = int(os.environ.get('DETECTION_MAX_BATCH_SIZE', '8'))
+MAX_BATCH_WAIT_MS = float(os.environ.get('DETECTION_MAX_WAIT_MS', '5'))
+MAX_FRAMES_PER_REQUEST = int(os.environ.get('DETECTION_MAX_FRAMES_PER_REQUEST', '32'))
+
+# Largest raw frame accepted by the binary upload route
+MAX_FRAME_BYTES = int(os.environ.get('DETECTION_MAX_FRAME_BYTES', str(5 * 1024 * 1024)))
+
+# Recorded-video analysis (/api/analyze-video): uploads up to this size, and
+# server-side recordings only from inside DETECTION_VIDEO_DIR when it is set
+MAX_VIDEO_BYTES = int(os.environ.get('DETECTION_MAX_VIDEO_BYTES', str(500 * 1024 * 1024)))
+VIDEO_DIR = os.environ.get('DETECTION_VIDEO_DIR')
+
+# Video uploads are the largest bodies any route accepts. Werkzeug enforces
+# the limit while reading, so chunked uploads without Content-Length are
+# capped too
+app.config['MAX_CONTENT_LENGTH'] = MAX_VIDEO_BYTES
+
+# Global batcher, started once the model is loaded
+batcher = None
+
+# Multiprocess pipeline (see frame_pipeline.py): decode processes write frames
+# into a shared-memory ring that inference processes read by slot index.
+# Full-frame requests use it; tracking, ROI and perceptual caching need the
+# decoded frame in this process and keep the in-process path
+PIPELINE_ENABLED = os.environ.get('DETECTION_PIPELINE', '0') == '1'
+PIPELINE_DECODE_WORKERS = int(os.environ.get('DETECTION_PIPELINE_DECODE_WORKERS', '2'))
+PIPELINE_INFERENCE_WORKERS = int(os.environ.get('DETECTION_PIPELINE_INFERENCE_WORKERS', '1'))
+PIPELINE_SLOTS = int(os.environ.get('DETECTION_PIPELINE_SLOTS', '16'))
+PIPELINE_MAX_PIXELS = int(os.environ.get('DETECTION_PIPELINE_MAX_PIXELS', str(1280 * 720)))
+PIPELINE_TIMEOUT = float(os.environ.get('DETECTION_PIPELINE_TIMEOUT', '10'))
+
+# Global pipeline, started after the in-process model is warm
+pipeline = None
+
+# Detection thresholds
+CONFIDENCE_THRESHOLD = 0.6  # Increased threshold to reduce false positives
+MIN_AREA_RATIO = 0.001      # Detections must cover between 0.1%
+MAX_AREA_RATIO = 0.5        # and 50% of the frame
+
+# Define mobile device classes for different YOLO models
+MOBILE_CLASSES = {
+    # Standard YOLOv8 COCO classes
+    67: 'cell phone',  # COCO class for cell phone
+    73: 'laptop',      # COCO class for laptop
+    74: 'mouse',       # COCO class for mouse
+    75: 'remote',      # COCO class for remote
+    76: 'keyboard',    # COCO class for keyboard
+    77: 'cell phone',  # Alternative cell phone class
+
+    # Custom model classes (if using custom trained model)
+    0: 'mobile_device',  # Custom model class 0
+    1: 'phone',          # Custom model class 1
+    2: 'tablet',         # Custom model class 2
+}
+
+# Classes to explicitly exclude (faces, people, etc.)
+EXCLUDED_CLASSES = {
+    0: 'person',        # COCO person class
+    1: 'bicycle',       # COCO bicycle class
+    2: 'car',           # COCO car class
+    3: 'motorcycle',    # COCO motorcycle class
+    4: 'airplane',      # COCO airplane class
+    5: 'bus',           # COCO bus class
+    6: 'train',         # COCO train class
+    7: 'truck',         # COCO truck class
+    15: 'bench',        # COCO bench class
+    16: 'bird',         # COCO bird class
+    17: 'cat',          # COCO cat class
+    18: 'dog',          # COCO dog class
+    19: 'horse',        # COCO horse class
+    20: 'sheep',        # COCO sheep class
+    21: 'cow',          # COCO cow class
+    22: 'elephant',     # COCO elephant class
+    23: 'bear',         # COCO bear class
+    24: 'zebra',        # COCO zebra class
+    25: 'giraffe',      # COCO giraffe class
+    27: 'backpack',     # COCO backpack class
+    28: 'umbrella',     # COCO umbrella class
+    31: 'handbag',      # COCO handbag class
+    32: 'tie',          # COCO tie class
+    33: 'suitcase',     # COCO suitcase class
+    34: 'frisbee',      # COCO frisbee class
+    35: 'skis',         # COCO skis class
+    36: 'snowboard',    # COCO snowboard class
+    37: 'sports ball',  # COCO sports ball class
+    38: 'kite',         # COCO kite class
+    39: 'baseball bat', # COCO baseball bat class
+    40: 'baseball glove', # COCO baseball glove class
+    41: 'skateboard',   # COCO skateboard class
+    42: 'surfboard',    # COCO surfboard class
+    43: 'tennis racket', # COCO tennis racket class
+    44: 'bottle',       # COCO bottle class
+    46: 'wine glass',   # COCO wine glass class
+    47: 'cup',          # COCO cup class
+    48: 'fork',         # COCO fork class
+    49: 'knife',        # COCO knife class
+    50: 'spoon',        # COCO spoon class
+    51: 'bowl',         # COCO bowl class
+    52: 'banana',       # COCO banana class
+    53: 'apple',        # COCO apple class
+    54: 'sandwich',     # COCO sandwich class
+    55: 'orange',       # COCO orange class
+    56: 'broccoli',     # COCO broccoli class
+    57: 'carrot',       # COCO carrot class
+    58: 'hot dog',      # COCO hot dog class
+    59: 'pizza',        # COCO pizza class
+    60: 'donut',        # COCO donut class
+    61: 'cake',         # COCO cake class
+    62: 'chair',        # COCO chair class
+    63: 'couch',        # COCO couch class
+    64: 'potted plant', # COCO potted plant class
+    65: 'bed',          # COCO bed class
+    66: 'dining table', # COCO dining table class
+    68: 'microwave',    # COCO microwave class
+    69: 'oven',         # COCO oven class
+    70: 'toaster',      # COCO toaster class
+    71: 'sink',         # COCO sink class
+    72: 'refrigerator', # COCO refrigerator class
+}
+
+# COCO class names for reference
+COCO_CLASSES = {
+    0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 4: 'airplane', 5: 'bus',
+    6: 'train', 7: 'truck', 8: 'boat', 9: 'traffic light', 10: 'fire hydrant',
+    11: 'stop sign', 12: 'parking meter', 13: 'bench', 14: 'bird', 15: 'cat',
+    16: 'dog', 17: 'horse', 18: 'sheep', 19: 'cow', 20: 'elephant',
+    21: 'bear', 22: 'zebra', 23: 'giraffe', 24: 'backpack', 25: 'umbrella',
+    26: 'handbag', 27: 'tie', 28: 'suitcase', 29: 'frisbee', 30: 'skis',
+    31: 'snowboard', 32: 'sports ball', 33: 'kite', 34: 'baseball bat',
+    35: 'baseball glove', 36: 'skateboard', 37: 'surfboard', 38: 'tennis racket',
+    39: 'bottle', 40: 'wine glass', 41: 'cup', 42: 'fork', 43: 'knife',
+    44: 'spoon', 45: 'bowl', 46: 'banana', 47: 'apple', 48: 'sandwich',
+    49: 'orange', 50: 'broccoli', 51: 'carrot', 52: 'hot dog', 53: 'pizza',
+    54: 'donut', 55: 'cake', 56: 'chair', 57: 'couch', 58: 'potted plant',
+    59: 'bed', 60: 'dining table', 61: 'toilet', 62: 'tv', 63: 'laptop',
+    64: 'mouse', 65: 'remote', 66: 'keyboard', 67: 'cell phone', 68: 'microwave',
+    69: 'oven', 70: 'toaster', 71: 'sink', 72: 'refrigerator', 73: 'book',
+    74: 'clock', 75: 'vase', 76: 'scissors', 77: 'teddy bear', 78: 'hair drier',
+    79: 'toothbrush'
+}
+
+# Boolean lookup tables indexed by class ID, used to filter all boxes at once.
+# Excluded classes win over mobile classes that share an ID.
+CLASS_TABLE_SIZE = 1 + max(max(MOBILE_CLASSES), max(EXCLUDED_CLASSES), max(COCO_CLASSES))
+MOBILE_CLASS_MASK = np.zeros(CLASS_TABLE_SIZE, dtype=bool)
+MOBILE_CLASS_MASK[list(MOBILE_CLASSES)] = True
+EXCLUDED_CLASS_MASK = np.zeros(CLASS_TABLE_SIZE, dtype=bool)
+EXCLUDED_CLASS_MASK[list(EXCLUDED_CLASSES)] = True
+
 def load_model():
     """Load the YOLO model with fallback options"""
-    global model
+    global model, model_source
     try:
         # Try different model paths
         model_paths = [
@@ -28,14 +323,25 @@ def load_model():
             "models/best_yolov12.pt",
             "models/best_yolov8.pt"
         ]
+        # Weights activated through the admin API win, so restarted workers match the others
+        desired = registry.desired_active_path()
+        if desired and desired not in model_paths:
+            model_paths.insert(0, desired)
         
         for model_path in model_paths:
             if os.path.exists(model_path):
                 logger.info(f"Attempting to load model from: {model_path}")
                 try:
-                    # Try loading with different approaches
-                    model = YOLO(model_path)
+                    # Export/load on the fastest available backend, falling back to PyTorch
+                    model, model_source = model_backends.load_detector(
+                        model_path, MODEL_BACKEND, imgsz=EXPORT_IMAGE_SIZE, cache_dir=MODEL_CACHE_DIR,
+                        precision=MODEL_PRECISION, calibration_dir=CALIBRATION_DIR
+                    )
                     logger.info(f"✅ YOLO model loaded successfully from {model_path}")
+                    detection_metrics.set_model_info(
+                        model_source.get('backend'), model_backends.model_device(model, model_source),
+                        model_source.get('precision')
+                    )
                     return True
                 except Exception as e:
                     logger.warning(f"Failed to load {model_path}: {e}")
@@ -45,8 +351,12 @@ def load_model():
         logger.warning("All custom models failed. Attempting to use a standard YOLOv8 model...")
         try:
             # Try to load a standard YOLOv8 model
+            from ultralytics import YOLO
             model = YOLO('yolov8n.pt')  # This will download if not available
+            model_source = {'backend': 'pytorch', 'precision': 'fp32',
+                            'weights_path': 'yolov8n.pt', 'artifact_path': 'yolov8n.pt'}
             logger.info("✅ Standard YOLOv8 model loaded successfully")
+            detection_metrics.set_model_info('pytorch', model_backends.model_device(model, model_source), 'fp32')
             return True
         except Exception as e:
             logger.error(f"Failed to load standard model: {e}")
@@ -56,6 +366,662 @@ def load_model():
         logger.error(f"Error in model loading: {e}")
         return False
 
+def warm_up_inference(detector):
+    """One throwaway inference on a blank frame"""
+    dummy = np.zeros((WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE, 3), dtype=np.uint8)
+    detector(dummy, verbose=False, imgsz=INFERENCE_IMAGE_SIZE)
+
+def warm_up_model():
+    """Run one throwaway inference so the first real request skips lazy initialization"""
+    global model_warm
+    if model is None:
+        return False
+    try:
+        warm_up_inference(model)
+        model_warm = True
+        logger.info("✅ Model warm-up inference completed")
+        return True
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        return False
+
+def start_warm_up(torch_threads=None):
+    """Load (if needed) and warm up the model on a background thread.
+
+    The heavy imports happen here rather than at module import, so the HTTP
+    layer starts serving straight away: /api/health/live answers at once and
+    /api/health/ready (and the detection routes) report 503 until the model
+    has run its warm-up inference.
+    """
+    def run():
+        start = time.perf_counter()
+        startup['state'] = 'loading'
+        try:
+            if torch_threads:
+                import torch
+                torch.set_num_threads(torch_threads)
+            if model is None and not load_model():
+                raise RuntimeError("Failed to load model")
+            if not warm_up_model():
+                raise RuntimeError("Model warm-up failed")
+            start_batcher()
+            if registry.active is None:
+                registry.install(model, model_source)
+            registry.start()
+            start_pipeline()
+        except Exception as e:
+            startup.update(state='failed', error=str(e))
+            logger.error(f"❌ Model startup failed: {e}")
+            return
+        startup.update(state='ready', seconds=round(time.perf_counter() - start, 3))
+        logger.info(f"✅ Model ready after {startup['seconds']}s")
+
+    if session_aggregator is not None:
+        session_aggregator.start()
+    thread = threading.Thread(target=run, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def start_batcher():
+    """Start the micro-batcher that groups frames from concurrent requests"""
+    global batcher
+    if not BATCHING_ENABLED or batcher is not None:
+        return
+    batcher = InferenceBatcher(
+        infer_batch,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_BATCH_WAIT_MS
+    )
+    batcher.start()
+
+def start_pipeline():
+    """Start the decode/inference processes; requests use them once they report ready"""
+    global pipeline
+    if not PIPELINE_ENABLED or pipeline is not None:
+        return
+    pipeline = FramePipeline(
+        pipeline_worker_setup,
+        decode_workers=PIPELINE_DECODE_WORKERS,
+        inference_workers=PIPELINE_INFERENCE_WORKERS,
+        slots=PIPELINE_SLOTS,
+        max_pixels=PIPELINE_MAX_PIXELS,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_BATCH_WAIT_MS,
+        timeout=PIPELINE_TIMEOUT
+    )
+    try:
+        pipeline.start()
+    except OSError as e:
+        # e.g. /dev/shm too small for the ring
+        logger.warning(f"⚠️ Frame pipeline not started, inference stays in-process: {e}")
+        pipeline = None
+
+def pipeline_worker_setup():
+    """Runs in each pipeline inference process: load and warm the model, follow registry swaps"""
+    if not load_model() or not warm_up_model():
+        raise RuntimeError("Failed to load model")
+    registry.install(model, model_source)
+    registry.start()
+    return infer_frames
+
+def infer_batch(frames):
+    """One YOLO model call over a list of frames"""
+    detection_metrics.BATCH_SIZE.observe(len(frames))
+    # Read the model once: a hot swap takes effect from the next batch
+    detector = model
+    start = time.perf_counter()
+    results = detector(frames, verbose=False, imgsz=INFERENCE_IMAGE_SIZE)
+    registry.shadow(frames, results, time.perf_counter() - start)
+    return results
+
+def run_inference(frames):
+    """Run YOLO on a list of frames and return one result per frame"""
+    with detection_metrics.time_stage('inference'):
+        if batcher is not None:
+            detection_metrics.QUEUE_DEPTH.set(batcher.queue_depth)
+            return batcher.submit_many(frames)
+        return infer_batch(frames)
+
+def load_weights(path):
+    """Load and warm a detector for a registry swap; returns (model, model_source)"""
+    detector, source = model_backends.load_detector(
+        path, MODEL_BACKEND, imgsz=EXPORT_IMAGE_SIZE, cache_dir=MODEL_CACHE_DIR,
+        precision=MODEL_PRECISION, calibration_dir=CALIBRATION_DIR
+    )
+    warm_up_inference(detector)
+    return detector, source
+
+def activate_model(version, reason):
+    """Make a registry model the one requests use, dropping results of the old one"""
+    global model, model_source
+    model, model_source = version.model, version.source
+    if result_cache is not None:
+        result_cache.clear()
+    if frame_tracker is not None:
+        frame_tracker.clear()
+    detection_metrics.set_model_info(
+        model_source.get('backend'), model_backends.model_device(model, model_source),
+        model_source.get('precision')
+    )
+    detection_metrics.MODEL_SWAPS.labels(reason).inc()
+
+def shadow_inference(detector, frames):
+    return detector(frames, verbose=False, imgsz=INFERENCE_IMAGE_SIZE)
+
+def mobile_present(result):
+    """Whether a raw YOLO result has a confident mobile device box (before size filtering)"""
+    _, confidences, classes = result_boxes(result)
+    known = (classes >= 0) & (classes < CLASS_TABLE_SIZE)
+    class_ids = np.where(known, classes, 0)
+    mobile = known & MOBILE_CLASS_MASK[class_ids] & ~EXCLUDED_CLASS_MASK[class_ids]
+    return bool(np.any(mobile & (confidences >= CONFIDENCE_THRESHOLD)))
+
+def compare_shadow_results(active_results, candidate_results):
+    """Per frame, whether the candidate agrees with the active model on phone presence"""
+    agreed = [mobile_present(a) == mobile_present(c) for a, c in zip(active_results, candidate_results)]
+    for outcome in agreed:
+        detection_metrics.SHADOW_FRAMES.labels('agree' if outcome else 'disagree').inc()
+    return agreed
+
+# Active / previous / candidate models, hot reload and shadow traffic
+registry = ModelRegistry(
+    load_weights,
+    on_activate=activate_model,
+    infer=shadow_inference,
+    compare=compare_shadow_results,
+    state_path=MODEL_STATE_PATH,
+    poll_interval=MODEL_POLL_SECONDS,
+    watch_files=MODEL_WATCH,
+    keep_previous=KEEP_PREVIOUS_MODEL
+)
+
+def decode_base64_bytes(image_data):
+    """Decode a base64 (or data URL) image string into its encoded image bytes"""
+    # Remove data URL prefix if present
+    if image_data.startswith('data:image'):
+        image_data = image_data.split(',')[1]
+    
+    with detection_metrics.time_stage('base64_decode'):
+        return base64.b64decode(image_data)
+
+def decode_base64_image(image_data):
+    """Decode a base64 (or data URL) image string into a BGR frame"""
+    nparr = np.frombuffer(decode_base64_bytes(image_data), np.uint8)
+    with detection_metrics.time_stage('imdecode'):
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+# Per-thread receive buffers for binary frame uploads
+_frame_buffers = threading.local()
+
+class FrameTooLarge(Exception):
+    """Raised when an uploaded frame exceeds MAX_FRAME_BYTES"""
+
+def _get_frame_buffer(size):
+    """Return this thread's receive buffer, growing it to at least size bytes"""
+    buf = getattr(_frame_buffers, 'buf', None)
+    if buf is None or len(buf) < size:
+        buf = bytearray(max(size, 256 * 1024))
+        _frame_buffers.buf = buf
+    return buf
+
+def read_frame_bytes(stream, length=None):
+    """Read an encoded frame from a stream into the reusable buffer.
+
+    Returns the buffer and the number of bytes read. The buffer is only valid
+    until the next call on the same thread, so decode it straight away.
+    """
+    if length is not None and length > MAX_FRAME_BYTES:
+        raise FrameTooLarge(length)
+    
+    buf = _get_frame_buffer(length or 0)
+    readinto = getattr(stream, 'readinto', None)
+    total = 0
+    while True:
+        if total == len(buf):
+            if total >= MAX_FRAME_BYTES:
+                raise FrameTooLarge(total)
+            buf.extend(bytes(len(buf)))
+            _frame_buffers.buf = buf
+        limit = len(buf) if length is None else length
+        if total >= limit:
+            break
+        
+        with memoryview(buf) as view:
+            if readinto is not None:
+                n = readinto(view[total:limit])
+            else:
+                chunk = stream.read(limit - total)
+                n = len(chunk)
+                view[total:total + n] = chunk
+        if not n:
+            break
+        total += n
+    
+    if total > MAX_FRAME_BYTES:
+        raise FrameTooLarge(total)
+    return buf, total
+
+def decode_frame_bytes(buf, size):
+    """Decode the first size bytes of an encoded image buffer into a BGR frame"""
+    if size == 0:
+        return None
+    nparr = np.frombuffer(buf, np.uint8, count=size)
+    with detection_metrics.time_stage('imdecode'):
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def result_boxes(result):
+    """Return (xyxy, confidences, class IDs) arrays for all boxes in a YOLO result"""
+    data = result.boxes.data
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    if data.ndim != 2:
+        data = data.reshape(-1, 6)
+    # Columns are x1, y1, x2, y2, [track_id,] conf, cls
+    return data[:, :4], data[:, -2], data[:, -1].astype(np.int64)
+
+def frame_detections(result, transform, frame_shape):
+    """All boxes of a YOLO result as an (N, 6) array of x1, y1, x2, y2, conf, cls.
+
+    transform maps boxes from the prepared (cropped/resized) input back to the
+    original frame, so the array is in original frame coordinates.
+    """
+    boxes, confidences, classes = result_boxes(result)
+    detections = np.empty((len(boxes), 6), dtype=np.float32)
+    detections[:, :4] = boxes_to_frame(boxes, transform, frame_shape)
+    detections[:, 4] = confidences
+    detections[:, 5] = classes
+    return detections
+
+def detection_columns(detections):
+    """Split a frame_detections() array into (xyxy, confidences, class IDs)"""
+    return detections[:, :4], detections[:, 4], detections[:, 5].astype(np.int64)
+
+def extract_mobile_detections(detections, frame_shape):
+    """Filter one frame's detections down to reasonably sized mobile device detections"""
+    boxes, confidences, classes = detection_columns(detections)
+    
+    # Confidence threshold and class masks over all boxes at once
+    confident = confidences >= CONFIDENCE_THRESHOLD
+    known = (classes >= 0) & (classes < CLASS_TABLE_SIZE)
+    class_ids = np.where(known, classes, 0)
+    excluded = confident & known & EXCLUDED_CLASS_MASK[class_ids]
+    mobile = confident & known & ~excluded & MOBILE_CLASS_MASK[class_ids]
+    
+    # Size filtering in original frame coordinates to avoid small false positives
+    frame_area = frame_shape[0] * frame_shape[1]
+    mobile_boxes = boxes[mobile].astype(np.int64)
+    areas = (mobile_boxes[:, 2] - mobile_boxes[:, 0]) * (mobile_boxes[:, 3] - mobile_boxes[:, 1])
+    area_ratios = areas / frame_area
+    sized = (area_ratios > MIN_AREA_RATIO) & (area_ratios < MAX_AREA_RATIO)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for i in np.flatnonzero(excluded):
+            if box_log_sampler.should_log():
+                cls = int(classes[i])
+                logger.debug("Skipping excluded class %d (%s) with confidence %.3f",
+                             cls, EXCLUDED_CLASSES[cls], confidences[i])
+        for i in np.flatnonzero(confident & ~excluded & ~mobile):
+            if box_log_sampler.should_log():
+                logger.debug("Skipping non-mobile class %d with confidence %.3f", classes[i], confidences[i])
+        for cls, ratio in zip(classes[mobile][~sized], area_ratios[~sized]):
+            if box_log_sampler.should_log():
+                logger.debug("Skipping mobile class %d due to size: area ratio %.3f", cls, ratio)
+    
+    detections = []
+    for (x1, y1, x2, y2), area, ratio, conf, cls in zip(
+        mobile_boxes[sized].tolist(), areas[sized].tolist(), area_ratios[sized].tolist(),
+        confidences[mobile][sized].tolist(), classes[mobile][sized].tolist()
+    ):
+        detections.append({
+            'confidence': conf,
+            'bbox': [x1, y1, x2, y2],
+            'area': area,
+            'center': [(x1 + x2) // 2, (y1 + y2) // 2],
+            'class': cls,
+            'class_name': MOBILE_CLASSES.get(cls, f'class_{cls}'),
+            'area_ratio': ratio
+        })
+        if logger.isEnabledFor(logging.DEBUG) and box_log_sampler.should_log():
+            logger.debug("Mobile device detected: class %d (%s) with confidence %.3f, area ratio %.3f",
+                         cls, MOBILE_CLASSES.get(cls, f'class_{cls}'), conf, ratio)
+    
+    mobile_detected = bool(detections)
+    max_confidence = max((d['confidence'] for d in detections), default=0)
+    
+    return mobile_detected, detections, max_confidence
+
+def build_detection_response(frame_dets, frame_shape):
+    """Build the detect-mobile response body for one frame"""
+    with detection_metrics.time_stage('postprocess'):
+        mobile_detected, detections, max_confidence = extract_mobile_detections(frame_dets, frame_shape)
+    
+    # Log detection results as structured fields
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Detection completed", extra={
+            'mobile_detected': mobile_detected,
+            'detections': len(detections),
+            'max_confidence': round(max_confidence, 3),
+            'classes': [d['class'] for d in detections]
+        })
+    
+    return {
+        'mobile_detected': mobile_detected,
+        'detections': detections,
+        'confidence': max_confidence,
+        'total_detections': len(detections),
+        'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
+    }
+
+def build_debug_response(frame_dets, frame_shape):
+    """Build the debug-detection response body: every box, sorted by confidence"""
+    all_detections = []
+    
+    boxes, confidences, classes = detection_columns(frame_dets)
+    frame_boxes = boxes.astype(np.int64)
+    areas = (frame_boxes[:, 2] - frame_boxes[:, 0]) * (frame_boxes[:, 3] - frame_boxes[:, 1])
+    area_ratios = areas / (frame_shape[0] * frame_shape[1])
+    
+    # Sort by confidence
+    order = np.argsort(-confidences, kind='stable')
+    for (x1, y1, x2, y2), area, ratio, conf, cls in zip(
+        frame_boxes[order].tolist(), areas[order].tolist(), area_ratios[order].tolist(),
+        confidences[order].tolist(), classes[order].tolist()
+    ):
+        all_detections.append({
+            'class_id': cls,
+            'class_name': COCO_CLASSES.get(cls, f'unknown_class_{cls}'),
+            'confidence': conf,
+            'bbox': [x1, y1, x2, y2],
+            'area': area,
+            'area_ratio': ratio,
+            'center': [(x1 + x2) // 2, (y1 + y2) // 2]
+        })
+    
+    return {
+        'all_detections': all_detections,
+        'total_detections': len(all_detections),
+        'frame_size': [frame_shape[1], frame_shape[0]],  # width, height
+        'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
+    }
+
+def infer_frames(frames, rois=None):
+    """Preprocess and run YOLO on decoded frames; returns one frame_detections() array each"""
+    rois = rois or [None] * len(frames)
+    prepared = [prepare_frame(frame, INFERENCE_IMAGE_SIZE, roi, LETTERBOX_MODE) for frame, roi in zip(frames, rois)]
+    results = run_inference([inputs for inputs, _ in prepared])
+    return [
+        frame_detections(result, transform, frame.shape)
+        for frame, (_, transform), result in zip(frames, prepared, results)
+    ]
+
+def detect_mobile_frames(frames):
+    """(mobile_detected, detections, max_confidence) per decoded frame, with detect-mobile's filters"""
+    return [
+        extract_mobile_detections(frame_dets, frame.shape)
+        for frame, frame_dets in zip(frames, infer_frames(frames))
+    ]
+
+def cache_key_for(image_bytes, size=None):
+    """Result cache key for encoded image bytes, or None with the cache disabled"""
+    if result_cache is None:
+        return None
+    return content_key(image_bytes, size)
+
+def cached_detections(cache_key):
+    """(frame detections, frame shape) cached for an encoded image, or None"""
+    if result_cache is None or cache_key is None:
+        return None
+    entry = result_cache.get(cache_key)
+    if entry is not None:
+        detection_metrics.CACHE_LOOKUPS.labels('hit').inc()
+    return entry
+
+def detect_full_frames(frames, cache_keys=None):
+    """Full-frame detections for decoded frames, answering repeats from the result cache"""
+    if result_cache is None:
+        return infer_frames(frames)
+    
+    cache_keys = cache_keys or [None] * len(frames)
+    detections = [None] * len(frames)
+    phashes = [None] * len(frames)
+    misses = []
+    for i, frame in enumerate(frames):
+        entry, phashes[i] = result_cache.get_similar(frame)
+        if entry is not None:
+            detection_metrics.CACHE_LOOKUPS.labels('perceptual_hit').inc()
+            detections[i] = entry[0]
+        else:
+            detection_metrics.CACHE_LOOKUPS.labels('miss').inc()
+            misses.append(i)
+    
+    if misses:
+        for i, frame_dets in zip(misses, infer_frames([frames[i] for i in misses])):
+            frame_dets.flags.writeable = False
+            detections[i] = frame_dets
+    
+    for cache_key, phash, frame, frame_dets in zip(cache_keys, phashes, frames, detections):
+        result_cache.put(cache_key, (frame_dets, frame.shape), phash)
+    detection_metrics.CACHE_ENTRIES.set(len(result_cache))
+    return detections
+
+def get_session_id(data=None):
+    """Interview/mock session ID from the JSON body, X-Session-Id header or query string"""
+    session_id = data.get('session_id') if isinstance(data, dict) else None
+    session_id = session_id or request.headers.get('X-Session-Id') or request.args.get('session_id')
+    return str(session_id) if session_id else None
+
+def pipeline_detect(buf, size, session_id=None, cache_key=None):
+    """Decode and detect an encoded frame on the pipeline processes.
+
+    Returns the response body, or None when the frame should be decoded in
+    this process instead: the pipeline is off, busy or restarting, the
+    request needs the decoded frame here, or the image didn't decode.
+    """
+    if pipeline is None or not pipeline.ready:
+        return None
+    if (session_id is not None and (frame_tracker is not None or roi_tracker is not None)) or \
+            (result_cache is not None and result_cache.perceptual):
+        return None
+    
+    try:
+        with detection_metrics.time_stage('pipeline'):
+            result = pipeline.detect(bytes(memoryview(buf)[:size]))
+    except PipelineUnavailable as e:
+        logger.debug(f"Frame pipeline unavailable, detecting in-process: {e}")
+        detection_metrics.PIPELINE_FRAMES.labels('fallback').inc()
+        return None
+    if result is None:
+        detection_metrics.PIPELINE_FRAMES.labels('fallback').inc()
+        return None
+    detection_metrics.PIPELINE_FRAMES.labels('processed').inc()
+    
+    frame_dets, frame_shape = result
+    if result_cache is not None:
+        detection_metrics.CACHE_LOOKUPS.labels('miss').inc()
+        frame_dets.flags.writeable = False
+        result_cache.put(cache_key, (frame_dets, frame_shape))
+        detection_metrics.CACHE_ENTRIES.set(len(result_cache))
+    response = build_detection_response(frame_dets, frame_shape)
+    aggregate_detection(session_id, response)
+    return response
+
+def detect_frame(frame, session_id=None, cache_key=None):
+    """Run preprocessing, inference and filtering for one decoded frame.
+
+    cache_key is the frame's content key; full-frame results are stored under
+    it in the result cache.
+    """
+    use_tracking = frame_tracker is not None and session_id is not None
+    if use_tracking:
+        reused, thumb = frame_tracker.reuse(session_id, frame)
+        if reused is not None:
+            detection_metrics.FRAMES_REUSED.inc()
+            aggregate_detection(session_id, reused)
+            return reused
+    
+    use_roi = roi_tracker is not None and session_id is not None
+    roi = roi_tracker.select(session_id) if use_roi else None
+    
+    if roi is None:
+        frame_dets = detect_full_frames([frame], [cache_key])[0]
+    else:
+        frame_dets = infer_frames([frame], [roi])[0]
+    
+    if use_roi:
+        roi_tracker.update(
+            session_id,
+            frame_dets[:, :4],
+            frame_dets[:, 4],
+            frame.shape,
+            full_frame=roi is None
+        )
+    
+    response = build_detection_response(frame_dets, frame.shape)
+    if use_tracking:
+        frame_tracker.store(session_id, thumb, response, frame.shape)
+    aggregate_detection(session_id, response)
+    return response
+
+def aggregate_detection(session_id, body):
+    """Fold a detection response into its session's rolling state"""
+    if session_aggregator is None or session_id is None:
+        return
+    if SESSION_IGNORE_PREFIX and session_id.startswith(SESSION_IGNORE_PREFIX):
+        return
+    session_aggregator.record_detection(session_id, body)
+
+def detection_json(body):
+    """Serialize a detection response body, noting its outcome for the request metrics"""
+    g.mobile_detected = body.get('mobile_detected')
+    with detection_metrics.time_stage('serialize'):
+        return jsonify(body)
+
+def recommended_interval_ms():
+    """Capture interval clients should use at the current load, in milliseconds"""
+    if admission is None:
+        return int(MIN_CAPTURE_INTERVAL_MS)
+    interval = admission.recommended_interval()
+    detection_metrics.RECOMMENDED_INTERVAL.set(interval)
+    return int(interval * 1000)
+
+def rejection_body(rejected):
+    """Response body for a request shed by admission control"""
+    detection_metrics.ADMISSION_REJECTIONS.labels(rejected.reason).inc()
+    return {
+        'error': 'Detection service busy' if rejected.reason != 'superseded' else 'Superseded by a newer frame',
+        'reason': rejected.reason,
+        'throttled': True,
+        'mobile_detected': False,
+        'confidence': 0,
+        'retry_after_ms': int(rejected.retry_after * 1000),
+        'recommended_interval_ms': recommended_interval_ms()
+    }
+
+def rejection_response(rejected):
+    """429/503 response with Retry-After for a request shed by admission control"""
+    response = jsonify(rejection_body(rejected))
+    response.status_code = rejected.status
+    response.headers['Retry-After'] = rejected.retry_after_header
+    return response
+
+def admission_slot(session_id):
+    """Context manager holding an admission slot (a no-op with admission control off)"""
+    if admission is None:
+        return contextlib.nullcontext()
+    return admission.slot(session_id)
+
+# Endpoints counted in detection_requests_total / detection_requests_in_flight
+METERED_ENDPOINTS = {'detect_mobile', 'detect_mobile_frame', 'detect_mobile_batch', 'debug_detection'}
+
+# Endpoints that need a warm model
+MODEL_ENDPOINTS = METERED_ENDPOINTS | {'analyze_video'}
+
+# Endpoints that change which model is served, or read and end interview sessions
+ADMIN_ENDPOINTS = {'load_model_weights', 'promote_model', 'rollback_model', 'clear_candidate_model',
+                   'session_timeline', 'end_session'}
+
+@app.before_request
+def start_request_metrics():
+    if request.endpoint in METERED_ENDPOINTS:
+        g.request_start = time.perf_counter()
+        detection_metrics.IN_FLIGHT.inc()
+
+@app.before_request
+def require_ready_model():
+    """Answer 503 while the model is still loading instead of failing the request"""
+    if model_warm or request.endpoint not in MODEL_ENDPOINTS:
+        return None
+    response = jsonify({
+        'error': 'Model is still loading' if startup['state'] != 'failed' else 'Model failed to load',
+        'mobile_detected': False,
+        'confidence': 0,
+        'startup': startup['state']
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(WARMING_RETRY_AFTER)
+    return response
+
+@app.before_request
+def require_admin():
+    """Admin routes: Bearer DETECTION_ADMIN_TOKEN, or localhost when no token is set"""
+    if request.endpoint not in ADMIN_ENDPOINTS:
+        return None
+    if ADMIN_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            return None
+    elif request.remote_addr in ('127.0.0.1', '::1'):
+        return None
+    return jsonify({'error': 'Not authorized'}), 403
+
+@app.before_request
+def admit_detection_request():
+    """Wait for an admission slot, or shed the request when the service is overloaded"""
+    if admission is None or request.endpoint not in METERED_ENDPOINTS:
+        return None
+    
+    # Clients should send the session in a header; fall back to the JSON body
+    session_id = get_session_id()
+    if session_id is None and request.is_json:
+        session_id = get_session_id(request.get_json(silent=True))
+    
+    # A batch holds one slot per frame so batching can't get around the limit
+    frames = 1
+    if request.endpoint == 'detect_mobile_batch' and request.is_json:
+        data = request.get_json(silent=True)
+        images = data.get('images') if isinstance(data, dict) else None
+        if isinstance(images, list):
+            frames = min(len(images), MAX_FRAMES_PER_REQUEST)
+    
+    try:
+        g.admission_ticket = admission.admit(session_id, frames)
+    except AdmissionRejected as e:
+        return rejection_response(e)
+    finally:
+        detection_metrics.ADMISSION_QUEUE_DEPTH.set(admission.queue_depth)
+    return None
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_start' in g:
+        detection_metrics.record_request(
+            request.endpoint,
+            response.status_code,
+            g.get('mobile_detected'),
+            time.perf_counter() - g.request_start
+        )
+        response.headers['X-Recommended-Interval-Ms'] = str(recommended_interval_ms())
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc=None):
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        admission.release(ticket)
+    if 'request_start' in g:
+        detection_metrics.IN_FLIGHT.dec()
+
 @app.route('/api/detect-mobile', methods=['POST'])
 def detect_mobile():
     """Detect mobile devices in the provided image"""
@@ -69,7 +1035,8 @@ def detect_mobile():
             }), 500
         
         # Get image data from request
-        data = request.get_json()
+        with detection_metrics.time_stage('json_parse'):
+            data = request.get_json()
         if not data or 'image' not in data:
             return jsonify({
                 'error': 'No image data provided',
@@ -77,187 +1044,318 @@ def detect_mobile():
                 'confidence': 0
             }), 400
         
-        image_data = data['image']
-        
         # Decode base64 image
         try:
-            # Remove data URL prefix if present
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if frame is None:
+            image_bytes = decode_base64_bytes(data['image'])
+        except Exception as e:
+            logger.error(f"Error decoding image: {e}")
+            return jsonify({
+                'error': 'Invalid image format',
+                'mobile_detected': False,
+                'confidence': 0
+            }), 400
+        
+        # Answer a frame seen recently from the cache, then try the pipeline;
+        # their failures are server errors, not bad images
+        cache_key = cache_key_for(image_bytes)
+        cached = cached_detections(cache_key)
+        if cached is not None:
+            body = build_detection_response(*cached)
+            aggregate_detection(get_session_id(data), body)
+            return detection_json(body)
+        
+        body = pipeline_detect(image_bytes, len(image_bytes), get_session_id(data), cache_key)
+        if body is not None:
+            return detection_json(body)
+        
+        try:
+            frame = decode_frame_bytes(image_bytes, len(image_bytes))
+        except Exception as e:
+            logger.error(f"Error decoding image: {e}")
+            frame = None
+        
+        if frame is None:
+            return jsonify({
+                'error': 'Invalid image data',
+                'mobile_detected': False,
+                'confidence': 0
+            }), 400
+        
+        # Run YOLO detection
+        return detection_json(detect_frame(frame, get_session_id(data), cache_key))
+        
+    except Exception as e:
+        logger.error(f"Detection error: {e}")
+        return jsonify({
+            'error': str(e),
+            'mobile_detected': False,
+            'confidence': 0
+        }), 500
+
+@app.route('/api/detect-mobile/frame', methods=['POST'])
+def detect_mobile_frame():
+    """Detect mobile devices in a raw image/jpeg body or multipart 'image' upload"""
+    try:
+        # Check if model is loaded
+        if model is None:
+            return jsonify({
+                'error': 'Model not loaded',
+                'mobile_detected': False,
+                'confidence': 0
+            }), 500
+        
+        # Read the encoded frame straight from the request stream
+        try:
+            if request.mimetype == 'multipart/form-data':
+                upload = request.files.get('image')
+                if upload is None:
+                    return jsonify({
+                        'error': 'No image data provided',
+                        'mobile_detected': False,
+                        'confidence': 0
+                    }), 400
+                buf, size = read_frame_bytes(upload.stream)
+            elif request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+                buf, size = read_frame_bytes(request.stream, request.content_length)
+            else:
                 return jsonify({
-                    'error': 'Invalid image data',
+                    'error': f'Unsupported content type: {request.mimetype or "none"}',
                     'mobile_detected': False,
                     'confidence': 0
-                }), 400
-                
+                }), 415
+        except FrameTooLarge:
+            return jsonify({
+                'error': f'Image too large (max {MAX_FRAME_BYTES} bytes)',
+                'mobile_detected': False,
+                'confidence': 0
+            }), 413
         except Exception as e:
-            logger.error(f"Error decoding image: {e}")
+            logger.error(f"Error reading image: {e}")
             return jsonify({
                 'error': 'Invalid image format',
                 'mobile_detected': False,
                 'confidence': 0
             }), 400
         
+        # Answer a frame seen recently from the cache, then try the pipeline;
+        # their failures are server errors, not bad images
+        cache_key = cache_key_for(buf, size)
+        cached = cached_detections(cache_key)
+        if cached is not None:
+            body = build_detection_response(*cached)
+            aggregate_detection(get_session_id(), body)
+            return detection_json(body)
+        
+        body = pipeline_detect(buf, size, get_session_id(), cache_key)
+        if body is not None:
+            return detection_json(body)
+        
+        try:
+            frame = decode_frame_bytes(buf, size)
+        except Exception as e:
+            logger.error(f"Error decoding image: {e}")
+            frame = None
+        
+        if frame is None:
+            return jsonify({
+                'error': 'Invalid image data',
+                'mobile_detected': False,
+                'confidence': 0
+            }), 400
+        
         # Run YOLO detection
-        results = model(frame, verbose=False)
-        mobile_detected = False
-        detections = []
-        max_confidence = 0
-        
-        # Define mobile device classes for different YOLO models
-        mobile_classes = {
-            # Standard YOLOv8 COCO classes
-            67: 'cell phone',  # COCO class for cell phone
-            73: 'laptop',      # COCO class for laptop
-            74: 'mouse',       # COCO class for mouse
-            75: 'remote',      # COCO class for remote
-            76: 'keyboard',    # COCO class for keyboard
-            77: 'cell phone',  # Alternative cell phone class
-            
-            # Custom model classes (if using custom trained model)
-            0: 'mobile_device',  # Custom model class 0
-            1: 'phone',          # Custom model class 1
-            2: 'tablet',         # Custom model class 2
-        }
-        
-        # Classes to explicitly exclude (faces, people, etc.)
-        excluded_classes = {
-            0: 'person',        # COCO person class
-            1: 'bicycle',       # COCO bicycle class
-            2: 'car',           # COCO car class
-            3: 'motorcycle',    # COCO motorcycle class
-            4: 'airplane',      # COCO airplane class
-            5: 'bus',           # COCO bus class
-            6: 'train',         # COCO train class
-            7: 'truck',         # COCO truck class
-            15: 'bench',        # COCO bench class
-            16: 'bird',         # COCO bird class
-            17: 'cat',          # COCO cat class
-            18: 'dog',          # COCO dog class
-            19: 'horse',        # COCO horse class
-            20: 'sheep',        # COCO sheep class
-            21: 'cow',          # COCO cow class
-            22: 'elephant',     # COCO elephant class
-            23: 'bear',         # COCO bear class
-            24: 'zebra',        # COCO zebra class
-            25: 'giraffe',      # COCO giraffe class
-            27: 'backpack',     # COCO backpack class
-            28: 'umbrella',     # COCO umbrella class
-            31: 'handbag',      # COCO handbag class
-            32: 'tie',          # COCO tie class
-            33: 'suitcase',     # COCO suitcase class
-            34: 'frisbee',      # COCO frisbee class
-            35: 'skis',         # COCO skis class
-            36: 'snowboard',    # COCO snowboard class
-            37: 'sports ball',  # COCO sports ball class
-            38: 'kite',         # COCO kite class
-            39: 'baseball bat', # COCO baseball bat class
-            40: 'baseball glove', # COCO baseball glove class
-            41: 'skateboard',   # COCO skateboard class
-            42: 'surfboard',    # COCO surfboard class
-            43: 'tennis racket', # COCO tennis racket class
-            44: 'bottle',       # COCO bottle class
-            46: 'wine glass',   # COCO wine glass class
-            47: 'cup',          # COCO cup class
-            48: 'fork',         # COCO fork class
-            49: 'knife',        # COCO knife class
-            50: 'spoon',        # COCO spoon class
-            51: 'bowl',         # COCO bowl class
-            52: 'banana',       # COCO banana class
-            53: 'apple',        # COCO apple class
-            54: 'sandwich',     # COCO sandwich class
-            55: 'orange',       # COCO orange class
-            56: 'broccoli',     # COCO broccoli class
-            57: 'carrot',       # COCO carrot class
-            58: 'hot dog',      # COCO hot dog class
-            59: 'pizza',        # COCO pizza class
-            60: 'donut',        # COCO donut class
-            61: 'cake',         # COCO cake class
-            62: 'chair',        # COCO chair class
-            63: 'couch',        # COCO couch class
-            64: 'potted plant', # COCO potted plant class
-            65: 'bed',          # COCO bed class
-            66: 'dining table', # COCO dining table class
-            68: 'microwave',    # COCO microwave class
-            69: 'oven',         # COCO oven class
-            70: 'toaster',      # COCO toaster class
-            71: 'sink',         # COCO sink class
-            72: 'refrigerator', # COCO refrigerator class
-        }
-        
-        for result in results:
-            for box in result.boxes:
-                conf = box.conf[0].item()
-                cls = int(box.cls[0].item())
-                
-                # Skip low confidence detections
-                if conf < 0.6:  # Increased threshold to reduce false positives
-                    continue
-                
-                # Skip excluded classes (faces, people, etc.)
-                if cls in excluded_classes:
-                    logger.info(f"Skipping excluded class {cls} ({excluded_classes[cls]}) with confidence {conf:.3f}")
-                    continue
-                
-                # Check if this is a mobile device class
-                is_mobile = cls in mobile_classes
-                
-                if is_mobile:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    area = (x2 - x1) * (y2 - y1)
-                    
-                    # Additional size filtering to avoid small false positives
-                    frame_area = frame.shape[0] * frame.shape[1]
-                    area_ratio = area / frame_area
-                    
-                    # Only consider detections that are reasonably sized
-                    if area_ratio > 0.001 and area_ratio < 0.5:  # Between 0.1% and 50% of frame
-                        mobile_detected = True
-                        max_confidence = max(max_confidence, conf)
-                        
-                        detections.append({
-                            'confidence': conf,
-                            'bbox': [x1, y1, x2, y2],
-                            'area': area,
-                            'center': [(x1 + x2) // 2, (y1 + y2) // 2],
-                            'class': cls,
-                            'class_name': mobile_classes.get(cls, f'class_{cls}'),
-                            'area_ratio': area_ratio
-                        })
-                        
-                        logger.info(f"Mobile device detected: class {cls} ({mobile_classes.get(cls, f'class_{cls}')}) "
-                                  f"with confidence {conf:.3f}, area ratio {area_ratio:.3f}")
-                    else:
-                        logger.info(f"Skipping mobile class {cls} due to size: area ratio {area_ratio:.3f}")
-                else:
-                    logger.info(f"Skipping non-mobile class {cls} with confidence {conf:.3f}")
-        
-        # Log detection results
-        logger.info(f"Detection completed: mobile_detected={mobile_detected}, "
-                   f"detections={len(detections)}, max_confidence={max_confidence:.3f}")
+        return detection_json(detect_frame(frame, get_session_id(), cache_key))
         
+    except Exception as e:
+        logger.error(f"Detection error: {e}")
         return jsonify({
-            'mobile_detected': mobile_detected,
-            'detections': detections,
-            'confidence': max_confidence,
-            'total_detections': len(detections),
+            'error': str(e),
+            'mobile_detected': False,
+            'confidence': 0
+        }), 500
+
+@app.route('/api/detect-mobile/batch', methods=['POST'])
+def detect_mobile_batch():
+    """Detect mobile devices in a list of images sent in one request"""
+    try:
+        # Check if model is loaded
+        if model is None:
+            return jsonify({
+                'error': 'Model not loaded',
+                'results': []
+            }), 500
+        
+        # Get image list from request
+        with detection_metrics.time_stage('json_parse'):
+            data = request.get_json()
+        images = data.get('images') if isinstance(data, dict) else None
+        if not isinstance(images, list) or not images:
+            return jsonify({
+                'error': 'No image data provided',
+                'results': []
+            }), 400
+        
+        if len(images) > MAX_FRAMES_PER_REQUEST:
+            return jsonify({
+                'error': f'Too many images (max {MAX_FRAMES_PER_REQUEST})',
+                'results': []
+            }), 400
+        
+        # Decode every frame not already cached, keeping per-frame errors in place
+        results = [None] * len(images)
+        frames = []
+        frame_indices = []
+        cache_keys = []
+        for i, image_data in enumerate(images):
+            try:
+                image_bytes = decode_base64_bytes(image_data)
+                cache_key = cache_key_for(image_bytes)
+                cached = cached_detections(cache_key)
+                if cached is not None:
+                    results[i] = build_detection_response(*cached)
+                    continue
+                frame = decode_frame_bytes(image_bytes, len(image_bytes))
+            except Exception as e:
+                logger.error(f"Error decoding image {i}: {e}")
+                frame = None
+            
+            if frame is None:
+                results[i] = {
+                    'error': 'Invalid image data',
+                    'mobile_detected': False,
+                    'confidence': 0
+                }
+            else:
+                frames.append(frame)
+                frame_indices.append(i)
+                cache_keys.append(cache_key)
+        
+        # Run YOLO detection on all remaining frames together
+        if frames:
+            batch_detections = detect_full_frames(frames, cache_keys)
+            for i, frame, frame_dets in zip(frame_indices, frames, batch_detections):
+                results[i] = build_detection_response(frame_dets, frame.shape)
+        
+        return detection_json({
+            'results': results,
+            'total_frames': len(images),
+            'mobile_detected': any(r['mobile_detected'] for r in results),
             'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
         })
         
     except Exception as e:
-        logger.error(f"Detection error: {e}")
+        logger.error(f"Batch detection error: {e}")
         return jsonify({
             'error': str(e),
-            'mobile_detected': False,
-            'confidence': 0
+            'results': []
         }), 500
 
+def _stream_worker(ws, slot, session_id):
+    """Run detection on the newest pending frame of a stream and push the result back"""
+    while True:
+        item = slot.take()
+        if item is None:
+            return
+        frame_id, kind, payload = item
+        detection_metrics.STREAM_FRAMES.labels('processed').inc()
+        
+        try:
+            image_bytes = payload if kind == 'bytes' else decode_base64_bytes(payload)
+            cache_key = cache_key_for(image_bytes)
+            cached = cached_detections(cache_key)
+            
+            if cached is not None:
+                body = build_detection_response(*cached)
+                aggregate_detection(session_id, body)
+            else:
+                with admission_slot(session_id):
+                    body = pipeline_detect(image_bytes, len(image_bytes), session_id, cache_key)
+                    if body is None:
+                        frame = decode_frame_bytes(image_bytes, len(image_bytes))
+                        if frame is None:
+                            body = {
+                                'error': 'Invalid image data',
+                                'mobile_detected': False,
+                                'confidence': 0
+                            }
+                        else:
+                            body = detect_frame(frame, session_id, cache_key)
+        except AdmissionRejected as e:
+            body = rejection_body(e)
+        except Exception as e:
+            logger.error(f"Stream detection error: {e}")
+            body = {
+                'error': str(e),
+                'mobile_detected': False,
+                'confidence': 0
+            }
+        
+        body = dict(body, frame_id=frame_id, dropped_frames=slot.dropped)
+        try:
+            ws.send(json.dumps(body))
+        except ConnectionClosed:
+            return
+
+@sock.route('/api/detect-mobile/stream')
+def detect_mobile_stream(ws):
+    """Long-lived detection channel for one interview session.
+
+    The client sends frames as binary JPEG messages, or as text messages
+    holding {"image": <data URL>, "frame_id": <optional>}. Each result is
+    pushed back as JSON with the frame_id it belongs to. If frames arrive
+    faster than inference, only the newest pending frame is processed.
+    """
+    if not model_warm:
+        ws.send(json.dumps({
+            'error': 'Model is still loading' if model is None else 'Model not ready',
+            'mobile_detected': False,
+            'confidence': 0,
+            'startup': startup['state']
+        }))
+        return
+    
+    session_id = get_session_id()
+    slot = LatestFrameSlot()
+    worker = threading.Thread(target=_stream_worker, args=(ws, slot, session_id), daemon=True)
+    worker.start()
+    detection_metrics.STREAM_CONNECTIONS.inc()
+    
+    try:
+        frame_id = 0
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            frame_id += 1
+            
+            if isinstance(message, str):
+                try:
+                    data = json.loads(message)
+                    item = (data.get('frame_id', frame_id), 'base64', data['image'])
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    ws.send(json.dumps({
+                        'error': 'No image data provided',
+                        'mobile_detected': False,
+                        'confidence': 0
+                    }))
+                    continue
+            else:
+                item = (frame_id, 'bytes', message)
+            
+            if slot.put(item):
+                detection_metrics.STREAM_FRAMES.labels('dropped').inc()
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+        worker.join(timeout=10)
+        detection_metrics.STREAM_CONNECTIONS.dec()
+        logger.info("Detection stream closed", extra={
+            'session_id': session_id,
+            'frames_received': slot.received,
+            'frames_dropped': slot.dropped
+        })
+
 @app.route('/api/debug-detection', methods=['POST'])
 def debug_detection():
     """Debug endpoint to show all detected classes"""
@@ -270,24 +1368,23 @@ def debug_detection():
             }), 500
         
         # Get image data from request
-        data = request.get_json()
+        with detection_metrics.time_stage('json_parse'):
+            data = request.get_json()
         if not data or 'image' not in data:
             return jsonify({
                 'error': 'No image data provided',
                 'all_detections': []
             }), 400
         
-        image_data = data['image']
-        
-        # Decode base64 image
+        # Decode base64 image, unless the same frame was seen recently
         try:
-            # Remove data URL prefix if present
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
+            image_bytes = decode_base64_bytes(data['image'])
+            cache_key = cache_key_for(image_bytes)
+            cached = cached_detections(cache_key)
+            if cached is not None:
+                return detection_json(build_debug_response(*cached))
             
-            image_bytes = base64.b64decode(image_data)
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = decode_frame_bytes(image_bytes, len(image_bytes))
             
             if frame is None:
                 return jsonify({
@@ -303,60 +1400,8 @@ def debug_detection():
             }), 400
         
         # Run YOLO detection
-        results = model(frame, verbose=False)
-        all_detections = []
-        
-        # COCO class names for reference
-        coco_classes = {
-            0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 4: 'airplane', 5: 'bus',
-            6: 'train', 7: 'truck', 8: 'boat', 9: 'traffic light', 10: 'fire hydrant',
-            11: 'stop sign', 12: 'parking meter', 13: 'bench', 14: 'bird', 15: 'cat',
-            16: 'dog', 17: 'horse', 18: 'sheep', 19: 'cow', 20: 'elephant',
-            21: 'bear', 22: 'zebra', 23: 'giraffe', 24: 'backpack', 25: 'umbrella',
-            26: 'handbag', 27: 'tie', 28: 'suitcase', 29: 'frisbee', 30: 'skis',
-            31: 'snowboard', 32: 'sports ball', 33: 'kite', 34: 'baseball bat',
-            35: 'baseball glove', 36: 'skateboard', 37: 'surfboard', 38: 'tennis racket',
-            39: 'bottle', 40: 'wine glass', 41: 'cup', 42: 'fork', 43: 'knife',
-            44: 'spoon', 45: 'bowl', 46: 'banana', 47: 'apple', 48: 'sandwich',
-            49: 'orange', 50: 'broccoli', 51: 'carrot', 52: 'hot dog', 53: 'pizza',
-            54: 'donut', 55: 'cake', 56: 'chair', 57: 'couch', 58: 'potted plant',
-            59: 'bed', 60: 'dining table', 61: 'toilet', 62: 'tv', 63: 'laptop',
-            64: 'mouse', 65: 'remote', 66: 'keyboard', 67: 'cell phone', 68: 'microwave',
-            69: 'oven', 70: 'toaster', 71: 'sink', 72: 'refrigerator', 73: 'book',
-            74: 'clock', 75: 'vase', 76: 'scissors', 77: 'teddy bear', 78: 'hair drier',
-            79: 'toothbrush'
-        }
-        
-        for result in results:
-            for box in result.boxes:
-                conf = box.conf[0].item()
-                cls = int(box.cls[0].item())
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                area = (x2 - x1) * (y2 - y1)
-                frame_area = frame.shape[0] * frame.shape[1]
-                area_ratio = area / frame_area
-                
-                class_name = coco_classes.get(cls, f'unknown_class_{cls}')
-                
-                all_detections.append({
-                    'class_id': cls,
-                    'class_name': class_name,
-                    'confidence': conf,
-                    'bbox': [x1, y1, x2, y2],
-                    'area': area,
-                    'area_ratio': area_ratio,
-                    'center': [(x1 + x2) // 2, (y1 + y2) // 2]
-                })
-        
-        # Sort by confidence
-        all_detections.sort(key=lambda x: x['confidence'], reverse=True)
-        
-        return jsonify({
-            'all_detections': all_detections,
-            'total_detections': len(all_detections),
-            'frame_size': [frame.shape[1], frame.shape[0]],  # width, height
-            'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
-        })
+        frame_dets = detect_full_frames([frame], [cache_key])[0]
+        return detection_json(build_debug_response(frame_dets, frame.shape))
         
     except Exception as e:
         logger.error(f"Debug detection error: {e}")
@@ -365,12 +1410,138 @@ def debug_detection():
             'all_detections': []
         }), 500
 
+def video_analysis_options(params):
+    """Sampling and timeline options for /api/analyze-video from form or JSON fields.
+
+    Raises ValueError (or TypeError) for values that are not numbers in range.
+    """
+    def number(name, default, minimum=0.0, allow_zero=False):
+        value = float(params.get(name, default))
+        if not math.isfinite(value) or value < minimum or (value == minimum and not allow_zero):
+            raise ValueError(f"{name} must be {'at least' if allow_zero else 'greater than'} {minimum:g}")
+        return value
+    
+    scene_threshold = params.get('scene_threshold')
+    return {
+        'sample_fps': number('sample_fps', 1.0),
+        'scene_threshold': number('scene_threshold', None, allow_zero=True)
+                           if scene_threshold not in (None, '') else None,
+        'max_gap': number('max_gap', 10.0, allow_zero=True),
+        'interval': number('interval', 10.0),
+        'batch_size': MAX_BATCH_SIZE
+    }
+
+def resolve_video_path(relative_path):
+    """Absolute path of a recording inside VIDEO_DIR, or None if it is outside or missing"""
+    root = os.path.realpath(VIDEO_DIR)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+@app.route('/api/analyze-video', methods=['POST'])
+def analyze_video():
+    """Run mobile detection over a recorded interview and return a per-interval timeline.
+
+    Send the recording as a multipart 'video' upload, or as JSON
+    {"path": ...} relative to DETECTION_VIDEO_DIR. Optional fields:
+    sample_fps, scene_threshold, max_gap and interval (see video_analysis.py).
+    """
+    upload_path = None
+    try:
+        # Check if model is loaded
+        if model is None:
+            return jsonify({'error': 'Model not loaded'}), 500
+        
+        if request.mimetype == 'multipart/form-data':
+            # Raises RequestEntityTooLarge past MAX_CONTENT_LENGTH
+            params = request.form
+            upload = request.files.get('video')
+            if upload is None:
+                return jsonify({'error': 'No video provided'}), 400
+            # OpenCV reads from a path, so spool the upload to disk
+            suffix = os.path.splitext(upload.filename or '')[1] or '.webm'
+            fd, upload_path = tempfile.mkstemp(suffix=suffix, prefix='interview-video-')
+            os.close(fd)
+            upload.save(upload_path)
+            video_path, video_name = upload_path, upload.filename
+        else:
+            params = request.get_json(silent=True) or {}
+            if not params.get('path'):
+                return jsonify({'error': 'No video provided'}), 400
+            if not VIDEO_DIR:
+                return jsonify({'error': 'Server-side paths are disabled (set DETECTION_VIDEO_DIR)'}), 400
+            video_path = resolve_video_path(params['path'])
+            if video_path is None:
+                return jsonify({'error': 'Video not found'}), 404
+            video_name = params['path']
+        
+        try:
+            options = video_analysis_options(params)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid analysis options: {e}'}), 400
+        
+        # One admission slot for the whole recording, so live sessions keep the rest
+        with admission_slot(None):
+            result = video_analysis.analyze_video(video_path, detect_mobile_frames, **options)
+        result['video'] = video_name
+        logger.info("Video analysis completed", extra={
+            'video': video_name,
+            'frames_analyzed': result['frames_analyzed'],
+            'frames_with_device': result['frames_with_device'],
+            'processing_seconds': result['processing_seconds']
+        })
+        return jsonify(result)
+        
+    except AdmissionRejected as e:
+        return rejection_response(e)
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Video too large (max {MAX_VIDEO_BYTES} bytes)'}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Video analysis error: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if upload_path is not None:
+            os.remove(upload_path)
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: the process is up and serving HTTP, even while the model loads.
+
+    Fails only if model startup failed for good, so the worker gets restarted.
+    """
+    body = {
+        'status': 'failed' if startup['state'] == 'failed' else 'alive',
+        'startup': startup['state'],
+        'uptime_seconds': round(time.monotonic() - PROCESS_STARTED, 3)
+    }
+    if startup['state'] == 'failed':
+        body['error'] = startup['error']
+        return jsonify(body), 503
+    return jsonify(body)
+
+@app.route('/api/health/ready', methods=['GET'])
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Readiness: 200 once the model is loaded and warm, 503 until then"""
+    if not model_warm:
+        return jsonify({
+            'status': 'failed' if startup['state'] == 'failed' else 'starting',
+            'startup': startup['state'],
+            'model_loaded': model is not None,
+            'model_warm': False,
+            'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
+        }), 503
+    
     return jsonify({
         'status': 'healthy',
         'model_loaded': model is not None,
+        'model_warm': True,
+        'startup_seconds': startup['seconds'],
+        'recommended_interval_ms': recommended_interval_ms(),
+        'pipeline': pipeline.describe() if pipeline is not None else None,
         'timestamp': int(np.datetime64('now').astype(np.int64) / 1e6)
     })
 
@@ -380,21 +1551,176 @@ def model_info():
     if model is None:
         return jsonify({
             'error': 'Model not loaded',
-            'model_path': 'models/best.pt'
+            'model_path': None,
+            'requested_backend': MODEL_BACKEND
         }), 500
     
     return jsonify({
         'model_loaded': True,
-        'model_path': 'models/best.pt',
+        'model_path': model_source.get('weights_path'),
         'model_type': 'YOLO',
-        'device': str(model.device)
+        'backend': model_source.get('backend'),
+        'requested_backend': MODEL_BACKEND,
+        'precision': model_source.get('precision'),
+        'requested_precision': MODEL_PRECISION,
+        'artifact_path': model_source.get('artifact_path'),
+        'weights_sha256': model_source.get('weights_sha256'),
+        'loaded_at': registry.active.describe()['loaded_at'] if registry.active is not None else None,
+        'rollback_available': registry.previous is not None,
+        'candidate': registry.candidate.path if registry.candidate is not None else None,
+        'model_warm': model_warm,
+        'device': model_backends.model_device(model, model_source)
     })
 
-if __name__ == '__main__':
-    # Load model on startup
-    if load_model():
-        logger.info("Starting mobile detection API server...")
-        app.run(debug=True, host='0.0.0.0', port=5000)
+def resolve_weights_path(path):
+    """Weights file inside MODEL_DIR, given relative to the working directory or to MODEL_DIR"""
+    root = os.path.realpath(MODEL_DIR)
+    for candidate in (path, os.path.join(MODEL_DIR, path)):
+        resolved = os.path.realpath(candidate)
+        if resolved.startswith(root + os.sep) and os.path.isfile(resolved):
+            return os.path.relpath(resolved)
+    return None
+
+def registry_response(state):
+    """202: the change is applied in the background, by every worker"""
+    return jsonify({
+        'accepted': True,
+        'desired': state,
+        'models': registry.describe()
+    }), 202
+
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    """Active, previous and candidate models, loading state and shadow comparison"""
+    return jsonify(registry.describe())
+
+@app.route('/api/models/load', methods=['POST'])
+def load_model_weights():
+    """Load weights in the background and swap them in, or shadow them as a candidate.
+
+    JSON body: {"path": "models/new.pt"} to activate, or
+    {"path": ..., "candidate": true, "shadow_rate": 0.05} to shadow a share of batches.
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get('path'):
+        return jsonify({'error': 'No weights path provided'}), 400
+    path = resolve_weights_path(str(data['path']))
+    if path is None:
+        return jsonify({'error': f'Weights not found in {MODEL_DIR}'}), 404
+    
+    if data.get('candidate'):
+        try:
+            shadow_rate = float(data.get('shadow_rate', 0.05))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid shadow_rate'}), 400
+        state = registry.request_candidate(path, shadow_rate)
     else:
-        logger.error("Failed to load model. Server not started.")
-        exit(1) 
\ No newline at end of file
+        state = registry.request_load(path)
+    logger.info(f"Model {'candidate' if data.get('candidate') else 'load'} requested: {path}")
+    return registry_response(state)
+
+@app.route('/api/models/promote', methods=['POST'])
+def promote_model():
+    """Make the shadow candidate the active model"""
+    try:
+        return registry_response(registry.request_promote())
+    except RegistryError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/models/rollback', methods=['POST'])
+def rollback_model():
+    """Swap back to the previously active model (still loaded, so instant)"""
+    try:
+        return registry_response(registry.request_rollback())
+    except RegistryError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/models/candidate', methods=['DELETE'])
+def clear_candidate_model():
+    """Stop shadow traffic and unload the candidate"""
+    return registry_response(registry.request_clear_candidate())
+
+def require_session_aggregation():
+    if session_aggregator is None:
+        return jsonify({'error': 'Session aggregation is disabled (DETECTION_SESSION_SINK)'}), 404
+    return None
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def session_timeline(session_id):
+    """Detection timeline of a session: merged windows and cooldown-gated alerts"""
+    disabled = require_session_aggregation()
+    if disabled:
+        return disabled
+    timeline = session_aggregator.timeline(session_id)
+    live = session_aggregator.snapshot(session_id)
+    if timeline is None and live is None:
+        return jsonify({'error': 'Unknown session'}), 404
+    return jsonify({'session_id': session_id, 'timeline': timeline, 'live': live})
+
+@app.route('/api/sessions/<session_id>/events', methods=['POST'])
+def record_session_events(session_id):
+    """Record client-side signals (tab switches, typing, multiple faces...) for a session.
+
+    JSON body: {"events": [{"type": "tab_switch", "timestamp": 1700000000000, "confidence": 1.0}]}
+    Timestamps are epoch milliseconds; missing or implausible ones use the server clock.
+    """
+    disabled = require_session_aggregation()
+    if disabled:
+        return disabled
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'No events provided'}), 400
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_EVENTS_PER_REQUEST} events per request'}), 413
+    
+    received = int(time.time() * 1000)
+    recorded = 0
+    for event in events:
+        if not isinstance(event, dict) or not event.get('type'):
+            continue
+        try:
+            timestamp = int(event.get('timestamp') or received)
+            confidence = float(event.get('confidence', 1.0))
+        except (TypeError, ValueError):
+            continue
+        # Client clocks drift; an hour off is a wrong clock, not a late event
+        if abs(timestamp - received) > 3600 * 1000:
+            timestamp = received
+        session_aggregator.observe(session_id, str(event['type'])[:64], event.get('detected', True),
+                                   confidence, timestamp)
+        recorded += 1
+    return jsonify({'recorded': recorded})
+
+@app.route('/api/sessions/<session_id>/end', methods=['POST'])
+def end_session(session_id):
+    """End a session on every worker and return its final timeline.
+
+    complete is False when some worker did not flush its part of the session
+    within DETECTION_SESSION_END_WAIT seconds (or the sink can't tell).
+    """
+    disabled = require_session_aggregation()
+    if disabled:
+        return disabled
+    update = session_aggregator.end(session_id)
+    complete = session_aggregator.wait_until_released(session_id, SESSION_END_WAIT_SECONDS)
+    timeline = session_aggregator.timeline(session_id)
+    return jsonify({'session_id': session_id, 'timeline': timeline, 'complete': complete,
+                    'final_update': update})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    if batcher is not None:
+        detection_metrics.QUEUE_DEPTH.set(batcher.queue_depth)
+    if session_aggregator is not None:
+        detection_metrics.SESSIONS_TRACKED.set(len(session_aggregator))
+    body, content_type = detection_metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+if __name__ == '__main__':
+    # Development server only; use serve_detection.py for multi-worker serving.
+    # The model loads in the background; /api/health/ready flips once it is warm
+    start_warm_up()
+    logger.info("Starting mobile detection API server...")
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000) 
\ No newline at end of file
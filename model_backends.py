@@ -0,0 +1,281 @@
+"""
+Inference backend selection for the YOLO mobile detector.
+
+The PyTorch weights (e.g. models/best.pt) are exported once to a faster CPU
+runtime and cached under a directory keyed by the SHA-256 of the weights, so a
+restart reuses the artifact and a new best.pt gets a fresh export. Exported
+artifacts are loaded back through ultralytics' YOLO class, so callers keep the
+same ``model(frames, verbose=False)`` interface whichever backend is active.
+
+Backends (DETECTION_BACKEND):
+    auto        - first of openvino, onnx, pytorch whose runtime is installed
+    openvino    - OpenVINO IR (needs the openvino package)
+    onnx        - ONNX Runtime (needs onnx and onnxruntime)
+    torchscript - TorchScript module run by torch
+    pytorch     - the original .pt weights in eager mode
+
+Precision (DETECTION_PRECISION):
+    fp32        - full precision (default)
+    fp16        - half-precision weights, OpenVINO export only
+    int8        - INT8 ONNX model quantized with ONNX Runtime: statically
+                  calibrated on DETECTION_CALIBRATION_DIR images when given,
+                  dynamically quantized otherwise
+
+A precision a backend can't produce falls back to that backend's fp32 model.
+Use compare_models.py to check accuracy and speed before switching.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# Export format name and the Python modules its runtime needs
+EXPORT_FORMATS = {
+    'openvino': ('openvino', ['openvino']),
+    'onnx': ('onnx', ['onnx', 'onnxruntime']),
+    'torchscript': ('torchscript', []),
+}
+
+# Order tried by 'auto', fastest CPU runtime first
+AUTO_BACKEND_ORDER = ['openvino', 'onnx', 'pytorch']
+
+DEFAULT_CACHE_DIR = os.path.join('models', '.cache')
+
+# Backends that can produce each reduced precision
+PRECISION_BACKENDS = {
+    'fp16': ('openvino',),
+    'int8': ('onnx',),
+}
+PRECISIONS = ('fp32',) + tuple(PRECISION_BACKENDS)
+
+# Calibration images used for static INT8 quantization
+MAX_CALIBRATION_IMAGES = 200
+
+
+def weights_sha256(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 of a weights file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backend_available(backend):
+    """Check whether the runtime for a backend is importable"""
+    if backend == 'pytorch':
+        return True
+    if backend not in EXPORT_FORMATS:
+        return False
+    _, modules = EXPORT_FORMATS[backend]
+    return all(importlib.util.find_spec(name) is not None for name in modules)
+
+
+def resolve_backends(requested):
+    """Expand a DETECTION_BACKEND value into the ordered list of backends to try"""
+    requested = (requested or 'auto').lower()
+    if requested == 'auto':
+        candidates = AUTO_BACKEND_ORDER
+    else:
+        if requested != 'pytorch' and requested not in EXPORT_FORMATS:
+            logger.warning(f"Unknown model backend '{requested}', using auto selection")
+            return resolve_backends('auto')
+        candidates = [requested, 'pytorch']
+    return [b for b in candidates if backend_available(b)]
+
+
+def resolve_variants(requested, precision='fp32'):
+    """(backend, precision) pairs to try in order; full precision is the fallback"""
+    precision = (precision or 'fp32').lower()
+    if precision not in PRECISIONS:
+        logger.warning(f"Unknown model precision '{precision}', using fp32")
+        precision = 'fp32'
+
+    backends = resolve_backends(requested)
+    variants = []
+    if precision != 'fp32':
+        reduced = [b for b in backends if b in PRECISION_BACKENDS[precision]]
+        if not reduced:
+            logger.warning(f"No available backend among {backends} produces {precision} "
+                           f"(needs {', '.join(PRECISION_BACKENDS[precision])}); using fp32")
+        variants.extend((b, precision) for b in reduced)
+    variants.extend((b, 'fp32') for b in backends)
+    return variants
+
+
+def cached_artifact_path(weights_path, backend, digest, imgsz, cache_dir=DEFAULT_CACHE_DIR,
+                         precision='fp32', variant=None):
+    """Where the exported artifact for these weights/backend/size lives in the cache"""
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    key = f"{stem}-{digest[:16]}-{imgsz}"
+    if precision != 'fp32':
+        key += f"-{variant or precision}"
+    if backend == 'openvino':
+        name = f"{stem}_openvino_model"
+    elif backend == 'onnx':
+        name = f"{stem}.onnx"
+    else:
+        name = f"{stem}.torchscript"
+    return os.path.join(cache_dir, key, name)
+
+
+def calibration_images(calibration_dir, limit=MAX_CALIBRATION_IMAGES):
+    """Sorted image paths used to calibrate static INT8 quantization"""
+    if not calibration_dir:
+        return []
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(calibration_dir)
+        for name in names
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))
+    )
+    return paths[:limit]
+
+
+class _CalibrationReader:
+    """Feeds letterboxed calibration frames to ONNX Runtime's static quantizer"""
+
+    def __init__(self, input_name, paths, imgsz):
+        self.input_name = input_name
+        self.paths = iter(paths)
+        self.imgsz = imgsz
+
+    def _tensor(self, path):
+        import cv2
+        import numpy as np
+        from frame_preprocessing import LETTERBOX_COLOR
+
+        frame = cv2.imread(path)
+        if frame is None:
+            return None
+        # Letterbox the way ultralytics does: fit the longest side, pad to a centred square
+        height, width = frame.shape[:2]
+        scale = self.imgsz / max(height, width)
+        new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+        resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        top, left = (self.imgsz - new_height) // 2, (self.imgsz - new_width) // 2
+        padded = cv2.copyMakeBorder(resized, top, self.imgsz - new_height - top,
+                                    left, self.imgsz - new_width - left,
+                                    cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+        # Same input layout ultralytics feeds the exported model: RGB, CHW, 0-1
+        rgb = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+        return np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255
+
+    def get_next(self):
+        for path in self.paths:
+            tensor = self._tensor(path)
+            if tensor is not None:
+                return {self.input_name: tensor}
+        return None
+
+
+def quantize_onnx(source, target, imgsz, calibration_dir=None):
+    """Write an INT8 copy of an ONNX model; static if calibration images exist, else dynamic"""
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    images = calibration_images(calibration_dir)
+    if images:
+        input_name = onnx.load(source, load_external_data=False).graph.input[0].name
+        logger.info(f"Quantizing {source} to static INT8 with {len(images)} calibration images...")
+        quantize_static(source, target, _CalibrationReader(input_name, images, imgsz),
+                        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8, per_channel=True)
+    else:
+        logger.info(f"Quantizing {source} to dynamic INT8...")
+        # Unsigned weights: ONNX Runtime's CPU ConvInteger kernel only takes uint8
+        quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+
+    # Keep ultralytics' metadata (class names, stride, imgsz) on the quantized model
+    original, quantized = onnx.load(source), onnx.load(target)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, target)
+
+
+def export_artifact(weights_path, backend, digest, imgsz, cache_dir=DEFAULT_CACHE_DIR,
+                    precision='fp32', calibration_dir=None):
+    """Export the weights for a backend unless a cached artifact already exists"""
+    variant = precision
+    if precision == 'int8':
+        variant = 'int8-static' if calibration_images(calibration_dir) else 'int8-dynamic'
+    target = cached_artifact_path(weights_path, backend, digest, imgsz, cache_dir, precision, variant)
+    if os.path.exists(target):
+        logger.info(f"Using cached {backend} {variant} export: {target}")
+        return target
+
+    if precision == 'int8':
+        # Quantize the cached full-precision export
+        source = export_artifact(weights_path, backend, digest, imgsz, cache_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = target + '.partial'
+        quantize_onnx(source, partial, imgsz, calibration_dir)
+        os.replace(partial, target)
+        logger.info(f"✅ Cached {backend} {variant} export at {target}")
+        return target
+
+    export_format, _ = EXPORT_FORMATS[backend]
+    logger.info(f"Exporting {weights_path} to {backend} {precision} (imgsz={imgsz})...")
+    # Dynamic axes keep batched inference working for the runtimes that support it
+    dynamic = backend in ('onnx', 'openvino')
+    from ultralytics import YOLO
+    exported = YOLO(weights_path).export(format=export_format, imgsz=imgsz, dynamic=dynamic,
+                                         half=precision == 'fp16')
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(str(exported), target)
+    logger.info(f"✅ Cached {backend} export at {target}")
+    return target
+
+
+def load_detector(weights_path, backend='auto', imgsz=640, cache_dir=DEFAULT_CACHE_DIR,
+                  precision='fp32', calibration_dir=None):
+    """Load a detector for the weights on the fastest available backend and precision.
+
+    Returns (model, info) where info describes what was actually loaded.
+    Falls back to full precision, and finally to eager PyTorch, if every
+    export/load attempt fails.
+    """
+    # Imported here so that importing this module (and the API) stays cheap
+    from ultralytics import YOLO
+
+    digest = weights_sha256(weights_path)
+    for candidate, candidate_precision in resolve_variants(backend, precision):
+        try:
+            if candidate == 'pytorch':
+                loaded = YOLO(weights_path)
+                artifact = weights_path
+            else:
+                artifact = export_artifact(weights_path, candidate, digest, imgsz, cache_dir,
+                                           candidate_precision, calibration_dir)
+                loaded = YOLO(artifact, task='detect')
+        except Exception as e:
+            logger.warning(f"Could not load {weights_path} with {candidate} {candidate_precision}: {e}")
+            continue
+
+        info = {
+            'backend': candidate,
+            'precision': candidate_precision,
+            'weights_path': weights_path,
+            'artifact_path': artifact,
+            'weights_sha256': digest,
+            'imgsz': imgsz,
+        }
+        logger.info(f"✅ Detector ready: {candidate} backend, {candidate_precision} ({artifact})")
+        return loaded, info
+
+    raise RuntimeError(f"No backend could load {weights_path}")
+
+
+def model_device(loaded, info):
+    """Device string for a loaded detector; exported CPU runtimes report 'cpu'"""
+    if info.get('backend') != 'pytorch':
+        return 'cpu'
+    try:
+        return str(loaded.device)
+    except Exception:
+        return 'unknown'
@@ -0,0 +1,425 @@
+"""
+Hot-swappable detection models.
+
+Each worker holds up to three loaded models:
+
+- active     serves every request;
+- previous   the model that was active before the last swap, kept loaded so
+             a rollback is instant;
+- candidate  optional; a sampled share of batches is also run through it off
+             the request path to compare its latency and detections with the
+             active model before it is promoted.
+
+New weights are loaded and warmed on the registry's background thread and
+then swapped in with a single reference assignment. A batch that is already
+running keeps the model it started with, so swaps never interrupt requests.
+
+poll() picks up two kinds of change:
+
+- the active weights file changing on disk (models/best.pt replaced), once
+  its size and mtime have been stable for one poll interval;
+- the shared state file written by the admin calls (request_*). Every
+  gunicorn worker polls it, so an admin call that reaches one worker
+  reconfigures all of them within a poll interval.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from model_backends import weights_sha256
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryError(Exception):
+    """Raised when an admin request can't apply to the current models"""
+
+
+class ModelVersion:
+    """A loaded, warmed detector and the weights it came from"""
+
+    def __init__(self, model, source, signature=None):
+        self.model = model
+        self.source = source
+        self.signature = signature  # file_signature() of the weights when they were read
+        self.loaded_at = time.time()
+
+    @property
+    def path(self):
+        return self.source.get('weights_path')
+
+    @property
+    def sha256(self):
+        return self.source.get('weights_sha256')
+
+    def ref(self):
+        """Reference stored in the shared state file"""
+        return {'path': self.path, 'sha256': self.sha256}
+
+    def describe(self):
+        return {
+            'weights_path': self.path,
+            'weights_sha256': self.sha256,
+            'backend': self.source.get('backend'),
+            'precision': self.source.get('precision'),
+            'artifact_path': self.source.get('artifact_path'),
+            'loaded_at': int(self.loaded_at * 1000),
+        }
+
+
+def read_state(path):
+    """Desired registry state from the shared state file ({} if missing or unreadable)"""
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable model state file {path}: {e}")
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def write_state(path, state):
+    """Atomically replace the shared state file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def file_signature(path):
+    """(size, mtime_ns) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class ModelRegistry:
+    """Active / previous / candidate detectors with background reloads and shadow traffic.
+
+    loader(path) returns a warmed (model, source) pair, where source is the
+    info dict from model_backends.load_detector(). on_activate(version,
+    reason) is called after every swap. infer(model, frames) and
+    compare(active_results, candidate_results) -> [bool per frame] run the
+    shadow comparison.
+    """
+
+    def __init__(self, loader, on_activate=None, infer=None, compare=None, state_path=None,
+                 poll_interval=5.0, watch_files=True, keep_previous=True, max_shadow_pending=2):
+        self.loader = loader
+        self.on_activate = on_activate
+        self.infer = infer
+        self.compare = compare
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.watch_files = watch_files
+        self.keep_previous = keep_previous
+        self.active = None
+        self.previous = None
+        self.candidate = None
+        self.shadow_rate = 0.0
+        self.status = {'state': 'idle', 'path': None, 'error': None, 'seconds': None}
+        self.shadow_stats = self._empty_shadow_stats()
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pending_state = None
+        self._state_signature = None
+        self._watched = None       # (path, signature) of the active weights file
+        self._changed_signature = None
+        self._shadow_queue = queue.Queue(maxsize=max(1, max_shadow_pending))
+        self._shadow_thread = None
+
+    @staticmethod
+    def _empty_shadow_stats():
+        return {'batches': 0, 'frames': 0, 'agreed': 0, 'dropped': 0, 'errors': 0,
+                'active_seconds': 0.0, 'candidate_seconds': 0.0}
+
+    # -- swapping -------------------------------------------------------------
+
+    def install(self, model, source):
+        """Register the model loaded at startup as the active one"""
+        with self._lock:
+            self.active = ModelVersion(model, source, file_signature(source.get('weights_path')))
+            self._watched = (self.active.path, self.active.signature)
+        return self.active
+
+    def _activate(self, version, reason):
+        with self._lock:
+            old = self.active
+            self.active = version
+            if version is self.candidate:
+                self.candidate = None
+                self.shadow_stats = self._empty_shadow_stats()
+            self.previous = old if self.keep_previous and old is not version else None
+            self._watched = (version.path, version.signature)
+            self._changed_signature = None
+        if self.on_activate is not None:
+            self.on_activate(version, reason)
+        logger.info(f"✅ Model swapped ({reason}): {version.path} sha256={(version.sha256 or '')[:12]}")
+
+    def _load(self, path, expected_sha=None):
+        """Load and warm weights on the calling (background) thread; None if the file changed"""
+        signature = file_signature(path)
+        if signature is None:
+            logger.warning(f"⚠️ {path} not found; not loading it")
+            return None
+        if expected_sha is not None and weights_sha256(path) != expected_sha:
+            logger.warning(f"⚠️ {path} no longer holds weights {expected_sha[:12]}; not loading it")
+            return None
+        start = time.perf_counter()
+        self.status = {'state': 'loading', 'path': path, 'error': None, 'seconds': None}
+        try:
+            model, source = self.loader(path)
+        except Exception as e:
+            self.status = {'state': 'failed', 'path': path, 'error': str(e), 'seconds': None}
+            logger.error(f"❌ Failed to load {path}: {e}")
+            return None
+        self.status = {'state': 'idle', 'path': path, 'error': None,
+                       'seconds': round(time.perf_counter() - start, 3)}
+        return ModelVersion(model, source, signature)
+
+    # -- reconciling with the desired state -----------------------------------
+
+    def poll(self):
+        """Apply admin requests and weight file changes; runs on the background thread"""
+        if self.state_path:
+            signature = file_signature(self.state_path)
+            with self._lock:
+                if signature != self._state_signature:
+                    self._state_signature = signature
+                    if signature is not None:
+                        self._pending_state = read_state(self.state_path)
+        with self._lock:
+            state, self._pending_state = self._pending_state, None
+        if state:
+            self._reconcile(state)
+        if self.watch_files:
+            self._check_weights_file()
+
+    def _reconcile(self, state):
+        desired = state.get('active')
+        if desired and self.active is not None and desired.get('sha256') != self.active.sha256:
+            if self.candidate is not None and self.candidate.sha256 == desired.get('sha256'):
+                self._activate(self.candidate, 'promote')
+            elif self.previous is not None and self.previous.sha256 == desired.get('sha256'):
+                self._activate(self.previous, 'rollback')
+            else:
+                version = self._load(desired['path'], desired.get('sha256'))
+                if version is not None:
+                    self._activate(version, 'load')
+
+        desired = state.get('candidate')
+        if not desired:
+            if self.candidate is not None:
+                logger.info(f"Shadow candidate {self.candidate.path} removed")
+            with self._lock:
+                self.candidate = None
+                self.shadow_stats = self._empty_shadow_stats()
+        elif self.candidate is None or self.candidate.sha256 != desired.get('sha256'):
+            version = self._load(desired['path'], desired.get('sha256'))
+            if version is not None:
+                with self._lock:
+                    self.candidate = version
+                    self.shadow_stats = self._empty_shadow_stats()
+                logger.info(f"✅ Shadow candidate ready: {version.path}")
+        self.shadow_rate = float(state.get('shadow_rate') or 0.0) if self.candidate is not None else 0.0
+
+    def _check_weights_file(self):
+        if self.active is None or self._watched is None:
+            return
+        path, known = self._watched
+        signature = file_signature(path)
+        if signature is None or signature == known:
+            self._changed_signature = None
+            return
+        if signature != self._changed_signature:
+            # Wait one more poll so a file that is still being copied isn't loaded
+            self._changed_signature = signature
+            return
+
+        self._changed_signature = None
+        if weights_sha256(path) == self.active.sha256:
+            self._watched = (path, signature)
+            return
+        logger.info(f"Weights file {path} changed, reloading")
+        version = self._load(path)
+        if version is None:
+            # Don't retry the same broken file every poll
+            self._watched = (path, signature)
+            return
+        self._activate(version, 'file_changed')
+        self._publish(self.desired_state())
+
+    # -- admin requests -------------------------------------------------------
+
+    def desired_state(self):
+        """State describing the models this worker currently runs"""
+        with self._lock:
+            return {
+                'active': self.active.ref() if self.active is not None else None,
+                'candidate': self.candidate.ref() if self.candidate is not None else None,
+                'shadow_rate': self.shadow_rate,
+            }
+
+    def _publish(self, state):
+        state = dict(state, updated_at=int(time.time() * 1000))
+        if self.state_path:
+            write_state(self.state_path, state)
+            self._state_signature = file_signature(self.state_path)
+        return state
+
+    def _submit(self, state):
+        with self._lock:
+            state = self._publish(state)
+            self._pending_state = state
+        self._wake.set()
+        return state
+
+    def request_load(self, path):
+        """Load weights and make them active"""
+        state = self.desired_state()
+        state['active'] = {'path': path, 'sha256': weights_sha256(path)}
+        return self._submit(state)
+
+    def request_candidate(self, path, shadow_rate):
+        """Load weights as the shadow candidate and send it shadow_rate of the batches"""
+        state = self.desired_state()
+        state['candidate'] = {'path': path, 'sha256': weights_sha256(path)}
+        state['shadow_rate'] = min(max(float(shadow_rate), 0.0), 1.0)
+        return self._submit(state)
+
+    def request_clear_candidate(self):
+        state = self.desired_state()
+        state['candidate'] = None
+        state['shadow_rate'] = 0.0
+        return self._submit(state)
+
+    def request_promote(self):
+        """Make the shadow candidate the active model"""
+        state = self.desired_state()
+        if state['candidate'] is None:
+            raise RegistryError("No candidate model to promote")
+        state['active'], state['candidate'], state['shadow_rate'] = state['candidate'], None, 0.0
+        return self._submit(state)
+
+    def request_rollback(self):
+        """Swap back to the previously active model"""
+        with self._lock:
+            if self.previous is None:
+                raise RegistryError("No previous model to roll back to")
+            state = self.desired_state()
+            state['active'] = self.previous.ref()
+        return self._submit(state)
+
+    def desired_active_path(self):
+        """Weights the shared state says should be active, so new workers start on them"""
+        desired = read_state(self.state_path).get('active') or {}
+        path = desired.get('path')
+        return path if path and os.path.exists(path) else None
+
+    # -- background thread ----------------------------------------------------
+
+    def start(self):
+        """Start polling for admin requests and weight file changes"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='model-registry', daemon=True)
+        self._thread.start()
+        logger.info(f"Model registry watching {self.state_path or 'admin requests'} "
+                    f"every {self.poll_interval}s")
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Model registry poll failed: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    # -- shadow traffic -------------------------------------------------------
+
+    def shadow(self, frames, active_results, active_seconds):
+        """Queue a sample of an active batch for the candidate; never blocks the caller"""
+        candidate = self.candidate
+        if candidate is None or self.shadow_rate <= 0 or random.random() >= self.shadow_rate:
+            return False
+        if self._shadow_thread is None:
+            with self._lock:
+                if self._shadow_thread is None:
+                    self._shadow_thread = threading.Thread(target=self._run_shadow, name='model-shadow',
+                                                           daemon=True)
+                    self._shadow_thread.start()
+        # The caller may reuse the frames' memory (the pipeline's shared-memory
+        # ring does) once this returns; the shadow thread gets its own copies
+        frames = [frame.copy() for frame in frames]
+        try:
+            self._shadow_queue.put_nowait((candidate, frames, active_results, active_seconds))
+        except queue.Full:
+            # Shadow inference is falling behind; skip rather than compete with live traffic
+            with self._lock:
+                self.shadow_stats['dropped'] += 1
+            return False
+        return True
+
+    def _run_shadow(self):
+        while True:
+            candidate, frames, active_results, active_seconds = self._shadow_queue.get()
+            start = time.perf_counter()
+            try:
+                results = self.infer(candidate.model, frames)
+                agreed = self.compare(active_results, results)
+            except Exception as e:
+                logger.error(f"Shadow inference on {candidate.path} failed: {e}")
+                with self._lock:
+                    if candidate is self.candidate:
+                        self.shadow_stats['errors'] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if candidate is not self.candidate:
+                    continue
+                stats = self.shadow_stats
+                stats['batches'] += 1
+                stats['frames'] += len(frames)
+                stats['agreed'] += sum(agreed)
+                stats['active_seconds'] += active_seconds
+                stats['candidate_seconds'] += elapsed
+
+    def describe(self):
+        """Registry summary for /api/models"""
+        with self._lock:
+            stats = dict(self.shadow_stats)
+            active, previous, candidate = self.active, self.previous, self.candidate
+        shadow = {
+            'rate': self.shadow_rate,
+            'batches': stats['batches'],
+            'frames': stats['frames'],
+            'dropped_batches': stats['dropped'],
+            'errors': stats['errors'],
+        }
+        if stats['batches']:
+            shadow['agreement_rate'] = round(stats['agreed'] / stats['frames'], 4)
+            shadow['active_ms_per_batch'] = round(stats['active_seconds'] / stats['batches'] * 1000, 2)
+            shadow['candidate_ms_per_batch'] = round(stats['candidate_seconds'] / stats['batches'] * 1000, 2)
+        return {
+            'active': active.describe() if active is not None else None,
+            'previous': previous.describe() if previous is not None else None,
+            'candidate': candidate.describe() if candidate is not None else None,
+            'shadow': shadow,
+            'loading': dict(self.status),
+            'watching': self._thread is not None and self._thread.is_alive(),
+        }
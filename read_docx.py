@@ -1,20 +1,293 @@
-import docx
+#!/usr/bin/env python3
+"""
+Streaming text extraction from .docx CVs.
+
+A .docx file is a zip archive; its text lives in word/document.xml (plus
+word/header*.xml and word/footer*.xml). Instead of building the full
+python-docx object model, the XML is streamed out of the zip with an
+incremental parser and each element is discarded as soon as its text has
+been read, so memory stays flat regardless of document size.
+
+iter_docx_blocks() yields TextBlock(kind, text) in reading order:
+
+- 'header' / 'footer'  paragraphs of the page headers and footers;
+- 'paragraph'          body paragraphs;
+- 'cell'               table cells (the cell's paragraphs joined by newlines);
+- 'textbox'            text boxes and shapes, yielded before their anchor paragraph.
+
+Bulk extraction of a directory or a .zip archive of CVs runs on a process pool:
+
+    python read_docx.py cvs/ --workers 8 --output cvs.jsonl
+    python read_docx.py uploads.zip --blocks
+"""
+
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree.ElementTree import ParseError, iterparse
+
+logger = logging.getLogger(__name__)
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_P, _T, _TAB, _BR, _CR = W + 'p', W + 't', W + 'tab', W + 'br', W + 'cr'
+_TC, _TXBX = W + 'tc', W + 'txbxContent'
+# Word writes each text box twice: the DrawingML version in mc:Choice and a
+# VML copy in mc:Fallback for older readers. Only the first one is read.
+_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+DOCUMENT_PART = 'word/document.xml'
+HEADER_PART = re.compile(r'word/header\d*\.xml$')
+FOOTER_PART = re.compile(r'word/footer\d*\.xml$')
+
+# Bump when extraction output changes, so cached CV text is re-extracted
+PARSER_VERSION = 'docx-stream-2'
+
+TextBlock = namedtuple('TextBlock', ['kind', 'text'])
+
+
+class DocxError(ValueError):
+    """Raised when a file is not a readable .docx document"""
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == _T:
+            if node.text:
+                parts.append(node.text)
+        elif node.tag == _TAB:
+            parts.append('\t')
+        elif node.tag in (_BR, _CR):
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def iter_part_blocks(stream, kind='paragraph'):
+    """Yield TextBlocks from one WordprocessingML part (a binary file object)"""
+    containers = []  # open table cells / text boxes: [kind, [paragraph texts]]
+    open_elements = []
+    fallback_depth = 0
+    for event, elem in iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            open_elements.append(elem)
+            if tag == _FALLBACK:
+                fallback_depth += 1
+            elif fallback_depth:
+                continue
+            elif tag == _TC:
+                containers.append(['cell', []])
+            elif tag == _TXBX:
+                containers.append(['textbox', []])
+            continue
+
+        open_elements.pop()
+        if tag == _FALLBACK:
+            fallback_depth -= 1
+            # Drop the duplicate so the anchor paragraph's text doesn't pick it up
+            elem.clear()
+            continue
+        if fallback_depth:
+            continue
+        if tag == _P:
+            text = _paragraph_text(elem)
+            # Clearing drops the paragraph's runs, and with them any text box
+            # content already yielded, so an outer paragraph never repeats it
+            elem.clear()
+            if containers:
+                containers[-1][1].append(text)
+            elif text.strip():
+                yield TextBlock(kind, text)
+        elif tag == _TC or tag == _TXBX:
+            container_kind, texts = containers.pop()
+            text = '\n'.join(t for t in texts if t.strip())
+            if containers:
+                # Nested table or a text box inside a cell
+                containers[-1][1].append(text)
+            elif text:
+                yield TextBlock(container_kind, text)
+            elem.clear()
+        else:
+            continue
+
+        if not containers and open_elements:
+            # Everything the parent holds has been yielded; release it
+            open_elements[-1].clear()
+
+
+def _open_zip(source):
+    try:
+        return zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise DocxError(f"Not a .docx file: {e}") from e
+
+
+def iter_docx_blocks(source, headers=True):
+    """Yield the TextBlocks of a .docx given as a path, bytes or binary file object"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with _open_zip(source) as archive:
+        names = archive.namelist()
+        if DOCUMENT_PART not in names:
+            raise DocxError(f"Missing {DOCUMENT_PART}")
+        header_parts = sorted(n for n in names if HEADER_PART.match(n)) if headers else []
+        footer_parts = sorted(n for n in names if FOOTER_PART.match(n)) if headers else []
+        parts = [(n, 'header') for n in header_parts] + [(DOCUMENT_PART, 'paragraph')] + \
+            [(n, 'footer') for n in footer_parts]
+
+        seen = set()
+        for name, kind in parts:
+            try:
+                with archive.open(name) as stream:
+                    for block in iter_part_blocks(stream, kind):
+                        if kind != 'paragraph':
+                            # The same header is usually repeated per section
+                            if block.text in seen:
+                                continue
+                            seen.add(block.text)
+                        yield block
+            except (ParseError, zipfile.BadZipFile, EOFError) as e:
+                raise DocxError(f"Corrupt {name}: {e}") from e
+
 
 def read_docx(file_path):
+    """Non-empty text blocks of a .docx, in reading order; raises DocxError"""
+    return [block.text for block in iter_docx_blocks(file_path)]
+
+
+def extract_text(source):
+    """Whole text of a .docx as one string, one block per line"""
+    return '\n'.join(block.text for block in iter_docx_blocks(source))
+
+
+def find_documents(inputs):
+    """Expand files, directories and .zip archives into a list of sources.
+
+    A source is a file path, or an (archive path, member name) pair for a
+    .docx stored inside a .zip archive.
+    """
+    sources = []
+    for item in inputs:
+        if os.path.isdir(item):
+            sources.extend(sorted(glob.glob(os.path.join(item, '**', '*.docx'), recursive=True)))
+        elif item.lower().endswith('.zip'):
+            with zipfile.ZipFile(item) as archive:
+                sources.extend((item, name) for name in archive.namelist()
+                               if name.lower().endswith('.docx') and not name.endswith('/'))
+        else:
+            sources.append(item)
+    # Word's lock files (~$name.docx) are not documents
+    return [s for s in sources
+            if not os.path.basename(s[1] if isinstance(s, tuple) else s).startswith('~$')]
+
+
+def source_name(source):
+    return f"{source[0]}!{source[1]}" if isinstance(source, tuple) else source
+
+
+def extract_document(source, blocks=False, archives=None):
+    """Extract one source for bulk processing; never raises, errors go in the result.
+
+    archives optionally maps archive paths to already open ZipFiles, so a
+    batch of members doesn't re-read the archive's directory every time.
+    """
+    start = time.perf_counter()
+    result = {'source': source_name(source)}
+    try:
+        if isinstance(source, tuple):
+            archive_path, member = source
+            if archives is None:
+                with zipfile.ZipFile(archive_path) as archive:
+                    source = io.BytesIO(archive.read(member))
+            else:
+                if archive_path not in archives:
+                    archives[archive_path] = zipfile.ZipFile(archive_path)
+                source = io.BytesIO(archives[archive_path].read(member))
+        items = list(iter_docx_blocks(source))
+        result['text'] = '\n'.join(block.text for block in items)
+        result['chars'] = len(result['text'])
+        if blocks:
+            result['blocks'] = [block._asdict() for block in items]
+    except (DocxError, OSError, KeyError, zipfile.BadZipFile) as e:
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _extract_chunk(sources, blocks):
+    archives = {}
     try:
-        doc = docx.Document(file_path)
-        content = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                content.append(paragraph.text)
-        return content
-    except Exception as e:
-        print(f"Error reading document: {e}")
-        return []
-
-if __name__ == "__main__":
-    file_path = "ITCS-GP24-07[1].docx"
-    content = read_docx(file_path)
-    for i, text in enumerate(content):
-        print(f"Paragraph {i+1}: {text}")
-        print("-" * 50) 
\ No newline at end of file
+        return [extract_document(source, blocks, archives) for source in sources]
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+
+def extract_many(sources, workers=None, blocks=False, chunk_size=32):
+    """Extract many documents on a process pool; yields results in input order.
+
+    Documents are sent to workers in chunks so that per-task overhead stays
+    small next to the few milliseconds each CV takes.
+    """
+    sources = list(sources)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources) or 1))
+    if workers == 1:
+        for start in range(0, len(sources), chunk_size):
+            yield from _extract_chunk(sources[start:start + chunk_size], blocks)
+        return
+
+    chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+    with ProcessPoolExecutor(workers) as pool:
+        for results in pool.map(_extract_chunk, chunks, [blocks] * len(chunks)):
+            yield from results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract text from .docx CVs")
+    parser.add_argument('inputs', nargs='+', help=".docx files, directories or .zip archives of CVs")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=32, help="Documents per worker task (default 32)")
+    parser.add_argument('--blocks', action='store_true', help="Include the typed text blocks in each result")
+    parser.add_argument('--output', help="Write one JSON result per line here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    args = parse_args(argv)
+    sources = find_documents(args.inputs)
+    if not sources:
+        logger.error("No .docx documents found")
+        return 1
+
+    start = time.perf_counter()
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    try:
+        for result in extract_many(sources, args.workers, args.blocks, args.chunk_size):
+            if 'error' in result:
+                failed += 1
+                logger.error(f"❌ {result['source']}: {result['error']}")
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"✅ Extracted {len(sources) - failed}/{len(sources)} documents in {elapsed:.2f}s "
+                f"({len(sources) / elapsed * 60:.0f} per minute)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Content-addressed cache of per-frame detection results.
+
+Clients regularly send the same frame more than once: the candidate sits
+still and the webcam produces identical JPEGs, a tab re-sends its last
+capture, or a client calls /api/debug-detection on a frame it just sent to
+/api/detect-mobile. Results are keyed by a hash of the encoded image bytes,
+so an exact repeat skips both decoding and inference.
+
+Optionally the decoded frame is also indexed by a perceptual difference hash
+(dHash). That catches frames that decode to the same picture but were
+re-encoded to different bytes, at the cost of a decode and a thumbnail per
+lookup. Perceptual matches are exact hash matches on a coarse thumbnail, so
+leave them off where small changes between frames matter.
+
+Entries expire after a fixed TTL from when they were stored, and the least
+recently used entry is evicted once the cache is full.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def content_key(data, size=None):
+    """Hex digest of encoded image bytes (optionally only the first size bytes)"""
+    if size is None:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    with memoryview(data) as view, view[:size] as part:
+        return hashlib.blake2b(part, digest_size=16).hexdigest()
+
+
+def perceptual_hash(frame, hash_size=16):
+    """Difference hash of a BGR frame, combined with its shape so sizes never collide"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return frame.shape[:2], bits.tobytes()
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache keyed by content_key, with an optional perceptual index"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=60.0, perceptual=False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.perceptual = perceptual
+        self._entries = OrderedDict()  # key -> (expires_at, value, phash)
+        self._phash_keys = {}          # phash -> key
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _remove(self, key):
+        _, _, phash = self._entries.pop(key)
+        if phash is not None and self._phash_keys.get(phash) == key:
+            del self._phash_keys[phash]
+
+    def get(self, key):
+        """Cached value for a content key, or None"""
+        if key is None:
+            return None
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            if value is not None:
+                self.hits += 1
+            return value
+
+    def get_similar(self, frame):
+        """Look a decoded frame up by perceptual hash.
+
+        Returns (value or None, phash); pass phash on to put() so the result
+        computed on a miss is indexed as well. Both are None when perceptual
+        matching is off.
+        """
+        if not self.perceptual:
+            return None, None
+        phash = perceptual_hash(frame)
+        with self._lock:
+            key = self._phash_keys.get(phash)
+            value = self._lookup(key, time.monotonic()) if key is not None else None
+            if value is not None:
+                self.perceptual_hits += 1
+            return value, phash
+
+    def put(self, key, value, phash=None):
+        """Store a freshly computed value under its content key and perceptual hash"""
+        if key is None:
+            # No encoded bytes to address it by; index it by its perceptual hash only
+            key = phash
+        if key is None:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, phash)
+            if phash is not None:
+                self._phash_keys[phash] = key
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._phash_keys.clear()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Production server for the YOLO Mobile Detection API.
+
+Runs mobile_detection_api under gunicorn with N pre-forked workers. The YOLO
+weights are loaded once in the master process before forking, so workers
+share them copy-on-write instead of each loading their own copy. Each worker
+then runs its warm-up inference and starts its micro-batcher on a background
+thread: it answers /api/health/live as soon as it serves HTTP, while
+/api/health/ready (and /api/health) return 503 until it is warm, so load
+balancers only route to warm workers.
+
+--no-preload-model skips the load in the master: workers bind within a
+second and each loads its own copy of the weights in the background. That
+starts faster but uses memory per worker; use it for a single worker or
+when start-up time matters more than memory.
+
+Usage:
+    python serve_detection.py --workers 4 --threads 16 --bind 0.0.0.0:5000
+
+Every option can also be set with an environment variable (see --help).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import detection_logging
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    """Default worker count: one per core, capped so memory stays reasonable"""
+    return min(4, os.cpu_count() or 1)
+
+
+def parse_args(argv=None):
+    """Parse CLI options, falling back to environment variables"""
+    parser = argparse.ArgumentParser(description="Serve the YOLO mobile detection API")
+    parser.add_argument('--bind', default=os.environ.get('DETECTION_BIND', '0.0.0.0:5000'),
+                        help="Address to listen on (env: DETECTION_BIND)")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('DETECTION_WORKERS', default_workers())),
+                        help="Number of worker processes (env: DETECTION_WORKERS)")
+    # More threads than DETECTION_MAX_CONCURRENT, so excess requests reach the
+    # admission queue and get a fast 429/503 instead of sitting in the backlog
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('DETECTION_THREADS', '16')),
+                        help="Request threads per worker (env: DETECTION_THREADS)")
+    parser.add_argument('--torch-threads', type=int,
+                        default=int(os.environ.get('DETECTION_TORCH_THREADS', '0')),
+                        help="Torch intra-op threads per worker, 0 = cores / workers "
+                             "(env: DETECTION_TORCH_THREADS)")
+    parser.add_argument('--preload-model', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('DETECTION_PRELOAD_MODEL', '1') == '1',
+                        help="Load the model once in the master before forking and share it "
+                             "copy-on-write between workers (default; --no-preload-model loads one "
+                             "copy per worker after fork, env: DETECTION_PRELOAD_MODEL=0)")
+    parser.add_argument('--timeout', type=int,
+                        default=int(os.environ.get('DETECTION_TIMEOUT', '60')),
+                        help="Worker timeout in seconds (env: DETECTION_TIMEOUT)")
+    return parser.parse_args(argv)
+
+
+def torch_threads_per_worker(args):
+    """Split the machine's cores evenly across workers unless set explicitly"""
+    if args.torch_threads > 0:
+        return args.torch_threads
+    return max(1, (os.cpu_count() or 1) // max(1, args.workers))
+
+
+def prepare_metrics_dir():
+    """Give the workers a fresh shared directory for Prometheus multiprocess metrics.
+
+    Must run before prometheus_client is imported, which happens when
+    mobile_detection_api is loaded.
+    """
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+    else:
+        metrics_dir = tempfile.mkdtemp(prefix='detection-metrics-')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+    return metrics_dir
+
+
+def mark_worker_dead(server, worker):
+    """Drop a dead worker's live gauges from the aggregated /metrics"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def load_shared_app(preload_model=True):
+    """Import the Flask app in the current (master) process, optionally with the model"""
+    import mobile_detection_api
+
+    if preload_model and not mobile_detection_api.load_model():
+        logger.error("Failed to load model. Server not started.")
+        sys.exit(1)
+
+    # Move everything loaded so far out of the GC's tracked generations so the
+    # collector doesn't touch (and un-share) those pages in forked workers
+    gc.freeze()
+    return mobile_detection_api.app
+
+
+def init_worker(torch_threads):
+    """Per-worker setup after fork: thread limits, then model load and warm-up in the background"""
+    import cv2
+    import mobile_detection_api
+
+    cv2.setNumThreads(1)
+    mobile_detection_api.start_warm_up(torch_threads)
+    logger.info(f"Worker {os.getpid()} serving; model warming up (torch threads: {torch_threads})")
+
+
+def run_gunicorn(args):
+    """Run the app under gunicorn with the model preloaded before fork"""
+    from gunicorn.app.base import BaseApplication
+
+    torch_threads = torch_threads_per_worker(args)
+    prepare_metrics_dir()
+
+    class DetectionApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', args.bind)
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', args.timeout)
+            self.cfg.set('preload_app', True)
+            self.cfg.set('post_fork', lambda server, worker: init_worker(torch_threads))
+            self.cfg.set('child_exit', mark_worker_dead)
+
+        def load(self):
+            return load_shared_app(args.preload_model)
+
+    logger.info(f"Starting mobile detection API: {args.workers} workers x {args.threads} threads "
+                f"on {args.bind}")
+    DetectionApplication().run()
+
+
+def run_threaded(args):
+    """Fallback for platforms without gunicorn: one process, threaded server"""
+    app = load_shared_app(args.preload_model)
+    init_worker(torch_threads_per_worker(args))
+
+    host, _, port = args.bind.rpartition(':')
+    logger.warning("gunicorn is not available; serving with a single threaded process")
+    app.run(host=host or '0.0.0.0', port=int(port), threaded=True, debug=False)
+
+
+def main(argv=None):
+    detection_logging.setup_logging()
+    args = parse_args(argv)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_threaded(args)
+        return
+
+    run_gunicorn(args)
+
+
+if __name__ == '__main__':
+    main()
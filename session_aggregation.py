@@ -0,0 +1,564 @@
+"""
+Server-side aggregation of detections per interview session.
+
+Each detection answered for a session (HTTP or stream), and each event the
+client reports, updates a compact in-memory state for that session:
+
+- a ring buffer of the most recent observations;
+- per kind ('phone' for YOLO results, or client signals such as
+  'tab_switch'): observations, detections and the highest confidence;
+- violation windows: a window opens on a detection and closes once nothing
+  has been detected for window_gap seconds;
+- alerts: at most one per kind every cooldown seconds, like the 5 s
+  cooldown in CheatingDetection.jsx.
+
+A background thread flushes the changes of all sessions as one batch every
+flush_interval seconds, and a session's last changes are flushed as soon as
+it ends (or after idle_timeout without frames). Flushes carry deltas, so
+under gunicorn every worker writes its share of a session and the sink adds
+them up. read_timeline() merges the windows that different workers saw of
+the same episode and re-applies the cooldown to the combined alerts.
+
+Ending a session writes an ended marker to the sink. Every worker checks
+the sink for ended sessions once a second and closes and flushes its own
+part of them, and the sink records which workers still hold a session, so
+the worker that handled the end can wait until the timeline is complete.
+
+A sink is anything with write(updates) and close(). SQLiteSessionSink keeps
+a queryable timeline and supports ending sessions across workers;
+JsonlSessionSink appends every batch to a file.
+"""
+
+import atexit
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# How often workers look for sessions ended through another worker
+ENDED_CHECK_SECONDS = 1.0
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def merge_windows(windows, gap_ms):
+    """Merge windows of the same kind that overlap or are less than gap_ms apart"""
+    merged = []
+    for window in sorted(windows, key=lambda w: (w['kind'], w['start'])):
+        last = merged[-1] if merged else None
+        if last is not None and last['kind'] == window['kind'] and window['start'] <= last['end'] + gap_ms:
+            last['end'] = max(last['end'], window['end'])
+            last['detections'] += window['detections']
+            last['max_confidence'] = max(last['max_confidence'], window['max_confidence'])
+        else:
+            merged.append(dict(window))
+    return sorted(merged, key=lambda w: w['start'])
+
+
+def apply_cooldown(alerts, cooldown_ms):
+    """Keep at most one alert per kind every cooldown_ms"""
+    kept = []
+    last = {}
+    for alert in sorted(alerts, key=lambda a: a['timestamp']):
+        if alert['timestamp'] - last.get(alert['kind'], -cooldown_ms) >= cooldown_ms:
+            kept.append(alert)
+            last[alert['kind']] = alert['timestamp']
+    return kept
+
+
+def worker_id():
+    """This process's name in the sink; evaluated per update since workers fork after import"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _SessionState:
+    """Rolling state of one session in this process"""
+
+    def __init__(self, session_id, ring_size, timestamp):
+        self.session_id = session_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.recent = deque(maxlen=ring_size)
+        self.kinds = {}              # kind -> counters, open window, last alert
+        self.classes = Counter()
+        self.flushed_classes = Counter()
+        self.windows = []            # closed windows not yet flushed
+        self.alerts = []             # alerts not yet flushed
+        self.dirty = False
+
+    def kind(self, kind):
+        state = self.kinds.get(kind)
+        if state is None:
+            state = self.kinds[kind] = {
+                'observations': 0, 'detections': 0, 'max_confidence': 0.0,
+                'flushed_observations': 0, 'flushed_detections': 0,
+                'window': None, 'last_alert': None,
+            }
+        return state
+
+    def close_window(self, kind_state):
+        window = kind_state['window']
+        if window is not None:
+            self.windows.append(window)
+            kind_state['window'] = None
+            self.dirty = True
+
+    def close_stale_windows(self, timestamp, gap_ms):
+        for state in self.kinds.values():
+            if state['window'] is not None and timestamp - state['window']['end'] > gap_ms:
+                self.close_window(state)
+
+    def take_update(self, ended=False, released=False):
+        """Changes since the last flush, as a sink update.
+
+        ended marks the session as over for every worker; released means this
+        worker dropped its state (ended, or idle) and holds nothing more.
+        """
+        kinds = {}
+        for name, state in self.kinds.items():
+            kinds[name] = {
+                'observations': state['observations'] - state['flushed_observations'],
+                'detections': state['detections'] - state['flushed_detections'],
+                'max_confidence': state['max_confidence'],
+            }
+            state['flushed_observations'] = state['observations']
+            state['flushed_detections'] = state['detections']
+        classes = self.classes - self.flushed_classes
+        self.flushed_classes = Counter(self.classes)
+        update = {
+            'session_id': self.session_id,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'ended': ended,
+            'released': released or ended,
+            'worker': worker_id(),
+            'kinds': kinds,
+            'classes': dict(classes),
+            'windows': self.windows,
+            'alerts': self.alerts,
+        }
+        self.windows, self.alerts = [], []
+        self.dirty = False
+        return update
+
+    def snapshot(self):
+        open_windows = [dict(state['window']) for state in self.kinds.values() if state['window'] is not None]
+        return {
+            'session_id': self.session_id,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'kinds': {
+                name: {k: state[k] for k in ('observations', 'detections', 'max_confidence', 'last_alert')}
+                for name, state in self.kinds.items()
+            },
+            'classes': dict(self.classes),
+            'open_windows': open_windows,
+            'recent': [dict(o) for o in self.recent],
+        }
+
+
+class SessionAggregator:
+    """Per-session rolling detection state with batched, delta-based flushing"""
+
+    def __init__(self, sink, flush_interval=10.0, ring_size=32, cooldown=5.0, window_gap=10.0,
+                 idle_timeout=300.0, max_pending_updates=10000):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.ring_size = ring_size
+        self.cooldown_ms = int(cooldown * 1000)
+        self.window_gap_ms = int(window_gap * 1000)
+        self.idle_timeout_ms = int(idle_timeout * 1000)
+        self.max_pending_updates = max_pending_updates
+        self._sessions = {}
+        self._unsent = []            # updates from failed flushes, retried first
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.updates_written = 0
+        self.flush_errors = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def observe(self, session_id, kind, detected, confidence=0.0, timestamp=None, classes=()):
+        """Record one observation (a frame result or a client event) for a session"""
+        timestamp = timestamp or now_ms()
+        confidence = float(confidence or 0.0)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _SessionState(session_id, self.ring_size, timestamp)
+            session.last_seen = max(session.last_seen, timestamp)
+            session.recent.append({'timestamp': timestamp, 'kind': kind, 'detected': bool(detected),
+                                   'confidence': round(confidence, 4)})
+            state = session.kind(kind)
+            state['observations'] += 1
+            session.dirty = True
+
+            window = state['window']
+            if window is not None and timestamp - window['end'] > self.window_gap_ms:
+                session.close_window(state)
+                window = None
+            if not detected:
+                return
+
+            state['detections'] += 1
+            state['max_confidence'] = max(state['max_confidence'], confidence)
+            session.classes.update(classes)
+            if window is None:
+                state['window'] = {'kind': kind, 'start': timestamp, 'end': timestamp,
+                                   'detections': 1, 'max_confidence': confidence}
+            else:
+                window['end'] = max(window['end'], timestamp)
+                window['detections'] += 1
+                window['max_confidence'] = max(window['max_confidence'], confidence)
+
+            last_alert = state['last_alert']
+            if last_alert is None or timestamp - last_alert >= self.cooldown_ms:
+                state['last_alert'] = timestamp
+                session.alerts.append({'kind': kind, 'timestamp': timestamp, 'confidence': confidence})
+
+    def record_detection(self, session_id, body, timestamp=None):
+        """Record a detect-mobile response body; error and throttled responses are skipped"""
+        if 'error' in body:
+            return
+        self.observe(
+            session_id, 'phone', body.get('mobile_detected'), body.get('confidence'), timestamp,
+            [d.get('class_name', 'unknown') for d in body.get('detections', ())]
+        )
+
+    def snapshot(self, session_id):
+        """Live state of a session in this process, or None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.snapshot() if session is not None else None
+
+    def end(self, session_id):
+        """End a session: flush this worker's part now and mark it ended in the sink.
+
+        Other workers close and flush their part on their next check; use
+        wait_until_released() to wait for them.
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                update = {'session_id': session_id, 'first_seen': None, 'last_seen': None, 'ended': True,
+                          'released': True, 'worker': worker_id(),
+                          'kinds': {}, 'classes': {}, 'windows': [], 'alerts': []}
+            else:
+                for state in session.kinds.values():
+                    session.close_window(state)
+                update = session.take_update(ended=True)
+        self._write([update])
+        return update
+
+    def wait_until_released(self, session_id, timeout):
+        """Wait until no worker holds unflushed state of a session; True when none does.
+
+        Always False for sinks that cannot be read back (JSONL).
+        """
+        holding_workers = getattr(self.sink, 'holding_workers', None)
+        if holding_workers is None:
+            return False
+        deadline = time.monotonic() + timeout
+        while True:
+            self._write([])  # retry anything a failed flush kept back
+            if not holding_workers(session_id):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(0.1, ENDED_CHECK_SECONDS / 4))
+
+    def close_ended(self):
+        """Close and flush this worker's part of sessions ended through another worker"""
+        ended_sessions = getattr(self.sink, 'ended_sessions', None)
+        if ended_sessions is None:
+            return 0
+        with self._lock:
+            session_ids = list(self._sessions)
+        if not session_ids:
+            return 0
+        ended = ended_sessions(session_ids)
+        updates = []
+        with self._lock:
+            for session_id in ended:
+                session = self._sessions.pop(session_id, None)
+                if session is not None:
+                    for state in session.kinds.values():
+                        session.close_window(state)
+                    updates.append(session.take_update(released=True))
+        return self._write(updates)
+
+    def timeline(self, session_id):
+        """Merged timeline of a session from the sink (all workers), or None.
+
+        Pending changes are flushed first so the caller sees its own writes;
+        sinks that cannot be read back (JSONL) return None.
+        """
+        read_timeline = getattr(self.sink, 'read_timeline', None)
+        if read_timeline is None:
+            return None
+        self.flush()
+        return read_timeline(session_id, self.window_gap_ms / 1000, self.cooldown_ms / 1000)
+
+    def flush(self):
+        """Write the changes of every session as one batch; returns the number of updates"""
+        timestamp = now_ms()
+        updates = []
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                session.close_stale_windows(timestamp, self.window_gap_ms)
+                idle = timestamp - session.last_seen > self.idle_timeout_ms
+                if idle:
+                    for state in session.kinds.values():
+                        session.close_window(state)
+                    del self._sessions[session_id]
+                if session.dirty or idle:
+                    updates.append(session.take_update(released=idle))
+        return self._write(updates)
+
+    def _write(self, updates):
+        with self._flush_lock:
+            batch, self._unsent = self._unsent + updates, []
+            if not batch:
+                return 0
+            try:
+                self.sink.write(batch)
+            except Exception as e:
+                self.flush_errors += 1
+                # Keep the updates for the next flush, up to a bound
+                self._unsent = batch[-self.max_pending_updates:]
+                logger.error(f"❌ Session aggregate flush failed ({len(batch)} updates kept): {e}")
+                return 0
+            self.flushes += 1
+            self.updates_written += len(batch)
+            return len(batch)
+
+    def start(self):
+        """Start the periodic flush thread; remaining changes are flushed at exit"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='session-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Session aggregation flushing every {self.flush_interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.wait(min(ENDED_CHECK_SECONDS, self.flush_interval)):
+            try:
+                self.close_ended()
+                if time.monotonic() >= next_flush:
+                    next_flush = time.monotonic() + self.flush_interval
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Session aggregate flush error: {e}")
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS detection_sessions (
+    session_id TEXT PRIMARY KEY,
+    first_seen INTEGER,
+    last_seen INTEGER,
+    ended_at INTEGER,
+    kinds TEXT NOT NULL,
+    classes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detection_windows (
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    detections INTEGER NOT NULL,
+    max_confidence REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detection_alerts (
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    confidence REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detection_session_workers (
+    session_id TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    flushed_at INTEGER NOT NULL,
+    released INTEGER NOT NULL,
+    PRIMARY KEY (session_id, worker)
+);
+CREATE INDEX IF NOT EXISTS detection_windows_session ON detection_windows (session_id);
+CREATE INDEX IF NOT EXISTS detection_alerts_session ON detection_alerts (session_id);
+'''
+
+
+def _merge_kinds(old, new):
+    merged = {name: dict(counts) for name, counts in old.items()}
+    for name, counts in new.items():
+        target = merged.setdefault(name, {'observations': 0, 'detections': 0, 'max_confidence': 0.0})
+        target['observations'] += counts['observations']
+        target['detections'] += counts['detections']
+        target['max_confidence'] = max(target['max_confidence'], counts['max_confidence'])
+    return merged
+
+
+class SQLiteSessionSink:
+    """Local stand-in sink: one SQLite file shared by all workers, one transaction per batch"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connection(self):
+        # SQLite connections must not cross a fork: open one per worker process
+        if self._db is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def write(self, updates):
+        with self._lock:
+            db = self._connection()
+            # Take the write lock up front: other workers merge into the same rows
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                for update in updates:
+                    row = db.execute('SELECT first_seen, last_seen, ended_at, kinds, classes '
+                                     'FROM detection_sessions WHERE session_id = ?',
+                                     (update['session_id'],)).fetchone()
+                    first_seen, last_seen, ended_at, kinds, classes = row or (None, None, None, '{}', '{}')
+                    classes = Counter(json.loads(classes))
+                    classes.update(update['classes'])
+                    seen = [t for t in (first_seen, update['first_seen']) if t is not None]
+                    last = [t for t in (last_seen, update['last_seen']) if t is not None]
+                    db.execute(
+                        'INSERT OR REPLACE INTO detection_sessions VALUES (?, ?, ?, ?, ?, ?)',
+                        (update['session_id'], min(seen) if seen else None, max(last) if last else None,
+                         now_ms() if update['ended'] and ended_at is None else ended_at,
+                         json.dumps(_merge_kinds(json.loads(kinds), update['kinds'])), json.dumps(classes))
+                    )
+                    db.execute(
+                        'INSERT OR REPLACE INTO detection_session_workers VALUES (?, ?, ?, ?)',
+                        (update['session_id'], update['worker'], now_ms(), int(update['released']))
+                    )
+                    db.executemany(
+                        'INSERT INTO detection_windows VALUES (?, ?, ?, ?, ?, ?)',
+                        [(update['session_id'], w['kind'], w['start'], w['end'], w['detections'],
+                          w['max_confidence']) for w in update['windows']]
+                    )
+                    db.executemany(
+                        'INSERT INTO detection_alerts VALUES (?, ?, ?, ?)',
+                        [(update['session_id'], a['kind'], a['timestamp'], a['confidence'])
+                         for a in update['alerts']]
+                    )
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+
+    def ended_sessions(self, session_ids):
+        """The given sessions that have been ended (through any worker)"""
+        with self._lock:
+            db = self._connection()
+            ended = set()
+            for start in range(0, len(session_ids), 500):
+                chunk = session_ids[start:start + 500]
+                ended.update(row[0] for row in db.execute(
+                    'SELECT session_id FROM detection_sessions WHERE ended_at IS NOT NULL '
+                    f'AND session_id IN ({",".join("?" * len(chunk))})', chunk))
+            return ended
+
+    def holding_workers(self, session_id):
+        """Workers that flushed part of a session and have not released it yet"""
+        with self._lock:
+            return [row[0] for row in self._connection().execute(
+                'SELECT worker FROM detection_session_workers WHERE session_id = ? AND released = 0',
+                (session_id,))]
+
+    def read_timeline(self, session_id, window_gap=10.0, cooldown=5.0):
+        """Merged timeline of a session across all workers, or None if unknown"""
+        with self._lock:
+            db = self._connection()
+            row = db.execute('SELECT first_seen, last_seen, ended_at, kinds, classes '
+                             'FROM detection_sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return None
+            windows = [
+                {'kind': kind, 'start': start, 'end': end, 'detections': detections, 'max_confidence': confidence}
+                for kind, start, end, detections, confidence in db.execute(
+                    'SELECT kind, start_ms, end_ms, detections, max_confidence FROM detection_windows '
+                    'WHERE session_id = ?', (session_id,))
+            ]
+            alerts = [
+                {'kind': kind, 'timestamp': timestamp, 'confidence': confidence}
+                for kind, timestamp, confidence in db.execute(
+                    'SELECT kind, timestamp_ms, confidence FROM detection_alerts WHERE session_id = ?',
+                    (session_id,))
+            ]
+        alerts = apply_cooldown(alerts, int(cooldown * 1000))
+        return {
+            'session_id': session_id,
+            'first_seen': row[0],
+            'last_seen': row[1],
+            'ended_at': row[2],
+            'kinds': json.loads(row[3]),
+            'classes': json.loads(row[4]),
+            'windows': merge_windows(windows, int(window_gap * 1000)),
+            'alerts': alerts,
+            'violations': dict(Counter(a['kind'] for a in alerts)),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+class JsonlSessionSink:
+    """Local stand-in sink: appends each batch to a JSON-lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, updates):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lines = ''.join(json.dumps(update) + '\n' for update in updates)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+    def close(self):
+        pass
+
+
+def make_sink(spec):
+    """Sink for a DETECTION_SESSION_SINK value: 'sqlite:<path>' or 'jsonl:<path>'"""
+    kind, _, path = spec.partition(':')
+    if kind == 'sqlite' and path:
+        return SQLiteSessionSink(path)
+    if kind == 'jsonl' and path:
+        return JsonlSessionSink(path)
+    raise ValueError(f"Unknown session sink {spec!r} (expected sqlite:<path> or jsonl:<path>)")
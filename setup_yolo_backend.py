@@ -66,8 +66,8 @@ if [ ! -f "models/best.pt" ]; then
     echo "   The backend will start but detection may not work properly"
 fi
 
-# Start the Flask server
-python3 mobile_detection_api.py
+# Start the server (set DETECTION_WORKERS to change the worker count)
+python3 serve_detection.py
 """
     
     with open("start_backend.sh", "w") as f:
@@ -98,8 +98,8 @@ if not exist "models\\best.pt" (
     echo    The backend will start but detection may not work properly
 )
 
-REM Start the Flask server
-python mobile_detection_api.py
+REM Start the server
+python serve_detection.py
 pause
 """
     
@@ -109,17 +109,16 @@ pause
     print("✅ Created Windows batch file: start_backend.bat")
 
 def test_backend():
-    """Test if the backend can start"""
-    print("🧪 Testing backend startup...")
+    """Test if the backend code is valid"""
+    print("🧪 Testing backend code...")
+    # Compile instead of importing, so the check doesn't pull in torch or load the model
+    import py_compile
     try:
-        # Import the Flask app to check for syntax errors
-        import mobile_detection_api
+        for source in sorted(Path(__file__).resolve().parent.glob("*.py")):
+            py_compile.compile(str(source), doraise=True)
         print("✅ Backend code is valid")
-    except ImportError as e:
-        print(f"❌ Failed to import backend: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ Backend test failed: {e}")
+    except py_compile.PyCompileError as e:
+        print(f"❌ Backend code has errors: {e.msg}")
         return False
     
     return True
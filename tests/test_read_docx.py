@@ -0,0 +1,46 @@
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from read_docx import TextBlock, iter_docx_blocks  # noqa: E402
+
+NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"'
+)
+
+
+def textbox_paragraph(text):
+    """An anchor paragraph holding a text box the way Word saves it"""
+    content = f'<w:txbxContent><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:txbxContent>'
+    return (
+        '<w:p><w:r><mc:AlternateContent>'
+        f'<mc:Choice Requires="wps"><wps:wsp><wps:txbx>{content}</wps:txbx></wps:wsp></mc:Choice>'
+        f'<mc:Fallback><v:shape><v:textbox>{content}</v:textbox></v:shape></mc:Fallback>'
+        '</mc:AlternateContent></w:r></w:p>'
+    )
+
+
+def make_docx(body):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document {NAMESPACES}><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+def test_alternate_content_textbox_is_read_once():
+    docx = make_docx(textbox_paragraph('Contact: jane@x.com') + '<w:p><w:r><w:t>Body</w:t></w:r></w:p>')
+    assert list(iter_docx_blocks(docx)) == [
+        TextBlock('textbox', 'Contact: jane@x.com'),
+        TextBlock('paragraph', 'Body'),
+    ]
+
+
+def test_textbox_in_table_cell_is_read_once():
+    docx = make_docx('<w:tbl><w:tr><w:tc>' + textbox_paragraph('Skills') + '</w:tc></w:tr></w:tbl>')
+    assert list(iter_docx_blocks(docx)) == [TextBlock('cell', 'Skills')]
@@ -12,6 +12,9 @@ try {
   console.log('Transformers not available during build time');
 }
 
+// Python embedding service (embedding_service.py) used on the server
+const EMBEDDING_SERVICE_URL = process.env.EMBEDDING_SERVICE_URL || 'http://localhost:5001';
+
 class JobMatcherModel {
   constructor() {
     this.model = null;
@@ -20,6 +23,7 @@ class JobMatcherModel {
     this.loadingPromise = null;
     this.loadError = null;
     this.transformers = null;
+    this.remote = false;
   }
 
   async loadModel() {
@@ -31,18 +35,35 @@ class JobMatcherModel {
       return this.loadingPromise;
     }
 
-    this.loadingPromise = this._loadModel();
+    this.loadingPromise = this._loadModel().catch((error) => {
+      // Allow a later call to retry, e.g. once the embedding service is up
+      this.loadingPromise = null;
+      throw error;
+    });
     return this.loadingPromise;
   }
 
+  async _connectEmbeddingService() {
+    const response = await fetch(`${EMBEDDING_SERVICE_URL}/api/embed/health`);
+    if (!response.ok) {
+      throw new Error(`Embedding service unavailable (${response.status})`);
+    }
+    const status = await response.json();
+    this.remote = true;
+    this.model = status;
+    this.isLoaded = true;
+    this.loadError = null;
+    console.log(`Using job matcher embedding service at ${EMBEDDING_SERVICE_URL}`);
+    return this.model;
+  }
+
   async _loadModel() {
     try {
       console.log('Loading fine-tuned job matcher model...');
       
-      // Check if we're in a browser environment
+      // On the server, embed through the Python embedding service
       if (typeof window === 'undefined') {
-        // This is expected in server environment
-        throw new Error('Model loading is not supported in server-side environment');
+        return await this._connectEmbeddingService();
       }
       
       // Dynamically import transformers only on client side
@@ -86,6 +107,20 @@ class JobMatcherModel {
     try {
       // Ensure texts is an array
       const textArray = Array.isArray(texts) ? texts : [texts];
+
+      if (this.remote) {
+        // One request for the whole batch; the service pads and buckets by length
+        const response = await fetch(`${EMBEDDING_SERVICE_URL}/api/embed`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ texts: textArray })
+        });
+        if (!response.ok) {
+          throw new Error(`Embedding service error (${response.status})`);
+        }
+        const result = await response.json();
+        return result.embeddings;
+      }
       
       // Get embeddings for all texts
       const embeddings = await Promise.all(
@@ -130,12 +165,15 @@ class JobMatcherModel {
 
   async findBestMatches(queryText, candidates, topK = 5) {
     try {
-      const queryEmbedding = await this.getEmbeddings([queryText]);
-      const candidateEmbeddings = await this.getEmbeddings(candidates.map(c => c.text));
+      // Embed the query together with the candidates in one batch
+      const [queryEmbedding, ...candidateEmbeddings] = await this.getEmbeddings([
+        queryText,
+        ...candidates.map(c => c.text)
+      ]);
       
       const similarities = candidateEmbeddings.map((embedding, index) => ({
         index,
-        similarity: this.cosineSimilarity(queryEmbedding[0], embedding),
+        similarity: this.cosineSimilarity(queryEmbedding, embedding),
         candidate: candidates[index]
       }));
       
@@ -0,0 +1,182 @@
+import { db } from '@/utils/db';
+import { callInterview, MockInterview } from '@/utils/schema';
+import { eq, and, inArray } from 'drizzle-orm';
+import jobMatcherService from '@/utils/jobMatcherModel';
+
+// Python embedding service (embedding_service.py) that owns the job index
+const EMBEDDING_SERVICE_URL = process.env.EMBEDDING_SERVICE_URL || 'http://localhost:5001';
+const REQUEST_TIMEOUT_MS = 5000;
+// How often recommendations reconcile the index with the database, to pick up
+// jobs created or changed outside the API routes that update it directly
+const SYNC_INTERVAL_MS = 60 * 1000;
+
+let lastSyncAt = 0;
+let syncPromise = null;
+
+// Normalize callInterview / MockInterview rows to the job structure used for matching
+export const normalizeJob = (job) => ({
+  ...job,
+  id: job.job_id || job.mockId, // unique id for matching
+  jobTitle: job.jobPosition || job.jobTitle, // ensure jobTitle is present
+  company: job.recruiterName || job.createdBy || job.company || job.city,
+  city: job.location || job.city,
+  skills: job.skills || '',
+  jobCategories: job.category ? [job.category] : [],
+  minExperience: job.minExperience || job.experience || 0,
+  jobDescription: job.jobDescription || job.jobDesc || '',
+  _type: job._type,
+  job_id: job.job_id,
+  mockId: job.mockId,
+  type: job.type,
+});
+
+export const callInterviewJob = (row) =>
+  normalizeJob({ ...row, _type: 'call', type: 'Call Interview', jobDescription: row.jobDescription });
+
+export const mockInterviewJob = (row) =>
+  normalizeJob({ ...row, _type: 'mock', type: 'Video Interview', jobDescription: row.jobDesc });
+
+// Index IDs are namespaced by table so a job_id can never collide with a mockId
+export const jobIndexId = (job) => `${job._type}:${job.id}`;
+
+async function postToIndex(path, body) {
+  try {
+    const response = await fetch(`${EMBEDDING_SERVICE_URL}${path}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body),
+      signal: AbortSignal.timeout(REQUEST_TIMEOUT_MS)
+    });
+    if (!response.ok) {
+      throw new Error(`status ${response.status}`);
+    }
+    return await response.json();
+  } catch (error) {
+    // The index is an accelerator; callers fall back to scoring jobs directly
+    console.log(`Job index ${path} unavailable:`, error.message);
+    return null;
+  }
+}
+
+/**
+ * Embed normalized jobs and add them to the index (replacing older vectors)
+ */
+export async function indexJobs(jobs) {
+  if (jobs.length === 0) {
+    return { indexed: 0 };
+  }
+  return postToIndex('/api/jobs/index', {
+    jobs: jobs.map(job => ({ id: jobIndexId(job), text: jobMatcherService.createJobText(job) }))
+  });
+}
+
+export async function removeFromJobIndex(ids) {
+  return postToIndex('/api/jobs/remove', { ids });
+}
+
+export const indexCallInterview = (row) => indexJobs([callInterviewJob(row)]);
+export const indexMockInterview = (row) => indexJobs([mockInterviewJob(row)]);
+export const removeMockInterviewFromIndex = (mockId) => removeFromJobIndex([`mock:${mockId}`]);
+
+/**
+ * Reconcile the index with the database: drop jobs that were deleted or
+ * hidden and embed the ones that are not indexed yet. Only IDs are read for
+ * the comparison; full rows are loaded just for the missing jobs.
+ */
+async function syncJobIndex() {
+  const callIds = await db.select({ id: callInterview.job_id }).from(callInterview);
+  const mockIds = await db.select({ id: MockInterview.mockId })
+    .from(MockInterview)
+    .where(eq(MockInterview.isHidden, false));
+  const ids = [
+    ...callIds.filter(row => row.id).map(row => `call:${row.id}`),
+    ...mockIds.map(row => `mock:${row.id}`)
+  ];
+
+  const result = await postToIndex('/api/jobs/sync', { ids });
+  if (!result) {
+    return false;
+  }
+
+  if (result.missing.length > 0) {
+    const jobs = await loadIndexedJobs(result.missing);
+    const indexed = await indexJobs(jobs);
+    if (!indexed) {
+      return false;
+    }
+    console.log(`Job index: embedded ${jobs.length} new jobs, removed ${result.removed}`);
+  }
+  return true;
+}
+
+async function ensureJobIndexSynced() {
+  if (Date.now() - lastSyncAt < SYNC_INTERVAL_MS) {
+    return true;
+  }
+  if (!syncPromise) {
+    syncPromise = syncJobIndex()
+      .then((synced) => {
+        if (synced) {
+          lastSyncAt = Date.now();
+        }
+        return synced;
+      })
+      .finally(() => {
+        syncPromise = null;
+      });
+  }
+  return syncPromise;
+}
+
+/**
+ * Load the visible jobs behind a list of index IDs, in the same order
+ */
+async function loadIndexedJobs(ids) {
+  const callJobIds = ids.filter(id => id.startsWith('call:')).map(id => id.slice(5));
+  const mockIds = ids.filter(id => id.startsWith('mock:')).map(id => id.slice(5));
+
+  const callRows = callJobIds.length > 0
+    ? await db.select().from(callInterview).where(inArray(callInterview.job_id, callJobIds))
+    : [];
+  const mockRows = mockIds.length > 0
+    ? await db.select().from(MockInterview)
+      .where(and(inArray(MockInterview.mockId, mockIds), eq(MockInterview.isHidden, false)))
+    : [];
+
+  const jobs = new Map([
+    ...callRows.map(callInterviewJob),
+    ...mockRows.map(mockInterviewJob)
+  ].map(job => [jobIndexId(job), job]));
+  return ids.map(id => jobs.get(id)).filter(Boolean);
+}
+
+/**
+ * Top-k recommendations from the precomputed job index.
+ * Returns null when the index is unavailable so callers can fall back.
+ */
+export async function recommendFromJobIndex(userProfile, limit = 10, cvText = '') {
+  if (!(await ensureJobIndexSynced())) {
+    return null;
+  }
+
+  const candidateText = jobMatcherService.extractCandidateInfo(userProfile, cvText);
+  const result = await postToIndex('/api/jobs/search', { text: candidateText, k: limit });
+  if (!result) {
+    return null;
+  }
+
+  const scores = new Map(result.results.map(match => [match.id, match.score]));
+  const jobs = await loadIndexedJobs(result.results.map(match => match.id));
+  return jobs.map(job => {
+    const similarity = scores.get(jobIndexId(job));
+    return {
+      jobId: job.id,
+      jobTitle: job.jobTitle,
+      company: job.company || job.city,
+      location: job.city,
+      matchScore: Math.round(similarity * 100),
+      reason: jobMatcherService.generateMatchReason({ similarity, job }, userProfile, cvText),
+      job
+    };
+  });
+}
@@ -15,8 +15,8 @@ class JobMatcherService {
       this.modelAvailable = this.model.isLoaded;
       return this.modelAvailable;
     } catch (error) {
-      // This is expected behavior in server environment
-      console.log('Using fallback recommendation system (model not available in server environment)');
+      // Expected on the server when the Python embedding service isn't running
+      console.log('Using fallback recommendation system (embedding service not available)');
       this.modelAvailable = false;
       return false;
     }
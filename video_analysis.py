@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Offline mobile device detection over recorded interview videos.
+
+Streams each recording with OpenCV, samples frames at a fixed rate (and
+optionally only when the scene changed), and runs them in batches through the
+same model and the same filtering rules as /api/detect-mobile. The result is
+a compact per-interval timeline of detections for post-interview evaluation.
+
+A backlog of recordings is processed on a pool of worker processes, each with
+its own copy of the model, which is much faster than replaying frames over
+HTTP one JPEG at a time.
+
+Usage:
+    python video_analysis.py recordings/ --sample-fps 1 --interval 10
+    python video_analysis.py a.webm b.mp4 --workers 2 --output timelines.jsonl
+    python video_analysis.py a.webm --scene-threshold 0.05 --max-gap 5
+
+The same analysis is available for a single recording through
+POST /api/analyze-video on the detection API.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from frame_tracking import frame_thumbnail
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mkv', '.mov', '.avi')
+
+# Set in each pool worker by _init_worker
+_detect_frames = None
+
+
+def iter_sampled_frames(path, sample_fps=1.0, scene_threshold=None, max_gap=10.0):
+    """Yield (timestamp_seconds, frame) for the frames of a video worth analysing.
+
+    Frames are considered sample_fps times per second; skipped frames are only
+    grabbed, not decoded. With scene_threshold set, a considered frame is kept
+    only if its mean absolute difference from the last kept frame (0-1 scale)
+    exceeds the threshold, or if max_gap seconds have passed since then.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+
+    try:
+        native_fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        if not 0 < native_fps < 1000:
+            # Browser recordings (webm) often report no frame rate
+            native_fps = 30.0
+        step = max(1, int(round(native_fps / sample_fps))) if sample_fps > 0 else 1
+
+        last_thumb = None
+        last_kept = None
+        index = -1
+        while capture.grab():
+            index += 1
+            if index % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if timestamp <= 0 and index:
+                timestamp = index / native_fps
+
+            if scene_threshold is not None:
+                thumb = frame_thumbnail(frame)
+                changed = last_thumb is None or \
+                    float(np.mean(np.abs(thumb - last_thumb))) / 255 > scene_threshold
+                if not changed and timestamp - last_kept < max_gap:
+                    continue
+                last_thumb = thumb
+            last_kept = timestamp
+            yield timestamp, frame
+    finally:
+        capture.release()
+
+
+def build_timeline(samples, interval):
+    """Group per-frame results into fixed-length intervals.
+
+    samples is a list of (timestamp, (mobile_detected, detections, max_confidence)).
+    Only intervals that contain at least one analysed frame are listed.
+    """
+    buckets = {}
+    for timestamp, (mobile_detected, detections, max_confidence) in samples:
+        bucket = buckets.setdefault(int(timestamp // interval), {
+            'frames': 0,
+            'detected_frames': 0,
+            'max_confidence': 0,
+            'classes': {}
+        })
+        bucket['frames'] += 1
+        if mobile_detected:
+            bucket['detected_frames'] += 1
+            bucket['max_confidence'] = max(bucket['max_confidence'], max_confidence)
+            for detection in detections:
+                name = detection['class_name']
+                bucket['classes'][name] = bucket['classes'].get(name, 0) + 1
+
+    timeline = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        entry = {
+            'start': round(index * interval, 3),
+            'end': round((index + 1) * interval, 3),
+            'frames': bucket['frames'],
+            'detected_frames': bucket['detected_frames'],
+        }
+        if bucket['detected_frames']:
+            entry['max_confidence'] = round(bucket['max_confidence'], 3)
+            entry['classes'] = bucket['classes']
+        timeline.append(entry)
+    return timeline
+
+
+def analyze_video(path, detect_frames, sample_fps=1.0, scene_threshold=None, max_gap=10.0,
+                  interval=10.0, batch_size=8):
+    """Run mobile detection over one recording and summarise it as a timeline.
+
+    detect_frames takes a list of decoded frames and returns one
+    (mobile_detected, detections, max_confidence) tuple per frame, e.g.
+    mobile_detection_api.detect_mobile_frames.
+    """
+    start = time.perf_counter()
+    samples = []
+    timestamps, batch = [], []
+    duration = 0.0
+
+    def flush():
+        samples.extend(zip(timestamps, detect_frames(batch)))
+        timestamps.clear()
+        batch.clear()
+
+    for timestamp, frame in iter_sampled_frames(path, sample_fps, scene_threshold, max_gap):
+        timestamps.append(timestamp)
+        batch.append(frame)
+        duration = max(duration, timestamp)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    detected = [s for s in samples if s[1][0]]
+    return {
+        'video': path,
+        'duration': round(duration, 3),
+        'frames_analyzed': len(samples),
+        'frames_with_device': len(detected),
+        'mobile_detected': bool(detected),
+        'max_confidence': round(max((s[1][2] for s in detected), default=0), 3),
+        'first_detection': round(detected[0][0], 3) if detected else None,
+        'interval': interval,
+        'timeline': build_timeline(samples, interval),
+        'processing_seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def find_videos(inputs):
+    """Expand files and directories into a sorted list of video paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in VIDEO_EXTENSIONS:
+                paths.extend(glob.glob(os.path.join(item, '**', '*' + ext), recursive=True))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def _init_worker(model_path, torch_threads):
+    """Load the detector once per pool process"""
+    global _detect_frames
+    os.environ.setdefault('DETECTION_LOG_LEVEL', 'WARNING')
+    import torch
+    import mobile_detection_api as api
+
+    torch.set_num_threads(torch_threads)
+    cv2.setNumThreads(1)
+    if model_path:
+        import model_backends
+        api.model, api.model_source = model_backends.load_detector(
+            model_path, api.MODEL_BACKEND, imgsz=api.EXPORT_IMAGE_SIZE, cache_dir=api.MODEL_CACHE_DIR,
+            precision=api.MODEL_PRECISION, calibration_dir=api.CALIBRATION_DIR
+        )
+    elif not api.load_model():
+        raise RuntimeError("Failed to load model")
+    _detect_frames = api.detect_mobile_frames
+
+
+def _analyze_in_worker(path, options):
+    try:
+        return analyze_video(path, _detect_frames, **options)
+    except Exception as e:
+        return {'video': path, 'error': str(e)}
+
+
+def analyze_videos(paths, workers=1, model_path=None, **options):
+    """Analyse many recordings on a process pool; yields results in input order"""
+    workers = max(1, min(workers, len(paths)))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    # spawn, not fork: torch and OpenCV thread pools don't survive a fork
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(model_path, torch_threads)) as pool:
+        yield from pool.map(_analyze_in_worker, paths, [options] * len(paths))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run mobile device detection over recorded interview videos")
+    parser.add_argument('inputs', nargs='+', help="Video files or directories of videos")
+    parser.add_argument('--model', help="Weights to load (default: same search as the API)")
+    parser.add_argument('--sample-fps', type=float, default=1.0,
+                        help="Frames considered per second of video (default 1)")
+    parser.add_argument('--scene-threshold', type=float, default=None,
+                        help="Only keep frames that changed by more than this (0-1) since the last kept one")
+    parser.add_argument('--max-gap', type=float, default=10.0,
+                        help="With --scene-threshold, keep a frame at least every N seconds (default 10)")
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help="Timeline interval length in seconds (default 10)")
+    parser.add_argument('--batch', type=int, default=8, help="Frames per model call (default 8)")
+    parser.add_argument('--workers', type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="Worker processes, each with its own model (default: cores / 2, max 4)")
+    parser.add_argument('--output', help="Write one JSON result per line here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    args = parse_args(argv)
+    paths = find_videos(args.inputs)
+    if not paths:
+        logger.error("No videos found")
+        return 1
+
+    logger.info(f"Analysing {len(paths)} recording(s) with {min(args.workers, len(paths))} worker(s)")
+    out = open(args.output, 'w') if args.output else sys.stdout
+    failed = 0
+    try:
+        results = analyze_videos(
+            paths,
+            workers=args.workers,
+            model_path=args.model,
+            sample_fps=args.sample_fps,
+            scene_threshold=args.scene_threshold,
+            max_gap=args.max_gap,
+            interval=args.interval,
+            batch_size=args.batch
+        )
+        for result in results:
+            if 'error' in result:
+                failed += 1
+                logger.error(f"❌ {result['video']}: {result['error']}")
+            else:
+                logger.info(f"✅ {result['video']}: {result['frames_analyzed']} frames, "
+                            f"device in {result['frames_with_device']} "
+                            f"({result['processing_seconds']}s)")
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())